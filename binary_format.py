@@ -0,0 +1,101 @@
+"""This module contains functionality to store named numeric arrays together with a small JSON header in one file.
+
+The layout is a 4-byte magic string identifying the kind of file, followed by the format version and the length of
+the header as little-endian 32-bit unsigned integers. Next is the header encoded as JSON, which lists the name, type
+code and length of every array. The arrays follow as contiguous blocks of little-endian values in the listed order.
+The header and every array block are padded to a multiple of 8 bytes, so that arrays can be viewed without copying.
+
+Arrays are always stored little-endian, so files can be shared between machines regardless of their byte order.
+
+"""
+
+from array import array
+from json import dumps, loads
+from struct import Struct
+from sys import byteorder
+from typing import Dict, Tuple
+
+PREAMBLE = Struct('<4sII')
+
+ALIGNMENT = 8
+
+
+def padding(length: int) -> int:
+    """Determines the amount of padding bytes required to align the given length.
+
+    Args:
+        length (int): The length in bytes to align.
+
+    Returns:
+        int: The amount of bytes to add to the length to obtain a multiple of the alignment.
+
+    """
+    return -length % ALIGNMENT
+
+
+def pack(magic: bytes, version: int, header: Dict, arrays: Dict[str, array]) -> bytes:
+    """Packs a header and named arrays into bytes.
+
+    Args:
+        magic (bytes): The 4-byte string identifying the kind of file.
+        version (int): The version of the format of the file.
+        header (Dict): The JSON serializable header. The key 'arrays' is reserved for the array descriptions.
+        arrays (Dict[str, array]): The arrays to store, by name.
+
+    Returns:
+        bytes: The packed representation of the header and arrays.
+
+    """
+    header = dict(header)
+    header['arrays'] = [[name, values.typecode, len(values)] for name, values in arrays.items()]
+    header_bytes = dumps(header, separators=(',', ':')).encode('utf-8')
+
+    chunks = [PREAMBLE.pack(magic, version, len(header_bytes)), header_bytes,
+              bytes(padding(PREAMBLE.size + len(header_bytes)))]
+    for values in arrays.values():
+        if byteorder == 'big':
+            values = array(values.typecode, values)
+            values.byteswap()
+        block = values.tobytes()
+        chunks.append(block)
+        chunks.append(bytes(padding(len(block))))
+    return b''.join(chunks)
+
+
+def unpack(magic: bytes, version: int, data: bytes) -> Tuple[Dict, Dict[str, array]]:
+    """Unpacks a header and named arrays from bytes created with pack.
+
+    Args:
+        magic (bytes): The 4-byte string identifying the expected kind of file.
+        version (int): The expected version of the format of the file.
+        data (bytes): The packed representation of the header and arrays.
+
+    Returns:
+        Dict: The header, without the array descriptions.
+        Dict[str, array]: The stored arrays, by name.
+
+    Raises:
+        ValueError: If the data is not of the expected kind or version.
+
+    """
+    view = memoryview(data)
+    file_magic, file_version, header_length = PREAMBLE.unpack_from(view)
+    if file_magic != magic:
+        raise ValueError('Expected a file starting with ' + repr(magic) + ', found ' + repr(file_magic))
+    if file_version != version:
+        raise ValueError('Expected format version ' + str(version) + ', found ' + str(file_version))
+
+    offset = PREAMBLE.size
+    header = loads(bytes(view[offset:offset + header_length]).decode('utf-8'))
+    offset += header_length + padding(offset + header_length)
+
+    arrays = {}
+    for name, typecode, length in header.pop('arrays'):
+        values = array(typecode)
+        block_length = length * values.itemsize
+        values.frombytes(view[offset:offset + block_length])
+        if byteorder == 'big':
+            values.byteswap()
+        arrays[name] = values
+        offset += block_length + padding(block_length)
+    return header, arrays
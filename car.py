@@ -1,38 +1,46 @@
 """This module contains functionality to represent a car in the simulation.
 
-A car is represented by its dimensions and limitations with respect to velocity and turning radius. The distance between
+A car is represented by its type, which holds the dimensions and limitations with respect to velocity and turning radius
+shared by all cars of that type, and its own kinematic state. The distance between
 the front axle and the front of the car is considered equal to the distance between the back axle and the back of the
 car. In other words, the midpoint of the wheelbase is equal to the midpoint of the length of the car. The movement of
 the car is based on a Simple Car kinematics model (see: http://planning.cs.uiuc.edu/node658.html).
 
 This module contains functions to calculate the flocking forces experienced by a car. These flocking forces are then
-translated into adjustment of the control parameters of a car: acceleration and steering.
+translated into adjustment of the control parameters of a car: acceleration and steering. Determining these control
+parameters is separated from applying them, so that the behavior of all cars can be determined before any car changes.
 
 """
 
-from typing import List, Tuple
+from typing import List, NamedTuple, Optional, Tuple
+from car_spec import CarSpec
 from goal import Goal
+from goal_field import GoalField
 from vector import Vector
 from math import radians, tan, inf
 from wall import Wall
 
 
+class Behavior(NamedTuple):
+    """The goal state and control parameters of a car as determined from the state of its neighbors."""
+
+    goal_index: int
+    goal_reached: bool
+    flocking_vector: Vector
+    steering_change: float
+
+
 class Car:
 
-    def __init__(self, length: float, width: float, wheelbase: float, max_velocity: float, max_acceleration: float,
-                 max_steering_angle: float, max_steering_change: float, x: float = 0, y: float = 0, angle: float = 0,
-                 velocity: float = 0, steering_angle: float = 0, acceleration: float = 0, steering_change: float = 0):
+    __slots__ = ['spec', 'x', 'y', 'direction', 'steering_angle', 'velocity', 'steering_change', 'acceleration',
+                 'overlapping_cars', 'goal_index', 'goal_reached', 'flocking_vector']
+
+    def __init__(self, spec: CarSpec, x: float = 0, y: float = 0, angle: float = 0, velocity: float = 0,
+                 steering_angle: float = 0, acceleration: float = 0, steering_change: float = 0, goal_index: int = 0):
         """Initializes a new car object.
 
         Args:
-            length (float): The length of the car in meters.
-            width (float): The width of the car in meters.
-            wheelbase (float): The distance between the front and back axle of the car in meters.
-            max_velocity (float): The maximum velocity the car can achieve in meters per second.
-            max_acceleration (float): The maximum acceleration the car can achieve in meters per second squared.
-            max_steering_angle (float): The maximum possible angle the wheels of the car can rotate in degrees.
-            max_steering_change (float): The maximum speed with which the wheel angle of the car can change in degrees
-                per second.
+            spec (CarSpec): The type of the car, which may be shared with other cars.
             x (float): The x-value of the initial position of the car in meters.
             y (float): The y-value of the initial position of the car in meters.
             angle (float): The initial angle of the car relative to the positive x-axis.
@@ -40,11 +48,10 @@ class Car:
             steering_angle (float): The initial angle of the wheels of the car in degrees.
             acceleration (float): The initial acceleration of the car in meters per second squared.
             steering_change (float): The initial change of wheel angle in degrees per seconds.
+            goal_index (int): The index of the goal in the world that the car initially steers towards.
 
         """
-        self.length: float = length
-        self.width: float = width
-        self.wheelbase: float = wheelbase
+        self.spec: CarSpec = spec
 
         self.x: float = x
         self.y: float = y
@@ -56,12 +63,8 @@ class Car:
 
         self.acceleration: float = acceleration
 
-        self.max_velocity: float = max_velocity
-        self.max_acceleration: float = max_acceleration
-        self.max_steering_angle: float = radians(max_steering_angle)
-        self.max_steering_change: float = radians(max_steering_change)
-
         self.overlapping_cars: List[Car] = []
+        self.goal_index: int = goal_index
         self.goal_reached: bool = False
         self.flocking_vector: Vector = Vector()
 
@@ -74,7 +77,8 @@ class Car:
         """
         x_change = self.velocity * self.direction.x
         y_change = self.velocity * self.direction.y
-        angle_change = tan(self.steering_angle) * self.velocity / self.wheelbase
+        spec = self.spec
+        angle_change = tan(self.steering_angle) * self.velocity / spec.wheelbase
 
         self.x = self.x + x_change * dt
         self.y = self.y + y_change * dt
@@ -83,68 +87,184 @@ class Car:
         new_velocity = self.velocity + self.acceleration * dt
         new_steering_angle = self.steering_angle + self.steering_change * dt
 
-        self.velocity = min(self.max_velocity, new_velocity)
-        self.steering_angle = max(-self.max_steering_angle, min(new_steering_angle, self.max_steering_angle))
+        self.velocity = min(spec.max_velocity, new_velocity)
+        self.steering_angle = max(-spec.max_steering_angle, min(new_steering_angle, spec.max_steering_angle))
+
+    def update_midpoint(self, dt: float):
+        """Updates position, direction, velocity and steering angle given a time step, using the midpoint method.
+
+        The position and direction change according to the velocity and steering angle halfway through the time step,
+        which makes the update second order accurate instead of first order accurate.
 
-    def adjust_behavior(self, neighbors: List[Tuple['Car', float]], goal: Goal, rule_weights: List[float]):
+        Args:
+            dt (float): The amount of time in seconds to progress the simulation.
+
+        """
+        spec = self.spec
+        half_dt = dt / 2
+        angle_change = tan(self.steering_angle) * self.velocity / spec.wheelbase
+        mid_direction = self.direction.rotate_radians(angle_change * half_dt)
+        mid_velocity = min(spec.max_velocity, self.velocity + self.acceleration * half_dt)
+        mid_steering_angle = max(-spec.max_steering_angle,
+                                 min(self.steering_angle + self.steering_change * half_dt, spec.max_steering_angle))
+        mid_angle_change = tan(mid_steering_angle) * mid_velocity / spec.wheelbase
+
+        self.x = self.x + mid_velocity * mid_direction.x * dt
+        self.y = self.y + mid_velocity * mid_direction.y * dt
+        self.direction = self.direction.rotate_radians(mid_angle_change * dt)
+
+        new_velocity = self.velocity + self.acceleration * dt
+        new_steering_angle = self.steering_angle + self.steering_change * dt
+
+        self.velocity = min(spec.max_velocity, new_velocity)
+        self.steering_angle = max(-spec.max_steering_angle, min(new_steering_angle, spec.max_steering_angle))
+
+    def update_arc(self, dt: float):
+        """Updates position and direction given a time step in seconds, while holding velocity and steering angle.
+
+        With a constant velocity and steering angle, a car follows a circular arc, along which it is moved exactly. The
+        acceleration and steering change of the car are ignored.
+
+        Args:
+            dt (float): The amount of time in seconds to progress the simulation.
+
+        """
+        angle_change = tan(self.steering_angle) * self.velocity / self.spec.wheelbase * dt
+        new_direction = self.direction.rotate_radians(angle_change)
+        if abs(angle_change) < 1e-9:
+            self.x = self.x + self.velocity * self.direction.x * dt
+            self.y = self.y + self.velocity * self.direction.y * dt
+        else:
+            radius = self.velocity * dt / angle_change
+            self.x = self.x + radius * (new_direction.y - self.direction.y)
+            self.y = self.y + radius * (self.direction.x - new_direction.x)
+        self.direction = new_direction
+
+    def adjust_behavior(self, neighbors: List[Tuple['Car', float]], goal: Goal, rule_weights: List[float],
+                        goal_field: Optional[GoalField] = None):
         """Changes the control parameters of this car given its neighbors, its goal and the flocking rule weights.
 
-        First, it is determined if the car has reached its goal yet. Next, the flocking forces experienced are
-        calculated, of which the weighted average is taken to obtain the final flocking vector. This final vector is
-        used to determine the steering change.
+        The new control parameters are determined by determine_behavior and applied immediately.
 
         Args:
             neighbors (List[Tuple[Car, float]]): A list of neighboring cars and the distance between this car and each
                 respective neighboring car.
-            goal (Goal): The goal that this car should steer towards.
+            goal (Goal): The goal that this car should steer towards, i.e., the goal at the goal index of this car.
             rule_weights (List[float]): A list with the weights of each flocking force. The respective flocking forces
                 are [Separation, Alignment, Cohesion, Goal].
+            goal_field (Optional[GoalField]): The precomputed field leading to the goal around walls, or None to steer
+                towards the goal in a straight line.
 
         """
+        self.apply_behavior(self.determine_behavior(neighbors, goal, rule_weights, goal_field))
+
+    def determine_behavior(self, neighbors: List[Tuple['Car', float]], goal: Goal, rule_weights: List[float],
+                           goal_field: Optional[GoalField] = None, finished_counts: Optional[List[int]] = None,
+                           offsets: Optional[List[Tuple[float, float]]] = None) -> 'Behavior':
+        """Determines the control parameters of this car given its neighbors, its goal and the flocking rule weights.
+
+        First, it is determined if the car has reached its goal yet. A car reaching a waypoint switches to the next goal
+        of the route, while a car reaching a final destination is finished. A car is also finished once a neighbor
+        heading for the same goal is finished, so the neighbors are only inspected if any car heading for that goal is
+        finished. Next, the flocking forces experienced are calculated, of which the weighted average is taken to
+        obtain the final flocking vector. This final vector is used to determine the steering change.
+
+        Neither this car nor its neighbors are changed, so the behavior of all cars can be determined from the same
+        state of the world, in any order.
+
+        Args:
+            neighbors (List[Tuple[Car, float]]): A list of neighboring cars and the distance between this car and each
+                respective neighboring car.
+            goal (Goal): The goal that this car should steer towards, i.e., the goal at the goal index of this car.
+            rule_weights (List[float]): A list with the weights of each flocking force. The respective flocking forces
+                are [Separation, Alignment, Cohesion, Goal].
+            goal_field (Optional[GoalField]): The precomputed field leading to the goal around walls, or None to steer
+                towards the goal in a straight line.
+            finished_counts (Optional[List[int]]): The amount of finished cars heading for each goal, or None to always
+                inspect the neighbors.
+            offsets (Optional[List[Tuple[float, float]]]): For each neighboring car, the known differences between the
+                x and y position of this car and those of the neighboring car, or None to determine them.
+
+        Returns:
+            Behavior: The new goal state and control parameters of this car.
+
+        """
+        goal_index = self.goal_index
+        goal_reached = self.goal_reached
         if goal.active:
-            goal_force = self.goal_force(goal)
-            if goal_force.get_length() < self.length:
-                self.goal_reached = True
+            goal_force = self.goal_force(goal, goal_field)
+            if goal_field is None:
+                goal_distance = goal_force.get_length()
+            else:
+                goal_distance = Vector(goal.x - self.x, goal.y - self.y).get_length()
+            if goal_distance < self.spec.length:
+                if goal.next_goal is None:
+                    goal_reached = True
+                else:
+                    goal_index = goal.next_goal
         else:
             goal_force = Vector(0.0, 0.0)
 
-        if not self.goal_reached:
+        if not goal_reached and (finished_counts is None or finished_counts[goal_index] > 0):
             for neighbor in neighbors:
-                self.goal_reached = self.goal_reached or neighbor[0].goal_reached
+                n = neighbor[0]
+                if n.goal_reached and n.goal_index == goal_index:
+                    goal_reached = True
 
-        separation_force = self.separation(neighbors)
+        separation_force = self.separation(neighbors, offsets)
         alignment_force = self.alignment(neighbors)
         cohesion_force = self.cohesion(neighbors)
 
-        self.flocking_vector = separation_force * rule_weights[0] + alignment_force * rule_weights[1] + \
+        flocking_vector = separation_force * rule_weights[0] + alignment_force * rule_weights[1] + \
             cohesion_force * rule_weights[2] + goal_force * rule_weights[3]
 
         steering_direction = self.direction.rotate_radians(self.steering_angle)
 
-        if self.flocking_vector == Vector(0, 0):
+        if flocking_vector == Vector(0, 0):
             angle_dif = 0
         else:
-            angle_dif = steering_direction.angle_to(self.flocking_vector)
+            angle_dif = steering_direction.angle_to(flocking_vector)
 
+        max_steering_change = self.spec.max_steering_change
         if angle_dif > 0:
-            self.steering_change = self.max_steering_change
+            steering_change = max_steering_change
         elif angle_dif < 0:
-            self.steering_change = -self.max_steering_change
+            steering_change = -max_steering_change
         elif self.steering_angle > 0:
-            self.steering_change = -self.max_steering_change
+            steering_change = -max_steering_change
         else:
-            self.steering_change = self.max_steering_change
+            steering_change = max_steering_change
 
-    def goal_force(self, goal: Goal) -> 'Vector':
+        return Behavior(goal_index, goal_reached, flocking_vector, steering_change)
+
+    def apply_behavior(self, behavior: 'Behavior'):
+        """Changes the goal state and control parameters of this car to the given behavior.
+
+        Args:
+            behavior (Behavior): The behavior as determined by determine_behavior.
+
+        """
+        self.goal_index = behavior.goal_index
+        self.goal_reached = behavior.goal_reached
+        self.flocking_vector = behavior.flocking_vector
+        self.steering_change = behavior.steering_change
+
+    def goal_force(self, goal: Goal, goal_field: Optional[GoalField] = None) -> 'Vector':
         """Determines the force this car experiences to towards the specified goal.
 
+        Without a goal field, the force points towards the goal in a straight line. With a goal field, the force
+        follows the shortest path around walls, obtained with a single lookup in the precomputed field.
+
         Args:
             goal (Goal): The goal that this car should steer towards.
+            goal_field (Optional[GoalField]): The precomputed field leading to the goal, or None.
 
         Returns:
             Vector: A vector representing the force experienced by this car towards the goal.
 
         """
+        if goal_field is not None:
+            return goal_field.force(self.x, self.y)
         return Vector(goal.x - self.x, goal.y - self.y)
 
     def wall_avoidance(self, walls: List[Wall], wall_radius) -> 'Vector':
@@ -181,29 +301,35 @@ class Car:
 
         return resulting_force
 
-    def separation(self, neighbors: List[Tuple['Car', float]]) -> Vector:
+    def separation(self, neighbors: List[Tuple['Car', float]],
+                   offsets: Optional[List[Tuple[float, float]]] = None) -> Vector:
         """Determines the separation force this car experiences given its neighbors.
 
+        Each neighbor pushes this car away with a force inversely proportional to their distance. The distances of the
+        neighbors are used to scale the separation vectors, so they are not computed again, and neither are the
+        differences between the positions if these are known.
+
         Args:
             neighbors (List[Tuple[Car, float]]): A list of neighboring cars and the distance between this car and each
                 respective neighboring car.
+            offsets (Optional[List[Tuple[float, float]]]): For each neighboring car, the differences between the x and y
+                position of this car and those of the neighboring car, or None to determine them.
 
         Returns:
             Vector: A vector representing the separation force experienced by this car.
 
         """
-        resulting_force = Vector()
-        for neighbor in neighbors:
-            distance = neighbor[1]
-            n = neighbor[0]
-            separation_vector = Vector(self.x - n.x, self.y - n.y)
-            if distance == 0:
-                separation_length = inf
-            else:
-                separation_length = 1 / distance
-            separation_force = separation_vector.change_length(separation_length)
-            resulting_force += separation_force
-        return resulting_force
+        if offsets is None:
+            offsets = [(self.x - n.x, self.y - n.y) for n, _ in neighbors]
+        x_force = 0.0
+        y_force = 0.0
+        for (_, distance), (x_dif, y_dif) in zip(neighbors, offsets):
+            if distance == 0 or distance == inf:
+                continue
+            separation_length = 1 / distance
+            x_force += x_dif * separation_length / distance
+            y_force += y_dif * separation_length / distance
+        return Vector(x_force, y_force)
 
     @staticmethod
     def alignment(neighbors: List[Tuple['Car', float]]) -> 'Vector':
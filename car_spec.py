@@ -0,0 +1,66 @@
+"""This module contains functionality to represent a type of car, such as a passenger car or a truck.
+
+A car type is represented by the dimensions and limitations shared by all cars of that type. Cars refer to their type
+instead of storing their own copy of these parameters, so a fleet of many cars only stores the parameters once per type,
+and fleets can consist of cars of different types.
+
+"""
+
+from math import radians
+from typing import List
+
+PARAMETERS = ['length', 'width', 'wheelbase', 'max_velocity', 'max_acceleration', 'max_steering_angle',
+              'max_steering_change']
+
+
+class CarSpec:
+
+    __slots__ = PARAMETERS
+
+    def __init__(self, length: float, width: float, wheelbase: float, max_velocity: float, max_acceleration: float,
+                 max_steering_angle: float, max_steering_change: float):
+        """Initializes a new car type object.
+
+        Args:
+            length (float): The length of the car in meters.
+            width (float): The width of the car in meters.
+            wheelbase (float): The distance between the front and back axle of the car in meters.
+            max_velocity (float): The maximum velocity the car can achieve in meters per second.
+            max_acceleration (float): The maximum acceleration the car can achieve in meters per second squared.
+            max_steering_angle (float): The maximum possible angle the wheels of the car can rotate in degrees.
+            max_steering_change (float): The maximum speed with which the wheel angle of the car can change in degrees
+                per second.
+
+        """
+        self.length: float = length
+        self.width: float = width
+        self.wheelbase: float = wheelbase
+        self.max_velocity: float = max_velocity
+        self.max_acceleration: float = max_acceleration
+        self.max_steering_angle: float = radians(max_steering_angle)
+        self.max_steering_change: float = radians(max_steering_change)
+
+    def parameters(self) -> List[float]:
+        """Lists the parameters of this car type as represented in the simulation, with angles in radians.
+
+        Returns:
+            List[float]: The parameters in the order of PARAMETERS.
+
+        """
+        return [getattr(self, parameter) for parameter in PARAMETERS]
+
+    @classmethod
+    def from_parameters(cls, parameters: List[float]) -> 'CarSpec':
+        """Creates a car type from parameters as listed by the parameters method.
+
+        Args:
+            parameters (List[float]): The parameters in the order of PARAMETERS, with angles in radians.
+
+        Returns:
+            CarSpec: A car type with exactly the given parameters.
+
+        """
+        spec = cls.__new__(cls)
+        for parameter, value in zip(PARAMETERS, parameters):
+            setattr(spec, parameter, value)
+        return spec
@@ -26,7 +26,8 @@ def draw_car(car: Car, image: Surface, vector_color: Color, surface: Surface, pi
         pixel_meter_ratio (float): The amount of pixels corresponding to one meter.
 
     """
-    resized_image = scale(image, (round(car.length * pixel_meter_ratio), round(car.width * pixel_meter_ratio)))
+    spec = car.spec
+    resized_image = scale(image, (round(spec.length * pixel_meter_ratio), round(spec.width * pixel_meter_ratio)))
     rotated_image = rotate(resized_image, car.direction.get_degrees())
     rect = rotated_image.get_rect()
     surface_x = car.x * pixel_meter_ratio - rect.width / 2.0
@@ -0,0 +1,567 @@
+"""This module contains functionality to update a world using multiple processes, for very large amounts of cars.
+
+The plane is divided into vertical strips, or tiles, each of which is owned by a worker process. A worker determines the
+behavior and movement of the cars it owns. The state of all cars is kept in shared memory, in two buffers: during a
+step, workers read the state of the previous step from one buffer and write the new state of their cars to the other.
+Each worker only reads the cars within a halo around its own cars, placing them in a spatial grid to find neighbors.
+When the neighborhood of a car cannot be determined with certainty from the halo, the worker falls back to comparing
+the distances to all cars, so neighborhoods are always exact. After moving, workers report the pairs of cars close
+enough to overlap, from which the collisions are counted. As the flock migrates, the tiles are periodically rebalanced
+so that every worker owns an equal share of the cars.
+
+Since all behavior is determined from the state of the previous step, the results are identical to those of a world in
+double-buffered mode. Goals, walls, car types, the control interval and the precision are considered fixed while the
+distributed world is in use.
+
+"""
+
+from math import inf, sqrt
+from multiprocessing import Pipe, Process
+from multiprocessing.connection import Connection
+from multiprocessing.shared_memory import SharedMemory
+from typing import List, Optional, Set, Tuple
+from car import Car
+from car_spec import CarSpec
+from goal import Goal
+from goal_field import GoalFieldCache
+from precision import PrecisionPolicy
+from spatial_grid import SpatialGrid
+from vector import Vector
+from wall import Wall
+from world import World, plans_at_step
+
+STATE_FIELDS = ['x', 'y', 'direction_x', 'direction_y', 'steering_angle', 'velocity', 'steering_change',
+                'acceleration', 'flocking_x', 'flocking_y', 'goal_index', 'goal_reached']
+
+X, Y, DIRECTION_X, DIRECTION_Y, STEERING_ANGLE, VELOCITY, STEERING_CHANGE, ACCELERATION, FLOCKING_X, FLOCKING_Y, \
+    GOAL_INDEX, GOAL_REACHED = range(len(STATE_FIELDS))
+
+
+def state_fields(values: memoryview, car_count: int, buffer: int) -> List[memoryview]:
+    """Determines the views on each state field of the cars within one of the two state buffers.
+
+    Args:
+        values (memoryview): The shared memory, viewed as doubles.
+        car_count (int): The amount of cars.
+        buffer (int): The index of the buffer, either 0 or 1.
+
+    Returns:
+        List[memoryview]: For each state field, a view on the values of all cars.
+
+    """
+    offset = buffer * len(STATE_FIELDS) * car_count
+    return [values[offset + field * car_count:offset + (field + 1) * car_count] for field in range(len(STATE_FIELDS))]
+
+
+def write_car(state: List[memoryview], i: int, car: Car):
+    """Writes the state of a car into a state buffer.
+
+    Args:
+        state (List[memoryview]): The views on each state field of the buffer.
+        i (int): The index of the car.
+        car (Car): The car to write the state of.
+
+    """
+    state[X][i] = car.x
+    state[Y][i] = car.y
+    state[DIRECTION_X][i] = car.direction.x
+    state[DIRECTION_Y][i] = car.direction.y
+    state[STEERING_ANGLE][i] = car.steering_angle
+    state[VELOCITY][i] = car.velocity
+    state[STEERING_CHANGE][i] = car.steering_change
+    state[ACCELERATION][i] = car.acceleration
+    state[FLOCKING_X][i] = car.flocking_vector.x
+    state[FLOCKING_Y][i] = car.flocking_vector.y
+    state[GOAL_INDEX][i] = car.goal_index
+    state[GOAL_REACHED][i] = car.goal_reached
+
+
+def read_car(state: List[memoryview], i: int, car: Car):
+    """Reads the state of a car from a state buffer.
+
+    Args:
+        state (List[memoryview]): The views on each state field of the buffer.
+        i (int): The index of the car.
+        car (Car): The car to read the state into.
+
+    """
+    car.x = state[X][i]
+    car.y = state[Y][i]
+    car.direction = Vector(state[DIRECTION_X][i], state[DIRECTION_Y][i])
+    car.steering_angle = state[STEERING_ANGLE][i]
+    car.velocity = state[VELOCITY][i]
+    car.steering_change = state[STEERING_CHANGE][i]
+    car.acceleration = state[ACCELERATION][i]
+    car.flocking_vector = Vector(state[FLOCKING_X][i], state[FLOCKING_Y][i])
+    car.goal_index = int(state[GOAL_INDEX][i])
+    car.goal_reached = bool(state[GOAL_REACHED][i])
+
+
+class TileWorker:
+
+    def __init__(self, memory_name: str, specs: List[CarSpec], spec_indices: List[int], goals: List[Goal],
+                 walls: List[Wall], width: float, height: float, field_resolution: Optional[float], halo: float,
+                 cell_size: float, control_interval: int, staggered_control: bool, precision: PrecisionPolicy):
+        """Initializes a new tile worker object, attached to the shared car state.
+
+        Args:
+            memory_name (str): The name of the shared memory containing the car state.
+            specs (List[CarSpec]): The car types.
+            spec_indices (List[int]): The index of the type of each car.
+            goals (List[Goal]): The goals of the world.
+            walls (List[Wall]): The walls of the world.
+            width (float): The width of the world in meters.
+            height (float): The height of the world in meters.
+            field_resolution (Optional[float]): The resolution of the goal fields, or None if cars steer towards their
+                goals in a straight line.
+            halo (float): The distance in meters around the owned cars within which other cars are read.
+            cell_size (float): The cell size of the spatial grid in meters.
+            control_interval (int): The amount of steps between two behavior adjustments of a car.
+            staggered_control (bool): True if the cars re-plan at different steps, False if all cars re-plan at once.
+            precision (PrecisionPolicy): The precision at which the state of the cars is kept.
+
+        """
+        self.memory: SharedMemory = SharedMemory(name=memory_name)
+        self.values: memoryview = self.memory.buf.cast('d')
+        self.cars: List[Car] = [Car(specs[spec_index]) for spec_index in spec_indices]
+        self.goals: List[Goal] = goals
+        self.walls: List[Wall] = walls
+        self.width: float = width
+        self.height: float = height
+        self.goal_fields: Optional[GoalFieldCache] = None
+        if field_resolution is not None:
+            self.goal_fields = GoalFieldCache(field_resolution)
+        self.halo: float = max([halo] + [spec.length for spec in specs])
+        self.cell_size: float = cell_size
+        self.control_interval: int = control_interval
+        self.staggered_control: bool = staggered_control
+        self.precision: PrecisionPolicy = precision
+        self.owned: List[int] = []
+
+    def region(self, xs: memoryview) -> Tuple[List[int], float, float]:
+        """Determines the cars within the halo around the owned cars.
+
+        Args:
+            xs (memoryview): The x position of every car.
+
+        Returns:
+            List[int]: The indices of the cars whose x position lies within the halo around the owned cars.
+            float: The lowest x position within the halo.
+            float: The highest x position within the halo.
+
+        """
+        if not self.owned:
+            return [], 0.0, 0.0
+        low = min(xs[i] for i in self.owned) - self.halo
+        high = max(xs[i] for i in self.owned) + self.halo
+        return [i for i in range(len(xs)) if low <= xs[i] <= high], low, high
+
+    def step(self, buffer: int, step_count: int, dt: float, neighbor_count: int,
+             rule_weights: List[float]) -> Tuple[int, List[int]]:
+        """Determines the behavior and movement of the owned cars, writing their new state to the other buffer.
+
+        Args:
+            buffer (int): The index of the buffer containing the state of the previous step.
+            step_count (int): The amount of steps the world has been updated before this step.
+            dt (float): The amount of time in seconds to progress the simulation.
+            neighbor_count (int): The amount of cars to incorporate into the neighborhood of each car.
+            rule_weights (List[float]): A list with the weights of each flocking force. The respective flocking forces
+                are [Separation, Alignment, Cohesion, Goal].
+
+        Returns:
+            int: The amount of owned cars that have reached their final goal.
+            List[int]: The indices of the owned cars that reached their final goal during this step.
+
+        """
+        car_count = len(self.cars)
+        state = state_fields(self.values, car_count, buffer)
+        new_state = state_fields(self.values, car_count, 1 - buffer)
+        xs = state[X]
+        ys = state[Y]
+
+        region, low, high = self.region(xs)
+        refreshed = [False] * car_count
+        for i in region:
+            read_car(state, i, self.cars[i])
+            refreshed[i] = True
+        grid = SpatialGrid(self.cell_size, xs, ys, region)
+
+        if self.goal_fields is None:
+            fields = [None] * len(self.goals)
+        else:
+            fields = self.goal_fields.fields_for(self.goals, self.walls, self.width, self.height)
+
+        behaviors = []
+        for i in self.owned:
+            car = self.cars[i]
+            if not plans_at_step(i, step_count, self.control_interval, self.staggered_control):
+                behaviors.append(None)
+                continue
+            bound = inf if len(region) == car_count else min(xs[i] - low, high - xs[i])
+            nearest, certain = grid.nearest(i, neighbor_count, bound)
+            if not certain:
+                nearest = self.scan_nearest(i, neighbor_count, xs, ys)
+                for _, j in nearest:
+                    if not refreshed[j]:
+                        read_car(state, j, self.cars[j])
+                        refreshed[j] = True
+            neighbors = [(self.cars[j], self.precision.round(distance)) for distance, j in nearest]
+            neighbors += [(car, inf)] * (neighbor_count - len(neighbors))
+            behaviors.append(car.determine_behavior(neighbors, self.goals[car.goal_index], rule_weights,
+                                                    fields[car.goal_index]))
+
+        finished_count = 0
+        arrivals = []
+        for i, behavior in zip(self.owned, behaviors):
+            car = self.cars[i]
+            if behavior is not None:
+                if behavior.goal_reached and not car.goal_reached:
+                    arrivals.append(i)
+                car.apply_behavior(behavior)
+            car.update(dt)
+            self.precision.round_cars((car,))
+            write_car(new_state, i, car)
+            if car.goal_reached:
+                finished_count += 1
+        return finished_count, arrivals
+
+    def close_pairs(self, buffer: int) -> List[Tuple[int, int, bool]]:
+        """Determines the pairs of cars close enough to overlap, for which the owned car has the lowest index.
+
+        Args:
+            buffer (int): The index of the buffer containing the state to check.
+
+        Returns:
+            List[Tuple[int, int, bool]]: The indices of both cars for each pair of cars whose distance is at most their
+                average length, and if the distance is strictly less than their average length.
+
+        """
+        car_count = len(self.cars)
+        state = state_fields(self.values, car_count, buffer)
+        xs = state[X]
+        ys = state[Y]
+        region, _, _ = self.region(xs)
+        grid = SpatialGrid(self.cell_size, xs, ys, region)
+
+        pairs = []
+        for i in self.owned:
+            car1_length = self.cars[i].spec.length
+            for j in grid.within(i, self.halo):
+                if j > i:
+                    collision_distance = (car1_length + self.cars[j].spec.length) / 2
+                    x_dif = xs[i] - xs[j]
+                    y_dif = ys[i] - ys[j]
+                    distance = sqrt(x_dif ** 2 + y_dif ** 2)
+                    if distance <= collision_distance:
+                        pairs.append((i, j, distance < collision_distance))
+        return pairs
+
+    @staticmethod
+    def scan_nearest(index: int, neighbor_count: int, xs: memoryview, ys: memoryview) -> List[Tuple[float, int]]:
+        """Determines the nearest cars of a car by comparing the distances to all cars.
+
+        Args:
+            index (int): The index of the car to find the nearest cars of.
+            neighbor_count (int): The amount of nearest cars to find.
+            xs (memoryview): The x position of every car.
+            ys (memoryview): The y position of every car.
+
+        Returns:
+            List[Tuple[float, int]]: The distance and index of the nearest cars, ordered by distance and then index.
+
+        """
+        x = xs[index]
+        y = ys[index]
+        candidates = []
+        for i in range(len(xs)):
+            if i != index:
+                x_dif = x - xs[i]
+                y_dif = y - ys[i]
+                candidates.append((sqrt(x_dif ** 2 + y_dif ** 2), i))
+        candidates.sort()
+        return candidates[:neighbor_count]
+
+    def close(self):
+        """Detaches this worker from the shared car state."""
+        self.values.release()
+        self.memory.close()
+
+
+def run_tile_worker(connection: Connection, *worker_arguments: ...):
+    """Runs a tile worker, processing the commands received over the given connection until told to stop.
+
+    Args:
+        connection (Connection): The connection to receive commands over and send results back over.
+        worker_arguments (...): The arguments to initialize the tile worker with.
+
+    """
+    worker = TileWorker(*worker_arguments)
+    try:
+        while True:
+            command = connection.recv()
+            if command[0] == 'step':
+                _, buffer, owned, step_count, dt, neighbor_count, rule_weights = command
+                if owned is not None:
+                    worker.owned = owned
+                connection.send(worker.step(buffer, step_count, dt, neighbor_count, rule_weights))
+            elif command[0] == 'pairs':
+                connection.send(worker.close_pairs(command[1]))
+            else:
+                break
+    finally:
+        worker.close()
+        connection.close()
+
+
+class DistributedWorld:
+
+    def __init__(self, world: World, worker_count: int, rebalance_interval: int = 50, halo: float = 20.0,
+                 cell_size: float = 10.0):
+        """Initializes a new distributed world object, starting its worker processes.
+
+        The cars of the given world are only updated when synchronize is called.
+
+        Args:
+            world (World): The world to update. Its performance measures and step count are updated every step.
+            worker_count (int): The amount of worker processes, each owning one tile.
+            rebalance_interval (int): The amount of steps after which the tiles are rebalanced.
+            halo (float): The distance in meters around its cars within which a worker reads other cars. It is at least
+                the length of the longest car, so all overlapping cars are found.
+            cell_size (float): The cell size of the spatial grids of the workers in meters.
+
+        """
+        self.world: World = world
+        world.track_arrivals()
+        self.worker_count: int = worker_count
+        self.rebalance_interval: int = rebalance_interval
+        self.car_count: int = len(world.cars)
+        self.buffer: int = 0
+        self.owned: Optional[List[List[int]]] = None
+
+        self.memory: SharedMemory = SharedMemory(create=True, size=max(8, 2 * len(STATE_FIELDS) * self.car_count * 8))
+        self.values: memoryview = self.memory.buf.cast('d')
+        state = state_fields(self.values, self.car_count, self.buffer)
+        for i, car in enumerate(world.cars):
+            write_car(state, i, car)
+
+        car_indices = {id(car): i for i, car in enumerate(world.cars)}
+        self.overlaps: Set[Tuple[int, int]] = set()
+        for i, car in enumerate(world.cars):
+            for other in car.overlapping_cars:
+                self.overlaps.add((i, car_indices[id(other)]))
+
+        specs = []
+        spec_indices = {}
+        for car in world.cars:
+            if id(car.spec) not in spec_indices:
+                spec_indices[id(car.spec)] = len(specs)
+                specs.append(car.spec)
+        field_resolution = None if world.goal_fields is None else world.goal_fields.resolution
+        worker_arguments = (self.memory.name, specs, [spec_indices[id(car.spec)] for car in world.cars], world.goals,
+                            world.walls, world.width, world.height, field_resolution, halo, cell_size,
+                            world.control_interval, world.staggered_control, world.precision)
+
+        self.connections: List[Connection] = []
+        self.processes: List[Process] = []
+        for _ in range(worker_count):
+            parent_connection, child_connection = Pipe()
+            process = Process(target=run_tile_worker, args=(child_connection,) + worker_arguments, daemon=True)
+            process.start()
+            child_connection.close()
+            self.connections.append(parent_connection)
+            self.processes.append(process)
+
+    def __enter__(self) -> 'DistributedWorld':
+        return self
+
+    def __exit__(self, *exception_info: ...):
+        self.close()
+
+    @property
+    def collision_distribution(self) -> List[int]:
+        """The collisions measured in the distributed world.
+
+        Returns:
+            List[int]: Time series of the collisions measured during the simulation.
+
+        """
+        return self.world.collision_distribution
+
+    @property
+    def flocking_performance_distribution(self) -> List[float]:
+        """The flocking density measured in the distributed world.
+
+        Returns:
+            List[float]: Time series of the flocking density measured during the simulation.
+
+        """
+        return self.world.flocking_performance_distribution
+
+    @property
+    def step_count(self) -> int:
+        """The amount of steps the distributed world has progressed.
+
+        Returns:
+            int: The step count of the world.
+
+        """
+        return self.world.step_count
+
+    @property
+    def finished_count(self) -> int:
+        """The amount of cars in the distributed world that have reached their final goal.
+
+        Returns:
+            int: The amount of finished cars after the latest step.
+
+        """
+        return self.world.finished_count
+
+    @property
+    def phase_times(self) -> None:
+        """The time spent on each phase of the updates, which the distributed world does not keep.
+
+        Returns:
+            None: Always None.
+
+        """
+        return None
+
+    def has_active_goal(self) -> bool:
+        """Determines if any car in the distributed world steers towards an active goal.
+
+        Returns:
+            bool: True if the goal of at least one car is active, False otherwise.
+
+        """
+        self.synchronize()
+        return self.world.has_active_goal()
+
+    def update(self, dt: float, neighbor_count: int, rule_weights: List[float]) -> bool:
+        """Updates the distributed world according to the provided time step in seconds.
+
+        Determines if all cars have reached their final goal, returning True if so. Cars heading for an inactive goal
+        are not waited for. Also determines and stores performance measures after updating.
+
+        Args:
+            dt (float): The amount of time in seconds to progress the simulation.
+            neighbor_count (int): The amount of cars to incorporate into the neighborhood of each cars.
+            rule_weights (List[float]): A list with the weights of each flocking force. The respective flocking forces
+                are [Separation, Alignment, Cohesion, Goal].
+
+        Returns:
+            bool: True if all cars have reached their final goal as a result of this update, False otherwise.
+
+        """
+        owned = [None] * self.worker_count
+        if self.owned is None or self.world.step_count % self.rebalance_interval == 0:
+            self.rebalance()
+            owned = self.owned
+
+        for connection, worker_owned in zip(self.connections, owned):
+            connection.send(('step', self.buffer, worker_owned, self.world.step_count, dt, neighbor_count,
+                             rule_weights))
+        finished_count = 0
+        for connection in self.connections:
+            worker_finished_count, arrivals = connection.recv()
+            finished_count += worker_finished_count
+            for i in arrivals:
+                self.world.arrival_steps[i] = self.world.step_count + 1
+        self.buffer = 1 - self.buffer
+
+        for connection in self.connections:
+            connection.send(('pairs', self.buffer))
+        new_overlaps = set()
+        collision_count = 0
+        for connection in self.connections:
+            for i, j, overlapping in connection.recv():
+                if (i, j) in self.overlaps:
+                    new_overlaps.add((i, j))
+                elif overlapping:
+                    new_overlaps.add((i, j))
+                    collision_count += 1
+        self.overlaps = new_overlaps
+
+        self.world.collision_distribution.append(collision_count)
+        self.world.flocking_performance_distribution.append(self.world.precision.round(self.flocking_performance()))
+        self.world.step_count += 1
+        self.world.finished_count = finished_count
+        trajectory = self.world.trajectory
+        if trajectory is not None and self.world.step_count % trajectory.interval == 0:
+            self.synchronize()
+            trajectory.record(self.world)
+        return self.all_finished()
+
+    def all_finished(self) -> bool:
+        """Determines if every car has finished, not counting cars heading for an inactive goal.
+
+        Returns:
+            bool: True if every car has reached its final goal or is heading for an inactive goal, False otherwise.
+
+        """
+        if self.world.finished_count == self.car_count:
+            return True
+        active = [goal.active for goal in self.world.goals]
+        if all(active):
+            return False
+        state = state_fields(self.values, self.car_count, self.buffer)
+        return all(goal_reached or not active[int(goal_index)]
+                   for goal_reached, goal_index in zip(state[GOAL_REACHED], state[GOAL_INDEX]))
+
+    def rebalance(self):
+        """Divides the plane into vertical tiles containing an equal amount of cars, assigning one to each worker."""
+        xs = state_fields(self.values, self.car_count, self.buffer)[X]
+        order = sorted(range(self.car_count), key=lambda i: xs[i])
+        tile_size = -(-self.car_count // self.worker_count)
+        self.owned = [sorted(order[i * tile_size:(i + 1) * tile_size]) for i in range(self.worker_count)]
+
+    def flocking_performance(self) -> float:
+        """Determines the mean squared error between the position of individual cars and the center of all cars.
+
+        Returns:
+            float: The mean squared error of distance between cars and the center of all cars.
+
+        """
+        state = state_fields(self.values, self.car_count, self.buffer)
+        xs = state[X]
+        ys = state[Y]
+        sum_x = 0
+        sum_y = 0
+        for i in range(self.car_count):
+            sum_x += xs[i]
+            sum_y += ys[i]
+        avg_x = sum_x / self.car_count
+        avg_y = sum_y / self.car_count
+
+        sum_distance = 0
+        for i in range(self.car_count):
+            x_dif = xs[i] - avg_x
+            y_dif = ys[i] - avg_y
+            sum_distance += x_dif ** 2 + y_dif ** 2
+        return sum_distance / self.car_count
+
+    def synchronize(self):
+        """Updates the cars of the world to the current state of the distributed world."""
+        state = state_fields(self.values, self.car_count, self.buffer)
+        cars = self.world.cars
+        for i, car in enumerate(cars):
+            read_car(state, i, car)
+            car.overlapping_cars = []
+        for i, j in sorted(self.overlaps):
+            cars[i].overlapping_cars.append(cars[j])
+        self.world.track_arrivals()
+
+    def close(self):
+        """Synchronizes the cars of the world, stops the worker processes and releases the shared memory."""
+        if not self.processes:
+            return
+        self.synchronize()
+        for connection in self.connections:
+            connection.send(('close',))
+            connection.close()
+        for process in self.processes:
+            process.join()
+        self.processes = []
+        self.values.release()
+        self.memory.close()
+        self.memory.unlink()
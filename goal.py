@@ -3,20 +3,33 @@
 A goal is represented as a point in the world, with an x and y position. A goal can be
 activated or deactivated. Cars will only flock towards a goal if it is active.
 
+Goals can be chained into routes of waypoints. A goal that refers to a next goal is a
+waypoint: a car arriving at it switches to the next goal instead of finishing. A goal
+without a next goal is a final destination.
+
 """
 
+from __future__ import annotations
+
+TYPE_CHECKING = False
+if TYPE_CHECKING:
+    from typing import Optional
+
 
 class Goal:
 
-    def __init__(self, x: float, y: float, active: bool):
+    def __init__(self, x: float, y: float, active: bool, next_goal: Optional[int] = None):
         """Initializes a new goal object.
 
         Args:
             x (float): The x position of the goal.
             y (float): The y position of the goal.
             active (bool): Specifies if cars should flock to the goal or not.
+            next_goal (Optional[int]): The index of the goal in the world that cars continue to after reaching this
+                goal, or None if this goal is a final destination.
 
         """
         self.x: float = x
         self.y: float = y
         self.active: bool = active
+        self.next_goal: Optional[int] = next_goal
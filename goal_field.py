@@ -0,0 +1,243 @@
+"""This module contains functionality to steer cars towards a goal around walls using a precomputed flow field.
+
+The world is rasterized into a grid of nodes with a configurable resolution in nodes per meter. Nodes close to a wall
+are blocked. The shortest path distance from every node to the goal is precomputed with Dijkstra's algorithm over the
+8-connected grid. Every node then stores a vector pointing to its neighbor closest to the goal, with a length equal to
+its path distance to the goal. The goal force of a car is obtained by bilinear interpolation of the vectors of the four
+nodes surrounding it, so steering around walls costs a constant amount of work per car during the simulation.
+
+Fields only depend on the position of the goal and the layout of the walls. They are therefore cached per goal and wall
+layout, and recomputed once either changes.
+
+"""
+
+from array import array
+from heapq import heappush, heappop
+from math import ceil, floor, sqrt, inf
+from typing import Dict, List, Optional, Tuple
+from goal import Goal
+from vector import Vector
+from wall import Wall
+
+NEIGHBOR_OFFSETS = [(1, 0), (-1, 0), (0, 1), (0, -1), (1, 1), (1, -1), (-1, 1), (-1, -1)]
+
+
+class GoalField:
+
+    def __init__(self, goal: Goal, walls: List[Wall], width: float, height: float, resolution: float):
+        """Initializes a new goal field object, precomputing the distance and flow towards the goal.
+
+        Args:
+            goal (Goal): The goal the field leads towards.
+            walls (List[Wall]): The walls that cars should be led around.
+            width (float): The width of the area covered by the field in meters.
+            height (float): The height of the area covered by the field in meters.
+            resolution (float): The amount of grid nodes per meter.
+
+        """
+        self.goal_x: float = goal.x
+        self.goal_y: float = goal.y
+        self.resolution: float = resolution
+        self.columns: int = int(ceil(width * resolution)) + 1
+        self.rows: int = int(ceil(height * resolution)) + 1
+
+        self.blocked: List[bool] = self.rasterize(walls)
+        self.distances: array = self.compute_distances()
+        self.flow_x: array = array('d', bytes(8 * self.columns * self.rows))
+        self.flow_y: array = array('d', bytes(8 * self.columns * self.rows))
+        self.compute_flow()
+
+    def rasterize(self, walls: List[Wall]) -> List[bool]:
+        """Determines which grid nodes are blocked by the given walls.
+
+        Each wall is sampled at intervals of half a node distance, blocking the four nodes surrounding each sample.
+        This makes walls at least one node thick, so paths cannot cut diagonally through them.
+
+        Args:
+            walls (List[Wall]): The walls to rasterize.
+
+        Returns:
+            List[bool]: For each node, True if it is blocked by a wall, False otherwise.
+
+        """
+        blocked = [False] * (self.columns * self.rows)
+        for wall in walls:
+            x_dif = (wall.x2 - wall.x1) * self.resolution
+            y_dif = (wall.y2 - wall.y1) * self.resolution
+            sample_count = int(ceil(2 * sqrt(x_dif ** 2 + y_dif ** 2))) + 1
+            for sample in range(sample_count + 1):
+                fraction = sample / sample_count
+                grid_x = wall.x1 * self.resolution + x_dif * fraction
+                grid_y = wall.y1 * self.resolution + y_dif * fraction
+                for column in (floor(grid_x), ceil(grid_x)):
+                    for row in (floor(grid_y), ceil(grid_y)):
+                        if 0 <= column < self.columns and 0 <= row < self.rows:
+                            blocked[row * self.columns + column] = True
+        return blocked
+
+    def compute_distances(self) -> array:
+        """Determines the shortest path distance in meters from every grid node to the goal.
+
+        The search starts from the unblocked nodes surrounding the goal, at their straight-line distance to the goal.
+        Nodes that are blocked or cannot reach the goal have an infinite distance.
+
+        Returns:
+            array: The distance of each node to the goal, indexed by row * columns + column.
+
+        """
+        distances = array('d', [inf]) * (self.columns * self.rows)
+        node_distance = 1.0 / self.resolution
+        step_costs = [node_distance * sqrt(dx * dx + dy * dy) for dx, dy in NEIGHBOR_OFFSETS]
+
+        queue = []
+        grid_x = self.goal_x * self.resolution
+        grid_y = self.goal_y * self.resolution
+        for column in (floor(grid_x), ceil(grid_x)):
+            for row in (floor(grid_y), ceil(grid_y)):
+                if 0 <= column < self.columns and 0 <= row < self.rows:
+                    index = row * self.columns + column
+                    if not self.blocked[index]:
+                        distance = sqrt((column - grid_x) ** 2 + (row - grid_y) ** 2) * node_distance
+                        if distance < distances[index]:
+                            distances[index] = distance
+                            heappush(queue, (distance, column, row))
+
+        while queue:
+            distance, column, row = heappop(queue)
+            if distance > distances[row * self.columns + column]:
+                continue
+            for (dx, dy), step_cost in zip(NEIGHBOR_OFFSETS, step_costs):
+                next_column = column + dx
+                next_row = row + dy
+                if not (0 <= next_column < self.columns and 0 <= next_row < self.rows):
+                    continue
+                next_index = next_row * self.columns + next_column
+                if self.blocked[next_index]:
+                    continue
+                if dx != 0 and dy != 0 and (self.blocked[row * self.columns + next_column] or
+                                            self.blocked[next_row * self.columns + column]):
+                    continue
+                next_distance = distance + step_cost
+                if next_distance < distances[next_index]:
+                    distances[next_index] = next_distance
+                    heappush(queue, (next_distance, next_column, next_row))
+        return distances
+
+    def compute_flow(self):
+        """Determines the flow vector of every grid node from the precomputed distances.
+
+        The flow vector of a node points towards its neighbor closest to the goal and has a length equal to the path
+        distance of the node, which mirrors the straight-line goal force away from walls. Nodes from which the goal
+        cannot be reached fall back to the straight-line vector towards the goal.
+
+        """
+        for row in range(self.rows):
+            for column in range(self.columns):
+                index = row * self.columns + column
+                best_distance = self.distances[index]
+                best_dx, best_dy = 0, 0
+                for dx, dy in NEIGHBOR_OFFSETS:
+                    next_column = column + dx
+                    next_row = row + dy
+                    if 0 <= next_column < self.columns and 0 <= next_row < self.rows:
+                        next_distance = self.distances[next_row * self.columns + next_column]
+                        if next_distance < best_distance:
+                            best_distance = next_distance
+                            best_dx, best_dy = dx, dy
+
+                node_x = column / self.resolution
+                node_y = row / self.resolution
+                if best_distance == inf or (best_dx == 0 and best_dy == 0):
+                    self.flow_x[index] = self.goal_x - node_x
+                    self.flow_y[index] = self.goal_y - node_y
+                else:
+                    path_distance = self.distances[index]
+                    if path_distance == inf:
+                        path_distance = best_distance + sqrt(best_dx ** 2 + best_dy ** 2) / self.resolution
+                    step_length = sqrt(best_dx ** 2 + best_dy ** 2)
+                    self.flow_x[index] = best_dx / step_length * path_distance
+                    self.flow_y[index] = best_dy / step_length * path_distance
+
+    def force(self, x: float, y: float) -> Vector:
+        """Determines the goal force at the specified position through bilinear interpolation of the flow vectors.
+
+        Outside of the area covered by the field, the straight-line vector towards the goal is used.
+
+        Args:
+            x (float): The x position in meters.
+            y (float): The y position in meters.
+
+        Returns:
+            Vector: A vector representing the force towards the goal at the specified position.
+
+        """
+        grid_x = x * self.resolution
+        grid_y = y * self.resolution
+        if not (0.0 <= grid_x <= self.columns - 1 and 0.0 <= grid_y <= self.rows - 1):
+            return Vector(self.goal_x - x, self.goal_y - y)
+
+        column = min(int(grid_x), self.columns - 2)
+        row = min(int(grid_y), self.rows - 2)
+        tx = grid_x - column
+        ty = grid_y - row
+        index = row * self.columns + column
+        upper_index = index + self.columns
+
+        flow_x = self.flow_x
+        flow_y = self.flow_y
+        bottom_x = flow_x[index] + (flow_x[index + 1] - flow_x[index]) * tx
+        top_x = flow_x[upper_index] + (flow_x[upper_index + 1] - flow_x[upper_index]) * tx
+        bottom_y = flow_y[index] + (flow_y[index + 1] - flow_y[index]) * tx
+        top_y = flow_y[upper_index] + (flow_y[upper_index + 1] - flow_y[upper_index]) * tx
+        return Vector(bottom_x + (top_x - bottom_x) * ty, bottom_y + (top_y - bottom_y) * ty)
+
+
+class GoalFieldCache:
+
+    def __init__(self, resolution: float = 1.0):
+        """Initializes a new goal field cache object.
+
+        Args:
+            resolution (float): The amount of grid nodes per meter of the cached fields.
+
+        """
+        self.resolution: float = resolution
+        self.fields: Dict[Tuple, GoalField] = {}
+        self.build_count: int = 0
+
+    def fields_for(self, goals: List[Goal], walls: List[Wall], width: float,
+                   height: float) -> List[Optional[GoalField]]:
+        """Determines the field of each of the given goals, only computing fields that are not cached yet.
+
+        Fields of goals that have moved, or of a wall layout that has changed, are discarded.
+
+        Args:
+            goals (List[Goal]): The goals to determine the fields of.
+            walls (List[Wall]): The walls that cars should be led around.
+            width (float): The width of the area covered by the fields in meters.
+            height (float): The height of the area covered by the fields in meters.
+
+        Returns:
+            List[Optional[GoalField]]: The field of each goal, or None for goals that are not active.
+
+        """
+        layout = (width, height, self.resolution, tuple((wall.x1, wall.y1, wall.x2, wall.y2) for wall in walls))
+        used_fields = {}
+        goal_fields = []
+        for goal in goals:
+            if not goal.active:
+                goal_fields.append(None)
+                continue
+            key = (goal.x, goal.y, layout)
+            field = used_fields.get(key) or self.fields.get(key)
+            if field is None:
+                field = GoalField(goal, walls, width, height, self.resolution)
+                self.build_count += 1
+            used_fields[key] = field
+            goal_fields.append(field)
+        self.fields = used_fields
+        return goal_fields
+
+    def invalidate(self):
+        """Discards all cached fields, forcing them to be recomputed."""
+        self.fields = {}
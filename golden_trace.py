@@ -0,0 +1,549 @@
+"""This module contains a harness to validate alternative simulation engines against the reference model.
+
+The reference model is the object-based world in its default configuration: cars adjust their behavior one after the
+other, compare themselves to all other cars to find their neighbors and move with a single Euler update per step, at
+double precision. For a corpus of seeded cases, a golden trace records the state of every car after every step of this
+model, including its flocking vector, goal and whether it has finished, together with the collisions and flocking
+density measured at every step and the step at which each car arrived. The corpus includes a case that continues past
+the moment all cars have arrived, so the arrival of cars and its propagation through the flock are traced, and a case
+in which cars follow a route, so they switch goals at a waypoint.
+
+An engine is any other way of updating the same world, e.g., with a neighbor list, at single precision or distributed
+over worker processes. Each engine is replayed step by step against the golden traces. The report of an engine lists the
+first step at which any state field of any car deviates from the trace by more than a tolerance, the largest error of
+each field, the differences in the measured series and arrival steps and the speed-up of its updates compared with those
+of the reference model. Some engines, such as the level of detail scheduler and single precision, are approximate by
+design; their report shows how far they deviate. Engines that should be exact can be checked in continuous integration,
+as the comparison fails whenever any of them diverges.
+
+The distributed engine always simulates in double-buffered mode, which differs from the reference model by design. So
+that it can be checked exactly as well, it is additionally compared with a trace of each case recorded in
+double-buffered mode, which is reported as the tiled_vs_buffered check and fails the comparison if it diverges.
+
+Golden traces are stored in the same binary format as snapshots, so they can be recorded once and compared against in
+later versions of the code, e.g.:
+python golden_trace.py record traces, followed by python golden_trace.py compare traces
+
+"""
+
+import argparse
+import os
+import sys
+from array import array
+from contextlib import nullcontext
+from time import perf_counter
+from typing import Callable, ContextManager, Dict, List, NamedTuple, Optional, Union
+from binary_format import pack, unpack
+from distributed_world import DistributedWorld
+from integrator import AdaptiveIntegrator
+from lod import LevelOfDetail
+from neighbor_list import NeighborList
+from precision import FLOAT32
+from proximity import Proximity
+from goal import Goal
+from simulation import DEFAULT_CONFIGURATION, SCENARIOS, WORLD_HEIGHT, WORLD_WIDTH, create_scenario, goal_scenario
+from world import World
+
+MAGIC = b'CFGT'
+
+VERSION = 3
+
+TILED_CHECK = 'tiled_vs_buffered'
+
+TRACE_FIELDS = ['x', 'y', 'direction_x', 'direction_y', 'velocity', 'steering_angle', 'acceleration', 'steering_change',
+                'flocking_x', 'flocking_y', 'goal_index', 'goal_reached']
+
+
+class GoldenCase(NamedTuple):
+    """A seeded run of a scenario of which a golden trace is recorded."""
+
+    name: str
+    scenario: str
+    variables: Dict
+    steps: int
+    settings: Dict = {}
+
+
+def route_scenario(simulation_variables: Dict) -> World:
+    """Generates the goal scenario with a waypoint halfway, which cars have to pass before heading for the goal.
+
+    Args:
+        simulation_variables (Dict): The simulation variables of the goal scenario.
+
+    Returns:
+        World: The generated world.
+
+    """
+    world = goal_scenario(simulation_variables)
+    waypoint = world.add_route([Goal(WORLD_WIDTH / 2, WORLD_HEIGHT / 2, True, 0)])
+    for car in world.cars:
+        car.goal_index = waypoint
+    world.track_arrivals()
+    return world
+
+
+GENERATORS = dict(SCENARIOS, route=route_scenario)
+
+CORPUS = [
+    GoldenCase('goal-12', 'goal', {'car_count': 12, 'seed': 3}, 1850),
+    GoldenCase('route-12', 'route', {'car_count': 12, 'seed': 3}, 1200),
+    GoldenCase('goal-40', 'goal', {'car_count': 40, 'seed': 1}, 300),
+    GoldenCase('open-25', 'open', {'car_count': 25, 'seed': 2}, 300),
+    GoldenCase('goal-30-staggered', 'goal', {'car_count': 30, 'seed': 4}, 300,
+               {'control_interval': 4, 'staggered_control': True}),
+]
+
+
+def reference_engine(world: World) -> ContextManager[World]:
+    """Updates a world with the reference model.
+
+    Args:
+        world (World): The world to update.
+
+    Returns:
+        ContextManager[World]: A context providing the world itself.
+
+    """
+    return nullcontext(world)
+
+
+def neighbor_list_engine(world: World) -> ContextManager[World]:
+    """Updates a world with a neighbor list.
+
+    Args:
+        world (World): The world to update.
+
+    Returns:
+        ContextManager[World]: A context providing the world itself.
+
+    """
+    world.neighbor_list = NeighborList()
+    return nullcontext(world)
+
+
+def proximity_engine(world: World) -> ContextManager[World]:
+    """Updates a world with a proximity structure shared by neighbor search and collision counting.
+
+    Args:
+        world (World): The world to update.
+
+    Returns:
+        ContextManager[World]: A context providing the world itself.
+
+    """
+    world.proximity = Proximity()
+    return nullcontext(world)
+
+
+def adaptive_integrator_engine(world: World) -> ContextManager[World]:
+    """Updates a world with the adaptive integrator.
+
+    Args:
+        world (World): The world to update.
+
+    Returns:
+        ContextManager[World]: A context providing the world itself.
+
+    """
+    world.integrator = AdaptiveIntegrator()
+    return nullcontext(world)
+
+
+def level_of_detail_engine(world: World) -> ContextManager[World]:
+    """Updates a world with the level of detail scheduler.
+
+    Args:
+        world (World): The world to update.
+
+    Returns:
+        ContextManager[World]: A context providing the world itself.
+
+    """
+    world.level_of_detail = LevelOfDetail()
+    return nullcontext(world)
+
+
+def float32_engine(world: World) -> ContextManager[World]:
+    """Updates a world at single precision.
+
+    Args:
+        world (World): The world to update.
+
+    Returns:
+        ContextManager[World]: A context providing the world itself.
+
+    """
+    world.precision = FLOAT32
+    world.flocking_performance_distribution = FLOAT32.series(world.flocking_performance_distribution)
+    return nullcontext(world)
+
+
+def double_buffered_engine(world: World) -> ContextManager[World]:
+    """Updates a world in double-buffered mode.
+
+    Args:
+        world (World): The world to update.
+
+    Returns:
+        ContextManager[World]: A context providing the world itself.
+
+    """
+    world.double_buffered = True
+    return nullcontext(world)
+
+
+def distributed_engine(world: World) -> ContextManager[DistributedWorld]:
+    """Updates a world distributed over two tile worker processes.
+
+    Args:
+        world (World): The world to update.
+
+    Returns:
+        ContextManager[DistributedWorld]: A context providing the distributed world updating the world.
+
+    """
+    return DistributedWorld(world, 2)
+
+
+ENGINES: Dict[str, Callable[[World], ContextManager[Union[World, DistributedWorld]]]] = {
+    'reference': reference_engine,
+    'neighbor_list': neighbor_list_engine,
+    'proximity': proximity_engine,
+    'adaptive_integrator': adaptive_integrator_engine,
+    'level_of_detail': level_of_detail_engine,
+    'float32': float32_engine,
+    'double_buffered': double_buffered_engine,
+    'distributed': distributed_engine,
+}
+
+
+def trace_values(world: World) -> List[List[float]]:
+    """Determines the values of every trace field for all cars of a world.
+
+    Args:
+        world (World): The world to trace.
+
+    Returns:
+        List[List[float]]: For each trace field, the value of every car.
+
+    """
+    cars = world.cars
+    return [[car.x for car in cars], [car.y for car in cars], [car.direction.x for car in cars],
+            [car.direction.y for car in cars], [car.velocity for car in cars], [car.steering_angle for car in cars],
+            [car.acceleration for car in cars], [car.steering_change for car in cars],
+            [car.flocking_vector.x for car in cars], [car.flocking_vector.y for car in cars],
+            [car.goal_index for car in cars], [car.goal_reached for car in cars]]
+
+
+def replay(case: GoldenCase, engine: Callable[[World], ContextManager[Union[World, DistributedWorld]]],
+           step_callback: Callable[[int, World], None]) -> float:
+    """Simulates the steps of a case with an engine, passing the world to a callback after every step.
+
+    Args:
+        case (GoldenCase): The case to simulate.
+        engine (Callable[[World], ContextManager[Union[World, DistributedWorld]]]): The engine to update the world with.
+        step_callback (Callable[[int, World], None]): The function called with the index of the step and the world.
+
+    Returns:
+        float: The time in seconds spent on updating the world, excluding the callbacks.
+
+    """
+    scenario = create_scenario(dict(DEFAULT_CONFIGURATION, **case.settings))
+    scenario.world_generator = GENERATORS[case.scenario]
+    world = scenario.generate_world(**case.variables)
+    dt = 1.0 / scenario.steps_per_second
+    duration = 0.0
+    with engine(world) as updater:
+        for step in range(case.steps):
+            start = perf_counter()
+            updater.update(dt, scenario.neighbor_count, scenario.rule_weights)
+            duration += perf_counter() - start
+            if isinstance(updater, DistributedWorld):
+                updater.synchronize()
+            step_callback(step, world)
+    return duration
+
+
+class GoldenTrace:
+
+    def __init__(self, case: GoldenCase, car_count: int):
+        """Initializes a new, empty golden trace object.
+
+        Args:
+            case (GoldenCase): The case this trace is recorded for.
+            car_count (int): The amount of cars in the world of the case.
+
+        """
+        self.case: GoldenCase = case
+        self.car_count: int = car_count
+        self.fields: Dict[str, array] = {field: array('d') for field in TRACE_FIELDS}
+        self.collisions: array = array('q')
+        self.flocking_performance: array = array('d')
+        self.arrival_steps: array = array('q')
+        self.seconds: float = 0.0
+
+    @classmethod
+    def record(cls, case: GoldenCase, engine_name: str = 'reference') -> 'GoldenTrace':
+        """Records the golden trace of a case, which is done with the reference model unless stated otherwise.
+
+        Args:
+            case (GoldenCase): The case to record.
+            engine_name (str): The name of the engine in ENGINES to record the trace with.
+
+        Returns:
+            GoldenTrace: The recorded trace.
+
+        """
+        trace = None
+        traced_world = None
+
+        def record_step(_: int, world: World):
+            nonlocal trace, traced_world
+            if trace is None:
+                trace = cls(case, len(world.cars))
+                traced_world = world
+            for field, values in zip(TRACE_FIELDS, trace_values(world)):
+                trace.fields[field].extend(values)
+            trace.collisions.append(world.collision_distribution[-1])
+            trace.flocking_performance.append(world.flocking_performance_distribution[-1])
+
+        seconds = replay(case, ENGINES[engine_name], record_step)
+        trace.seconds = seconds
+        trace.arrival_steps = traced_world.current_arrival_steps()
+        return trace
+
+    def to_bytes(self) -> bytes:
+        """Serializes this trace into its binary format.
+
+        Returns:
+            bytes: The binary representation of this trace.
+
+        """
+        header = {'name': self.case.name, 'scenario': self.case.scenario, 'variables': self.case.variables,
+                  'steps': self.case.steps, 'settings': self.case.settings, 'car_count': self.car_count}
+        return pack(MAGIC, VERSION, header, dict(self.fields, collisions=self.collisions,
+                                                 flocking_performance=self.flocking_performance,
+                                                 arrival_steps=self.arrival_steps))
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> 'GoldenTrace':
+        """Deserializes a trace from its binary format.
+
+        Args:
+            data (bytes): The binary representation of a trace.
+
+        Returns:
+            GoldenTrace: The deserialized trace.
+
+        """
+        header, arrays = unpack(MAGIC, VERSION, data)
+        trace = cls(GoldenCase(header['name'], header['scenario'], header['variables'], header['steps'],
+                               header['settings']), header['car_count'])
+        trace.fields = {field: arrays[field] for field in TRACE_FIELDS}
+        trace.collisions = arrays['collisions']
+        trace.flocking_performance = arrays['flocking_performance']
+        trace.arrival_steps = arrays['arrival_steps']
+        return trace
+
+    def save(self, path: str):
+        """Stores this trace in a file.
+
+        Args:
+            path (str): The path of the file to store the trace in.
+
+        """
+        with open(path, 'wb') as file:
+            file.write(self.to_bytes())
+
+    @classmethod
+    def load(cls, path: str) -> 'GoldenTrace':
+        """Loads a trace from a file.
+
+        Args:
+            path (str): The path of the file containing the trace.
+
+        Returns:
+            GoldenTrace: The loaded trace.
+
+        """
+        with open(path, 'rb') as file:
+            return cls.from_bytes(file.read())
+
+
+class EngineReport(NamedTuple):
+    """The deviations of an engine from the golden trace of a case."""
+
+    engine: str
+    case: str
+    first_divergence: Optional[int]
+    field_errors: Dict[str, float]
+    collision_differences: int
+    collision_total_difference: int
+    flocking_max_difference: float
+    arrival_differences: int
+    seconds: float
+    speedup: float
+
+
+def compare(trace: GoldenTrace, engine_name: str, reference_seconds: Optional[float] = None,
+            tolerance: float = 0.0) -> EngineReport:
+    """Replays the case of a golden trace with an engine, comparing every step with the trace.
+
+    Args:
+        trace (GoldenTrace): The golden trace to compare with.
+        engine_name (str): The name of the engine in ENGINES.
+        reference_seconds (Optional[float]): The time in seconds the reference model spends on the updates of the case,
+            or None if the engine is the reference model itself.
+        tolerance (float): The largest absolute error of a field that does not count as a divergence.
+
+    Returns:
+        EngineReport: The deviations of the engine from the trace. Cars arriving at a different step than in the trace
+            count as a divergence at the last step, unless the engine diverged before.
+
+    """
+    car_count = trace.car_count
+    field_errors = {field: 0.0 for field in TRACE_FIELDS}
+    first_divergence = None
+    collision_differences = 0
+    collision_total_difference = 0
+    flocking_max_difference = 0.0
+    compared_world = None
+
+    def compare_step(step: int, world: World):
+        nonlocal first_divergence, collision_differences, collision_total_difference, flocking_max_difference
+        nonlocal compared_world
+        compared_world = world
+        if len(world.cars) != car_count:
+            raise ValueError('Expected ' + str(car_count) + ' cars, but the world contains ' + str(len(world.cars)) +
+                             ' cars')
+        start = step * car_count
+        diverged = False
+        for field, values in zip(TRACE_FIELDS, trace_values(world)):
+            golden = trace.fields[field][start:start + car_count]
+            error = max(abs(value - golden_value) for value, golden_value in zip(values, golden))
+            field_errors[field] = max(field_errors[field], error)
+            diverged = diverged or error > tolerance
+        collision_difference = world.collision_distribution[-1] - trace.collisions[step]
+        if collision_difference != 0:
+            collision_differences += 1
+            collision_total_difference += collision_difference
+        flocking_difference = abs(world.flocking_performance_distribution[-1] - trace.flocking_performance[step])
+        flocking_max_difference = max(flocking_max_difference, flocking_difference)
+        if first_divergence is None and (diverged or collision_difference != 0):
+            first_divergence = step
+
+    seconds = replay(trace.case, ENGINES[engine_name], compare_step)
+    arrival_steps = compared_world.current_arrival_steps()
+    arrival_differences = sum(step != golden_step for step, golden_step in zip(arrival_steps, trace.arrival_steps))
+    if first_divergence is None and arrival_differences > 0:
+        first_divergence = trace.case.steps - 1
+    speedup = 1.0 if reference_seconds is None else reference_seconds / seconds
+    return EngineReport(engine_name, trace.case.name, first_divergence, field_errors, collision_differences,
+                        collision_total_difference, flocking_max_difference, arrival_differences, seconds, speedup)
+
+
+def compare_tiled(case: GoldenCase, tolerance: float = 0.0) -> EngineReport:
+    """Compares the distributed engine with a trace of a case recorded in double-buffered mode, which it should match.
+
+    Args:
+        case (GoldenCase): The case to compare the engines on.
+        tolerance (float): The largest absolute error of a field that does not count as a divergence.
+
+    Returns:
+        EngineReport: The deviations of the distributed engine from the double-buffered trace, reported as the
+            TILED_CHECK engine.
+
+    """
+    trace = GoldenTrace.record(case, 'double_buffered')
+    return compare(trace, 'distributed', trace.seconds, tolerance)._replace(engine=TILED_CHECK)
+
+
+def compare_engines(traces: List[GoldenTrace], engine_names: List[str], tolerance: float = 0.0) -> List[EngineReport]:
+    """Compares engines with the golden traces, including the reference model itself to time it.
+
+    Args:
+        traces (List[GoldenTrace]): The golden traces to compare with.
+        engine_names (List[str]): The names of the engines in ENGINES to compare.
+        tolerance (float): The largest absolute error of a field that does not count as a divergence.
+
+    Returns:
+        List[EngineReport]: The report of the reference model and of every engine, for every trace, and of the
+            comparison of the distributed engine with double-buffered mode if the distributed engine is compared.
+
+    """
+    reports = []
+    for trace in traces:
+        reference = compare(trace, 'reference', tolerance=tolerance)
+        reports.append(reference)
+        for engine_name in engine_names:
+            if engine_name != 'reference':
+                reports.append(compare(trace, engine_name, reference.seconds, tolerance))
+        if 'distributed' in engine_names:
+            reports.append(compare_tiled(trace.case, tolerance))
+    return reports
+
+
+def format_reports(reports: List[EngineReport]) -> str:
+    """Formats reports as a table.
+
+    Args:
+        reports (List[EngineReport]): The reports to format.
+
+    Returns:
+        str: The formatted reports, one line per engine and case.
+
+    """
+    lines = ['{:<22}{:<20}{:>11}{:>12}{:>12}{:>12}{:>12}{:>10}{:>10}{:>10}'.format(
+        'engine', 'case', 'diverges', 'max x/y', 'max dir', 'max vel', 'collisions', 'flocking', 'arrivals', 'speedup')]
+    for report in reports:
+        errors = report.field_errors
+        lines.append('{:<22}{:<20}{:>11}{:>12.3g}{:>12.3g}{:>12.3g}{:>12}{:>10.3g}{:>10}{:>9.2f}x'.format(
+            report.engine, report.case, '-' if report.first_divergence is None else report.first_divergence,
+            max(errors['x'], errors['y']), max(errors['direction_x'], errors['direction_y']), errors['velocity'],
+            '{}/{:+d}'.format(report.collision_differences, report.collision_total_difference),
+            report.flocking_max_difference, report.arrival_differences, report.speedup))
+    return '\n'.join(lines)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Records golden traces of the corpus, or compares engines with recorded golden traces.
+
+    Args:
+        argv (Optional[List[str]]): The command-line arguments, or None to use those of the process.
+
+    Returns:
+        int: The exit status, which is 1 if any exact engine or the distributed engine compared with double-buffered
+            mode diverged when comparing, and 0 otherwise.
+
+    """
+    parser = argparse.ArgumentParser(description='Validates simulation engines against the reference model.')
+    subparsers = parser.add_subparsers(dest='subcommand', required=True)
+    record = subparsers.add_parser('record', help='record the golden traces of the corpus')
+    record.add_argument('directory', help='directory to store the golden traces in')
+    compare_parser = subparsers.add_parser('compare', help='compare engines with recorded golden traces')
+    compare_parser.add_argument('directory', help='directory containing the golden traces')
+    compare_parser.add_argument('--engines', nargs='+', choices=sorted(ENGINES), default=sorted(ENGINES))
+    compare_parser.add_argument('--tolerance', type=float, default=0.0,
+                                help='largest absolute error of a field that does not count as a divergence')
+    compare_parser.add_argument('--exact', nargs='*', choices=sorted(ENGINES),
+                                default=['reference', 'neighbor_list', 'proximity'],
+                                help='engines that should not diverge')
+    arguments = parser.parse_args(argv)
+
+    if arguments.subcommand == 'record':
+        os.makedirs(arguments.directory, exist_ok=True)
+        for case in CORPUS:
+            GoldenTrace.record(case).save(os.path.join(arguments.directory, case.name + '.trace'))
+        return 0
+
+    traces = [GoldenTrace.load(os.path.join(arguments.directory, name))
+              for name in sorted(os.listdir(arguments.directory)) if name.endswith('.trace')]
+    reports = compare_engines(traces, arguments.engines, arguments.tolerance)
+    print(format_reports(reports))
+    diverged = any(report.first_divergence is not None for report in reports
+                   if report.engine in arguments.exact or report.engine == TILED_CHECK)
+    return 1 if diverged else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,147 @@
+"""This module contains functionality to simulate cars far from any interaction at a lower level of detail.
+
+A car is isolated when no other car and not its goal lie within the interaction radius around it. An isolated car that
+is cruising, i.e., whose velocity no longer changes, skips determining its neighbors and flocking forces. Instead, it
+holds its steering angle and velocity and is moved along the resulting arc in closed form. As soon as anything comes
+within the interaction radius, the car returns to full detail. A car also returns to full detail for at least one step
+after a maximum span of time, so its behavior is adjusted regularly.
+
+Holding the steering angle makes an isolated car deviate from the path it would have taken at full detail, because
+its steering angle would have changed at most at the maximum steering change of its type. This deviation is bounded
+for every single span at a lower level of detail, and the largest of these per-span bounds since the statistics were
+last reset is reported. It is not a bound on the error of a whole run: once a car returns to full detail, it continues
+from its deviated state, so deviations of consecutive spans carry over and also affect the other cars. The deviation of
+a whole run is measured by comparing it with a golden trace at full detail instead.
+
+If the interaction radius exceeds the collision distance plus the distance two cars can close within a step, isolated
+cars cannot collide and they are also skipped when counting collisions.
+
+"""
+
+from math import cos, sqrt
+from typing import List
+from car import Car
+from car_spec import CarSpec
+from goal import Goal
+from spatial_grid import SpatialGrid
+
+
+class LevelOfDetail:
+
+    def __init__(self, interaction_radius: float = 30.0, max_span: float = 2.0):
+        """Initializes a new level of detail scheduler object.
+
+        Args:
+            interaction_radius (float): The distance in meters around a car within which no other car or goal may lie
+                for the car to be simulated at a lower level of detail.
+            max_span (float): The maximum amount of time in seconds a car is simulated at a lower level of detail before
+                returning to full detail for a step.
+
+        """
+        self.interaction_radius: float = interaction_radius
+        self.max_span: float = max_span
+        self.spans: List[int] = []
+        self.reduced_steps: int = 0
+        self.full_steps: int = 0
+        self.max_span_deviation: float = 0.0
+
+    @property
+    def reduced_fraction(self) -> float:
+        """The fraction of car updates performed at a lower level of detail.
+
+        Returns:
+            float: The fraction of car updates at a lower level of detail, or 0 if no car has been updated yet.
+
+        """
+        total = self.reduced_steps + self.full_steps
+        return self.reduced_steps / total if total > 0 else 0.0
+
+    def reset_statistics(self):
+        """Starts collecting the reported statistics anew, e.g., at the start of a run."""
+        self.reduced_steps = 0
+        self.full_steps = 0
+        self.max_span_deviation = 0.0
+
+    def isolated_cars(self, cars: List[Car], goals: List[Goal], dt: float) -> List[bool]:
+        """Determines which cars are simulated at a lower level of detail during the next step.
+
+        Also updates the reported statistics, including the largest per-span deviation bound, assuming the cars are
+        updated accordingly.
+
+        Args:
+            cars (List[Car]): The cars of the world.
+            goals (List[Goal]): The goals of the world.
+            dt (float): The amount of time in seconds the simulation is progressed in the next step.
+
+        Returns:
+            List[bool]: For every car, True if it is simulated at a lower level of detail, False otherwise.
+
+        """
+        if len(self.spans) != len(cars):
+            self.spans = [0] * len(cars)
+        radius = self.interaction_radius
+        max_span_steps = self.max_span / dt
+        xs = [car.x for car in cars]
+        ys = [car.y for car in cars]
+        grid = SpatialGrid(radius, xs, ys, range(len(cars)))
+
+        isolated = [False] * len(cars)
+        for i, car in enumerate(cars):
+            spec = car.spec
+            goal = goals[car.goal_index]
+            cruising = car.acceleration == 0 or (car.acceleration > 0 and car.velocity >= spec.max_velocity)
+            if not cruising or self.spans[i] >= max_span_steps or \
+                    sqrt((goal.x - car.x) ** 2 + (goal.y - car.y) ** 2) <= radius:
+                self.spans[i] = 0
+                continue
+            x = xs[i]
+            y = ys[i]
+            if any(sqrt((x - xs[j]) ** 2 + (y - ys[j]) ** 2) <= radius for j in grid.within(i, radius)):
+                self.spans[i] = 0
+                continue
+            isolated[i] = True
+            self.spans[i] += 1
+            self.max_span_deviation = max(self.max_span_deviation,
+                                          self.deviation_bound(spec, car.velocity, self.spans[i] * dt))
+
+        reduced_count = sum(isolated)
+        self.reduced_steps += reduced_count
+        self.full_steps += len(cars) - reduced_count
+        return isolated
+
+    def collisions_skippable(self, cars: List[Car], dt: float) -> bool:
+        """Determines if isolated cars can be skipped when counting collisions after the next step.
+
+        Args:
+            cars (List[Car]): The cars of the world.
+            dt (float): The amount of time in seconds the simulation is progressed in the next step.
+
+        Returns:
+            bool: True if no isolated car can overlap another car after the next step, False otherwise.
+
+        """
+        specs = {id(car.spec): car.spec for car in cars}.values()
+        max_length = max((spec.length for spec in specs), default=0.0)
+        max_velocity = max((spec.max_velocity for spec in specs), default=0.0)
+        return self.interaction_radius > max_length + 2 * max_velocity * dt
+
+    @staticmethod
+    def deviation_bound(spec: CarSpec, velocity: float, duration: float) -> float:
+        """Determines how far a car holding its steering angle can deviate from its path at full detail.
+
+        At full detail, the steering angles differ by at most the maximum steering change times the elapsed time, so
+        the rate at which the directions diverge grows at most linearly. The resulting distance between the positions
+        grows at most with the cube of the elapsed time, and can never exceed the distance both paths can cover.
+
+        Args:
+            spec (CarSpec): The type of the car.
+            velocity (float): The velocity of the car in meters per second.
+            duration (float): The amount of time in seconds the car holds its steering angle.
+
+        Returns:
+            float: The maximum distance in meters between the positions of the car at both levels of detail.
+
+        """
+        max_tan_derivative = 1 / cos(spec.max_steering_angle) ** 2
+        bound = velocity ** 2 * max_tan_derivative * spec.max_steering_change * duration ** 3 / (6 * spec.wheelbase)
+        return min(bound, 2 * velocity * duration)
@@ -0,0 +1,132 @@
+"""This module contains functionality to keep track of the neighborhoods of cars across time steps.
+
+Cars only move a small distance per time step, so their neighborhoods change slowly. Instead of comparing every car to
+all other cars at every step, a neighbor list keeps for every car a list of candidates: the cars within the distance of
+its k-th nearest car plus a margin, called the skin. At every step, the nearest cars are picked from these candidates
+only. The candidate lists are rebuilt once the cars have moved so far since the last rebuild that a car outside of a
+candidate list could have become one of the nearest cars, which is when the largest two displacements add up to more
+than half of the skin. As a result, the neighborhoods are exactly the same as when they are determined from all cars.
+
+"""
+
+from math import inf, sqrt
+from typing import Dict, List, Tuple
+from car import Car
+from spatial_grid import SpatialGrid
+
+
+class NeighborList:
+
+    def __init__(self, skin: float = 2.0, cell_size: float = 10.0):
+        """Initializes a new neighbor list object.
+
+        Args:
+            skin (float): The margin in meters beyond the distance of the k-th nearest car within which cars are kept as
+                candidates. A larger skin results in fewer rebuilds, but more candidates to pick from at every step.
+            cell_size (float): The cell size in meters of the spatial grid used when rebuilding the candidate lists.
+
+        """
+        self.skin: float = skin
+        self.cell_size: float = cell_size
+        self.cars: List[Car] = []
+        self.indices: Dict[Car, int] = {}
+        self.neighbor_count: int = 0
+        self.xs: List[float] = []
+        self.ys: List[float] = []
+        self.candidates: List[List[int]] = []
+        self.hits: int = 0
+        self.rebuilds: int = 0
+
+    @property
+    def hit_rate(self) -> float:
+        """The fraction of steps at which the candidate lists could be reused without rebuilding them.
+
+        Returns:
+            float: The fraction of reused candidate lists, or 0 if the neighbor list has not been used yet.
+
+        """
+        total = self.hits + self.rebuilds
+        return self.hits / total if total > 0 else 0.0
+
+    def refresh(self, cars: List[Car], neighbor_count: int):
+        """Prepares the neighbor list for the current positions of the cars, rebuilding the candidate lists if needed.
+
+        Should be called once per step before determining neighborhoods, while the cars are not moving.
+
+        Args:
+            cars (List[Car]): The cars of the world.
+            neighbor_count (int): The amount of cars to incorporate into the neighborhood of each car.
+
+        """
+        if neighbor_count != self.neighbor_count or len(cars) != len(self.cars) or \
+                any(car is not known for car, known in zip(cars, self.cars)):
+            self.rebuild(cars, neighbor_count)
+            return
+
+        largest = 0.0
+        second_largest = 0.0
+        for car, x, y in zip(cars, self.xs, self.ys):
+            x_dif = car.x - x
+            y_dif = car.y - y
+            displacement = sqrt(x_dif ** 2 + y_dif ** 2)
+            if displacement > largest:
+                second_largest = largest
+                largest = displacement
+            elif displacement > second_largest:
+                second_largest = displacement
+        if largest + second_largest >= self.skin / 2:
+            self.rebuild(cars, neighbor_count)
+        else:
+            self.hits += 1
+
+    def rebuild(self, cars: List[Car], neighbor_count: int):
+        """Rebuilds the candidate lists from the current positions of the cars.
+
+        Args:
+            cars (List[Car]): The cars of the world.
+            neighbor_count (int): The amount of cars to incorporate into the neighborhood of each car.
+
+        """
+        self.cars = list(cars)
+        self.indices = {car: i for i, car in enumerate(cars)}
+        self.neighbor_count = neighbor_count
+        self.xs = [car.x for car in cars]
+        self.ys = [car.y for car in cars]
+        self.rebuilds += 1
+
+        car_count = len(cars)
+        grid = SpatialGrid(self.cell_size, self.xs, self.ys, range(car_count))
+        self.candidates = []
+        for i in range(car_count):
+            nearest = grid.nearest(i, neighbor_count, inf)[0]
+            if len(nearest) < neighbor_count:
+                self.candidates.append([j for j in range(car_count) if j != i])
+                continue
+            radius = (nearest[-1][0] if nearest else 0.0) + self.skin
+            x = self.xs[i]
+            y = self.ys[i]
+            self.candidates.append(sorted(j for j in grid.within(i, radius)
+                                          if sqrt((x - self.xs[j]) ** 2 + (y - self.ys[j]) ** 2) <= radius))
+
+    def neighbors(self, car: Car) -> List[Tuple[Car, float]]:
+        """Determines the neighborhood of a car from its candidates.
+
+        Args:
+            car (Car): The car for which the neighborhood is to be determined.
+
+        Returns:
+            (List[Tuple[Car, float]]): A list of neighboring cars and the distance between the given car and each
+                respective neighboring car, padded with the car itself at an infinite distance.
+
+        """
+        cars = self.cars
+        candidates = []
+        for j in self.candidates[self.indices[car]]:
+            c = cars[j]
+            x_dif = car.x - c.x
+            y_dif = car.y - c.y
+            candidates.append((sqrt(x_dif ** 2 + y_dif ** 2), j))
+        candidates.sort()
+        neighbors = [(cars[j], distance) for distance, j in candidates[:self.neighbor_count]]
+        neighbors.extend([(car, inf)] * (self.neighbor_count - len(neighbors)))
+        return neighbors
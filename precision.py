@@ -0,0 +1,235 @@
+"""This module contains functionality to simulate and store the state of cars at a reduced precision.
+
+A precision policy determines in which floating point format the state of cars is kept: the kinematic state of every
+car, the distances between neighbors, the recorded flocking performance, and the arrays written to snapshots and
+trajectory files. With single precision, these values are rounded to 32-bit floats, which halves the size of every
+stored array. Sums, such as those over all cars when determining the flocking performance, are still accumulated in
+double precision, and only their result is rounded.
+
+Since the state of a car is rounded after every update, storing it at the same precision loses nothing. The live state
+of the cars is still held in Python floats, so single precision saves memory only in the recorded series and in the
+stored files, and it does not speed up the simulation itself: rounding adds a small cost to every step. The state of
+all cars is therefore rounded at once, through a single buffer that is reused between steps.
+
+Whether the reduced precision affects the results can be checked with a validation report, comparing the collisions and
+the steps to reach the goal with those at double precision for a batch of seeds. The report also includes the time per
+run and the memory taken by the recorded flocking performance at both precisions.
+
+"""
+
+import sys
+import time
+from array import array
+from struct import Struct
+from typing import TYPE_CHECKING, Dict, List, NamedTuple, Sequence, Union
+from car import Car
+from vector import Vector
+
+if TYPE_CHECKING:
+    from scenario import Scenario
+
+
+class PrecisionPolicy:
+
+    def __init__(self, name: str, typecode: str):
+        """Initializes a new precision policy object.
+
+        Args:
+            name (str): The name of the floating point format, e.g., 'float32'.
+            typecode (str): The array type code of the floating point format.
+
+        """
+        self.name: str = name
+        self.typecode: str = typecode
+        self.reduced: bool = array(typecode).itemsize < array('d').itemsize
+        self.value_format: Struct = Struct(typecode)
+        self.car_format: Struct = Struct('0' + typecode)
+        self.car_buffer: bytearray = bytearray()
+        self.value_formats: Dict[int, Struct] = {}
+
+    def __repr__(self) -> str:
+        return 'PrecisionPolicy(' + repr(self.name) + ', ' + repr(self.typecode) + ')'
+
+    def round(self, value: float) -> float:
+        """Rounds a value to this precision.
+
+        Args:
+            value (float): The value to round.
+
+        Returns:
+            float: The nearest value representable at this precision.
+
+        """
+        if not self.reduced:
+            return value
+        value_format = self.value_format
+        return value_format.unpack(value_format.pack(value))[0]
+
+    def round_values(self, values: Sequence[float]) -> Sequence[float]:
+        """Rounds several values to this precision at once.
+
+        Args:
+            values (Sequence[float]): The values to round.
+
+        Returns:
+            Sequence[float]: The nearest values representable at this precision, in the same order.
+
+        """
+        if not self.reduced:
+            return values
+        values_format = self.value_formats.get(len(values))
+        if values_format is None:
+            values_format = self.value_formats.setdefault(len(values), Struct(str(len(values)) + self.typecode))
+        return values_format.unpack(values_format.pack(*values))
+
+    def round_cars(self, cars: Sequence[Car]):
+        """Rounds the kinematic state of the given cars to this precision.
+
+        The state of all cars is packed into one buffer at this precision and unpacked again. The buffer and its format
+        are kept until the amount of cars changes.
+
+        Args:
+            cars (Sequence[Car]): The cars to round the state of.
+
+        """
+        if not self.reduced:
+            return
+        values = []
+        for car in cars:
+            direction = car.direction
+            flocking_vector = car.flocking_vector
+            values += (car.x, car.y, car.steering_angle, car.velocity, car.steering_change, car.acceleration,
+                       direction.x, direction.y, flocking_vector.x, flocking_vector.y)
+        if len(values) != len(self.car_buffer) // self.value_format.size:
+            self.car_format = Struct(str(len(values)) + self.typecode)
+            self.car_buffer = bytearray(self.car_format.size)
+        self.car_format.pack_into(self.car_buffer, 0, *values)
+        rounded = self.car_format.unpack_from(self.car_buffer)
+        for i, car in enumerate(cars):
+            x, y, steering_angle, velocity, steering_change, acceleration, direction_x, direction_y, flocking_x, \
+                flocking_y = rounded[10 * i:10 * i + 10]
+            car.x = x
+            car.y = y
+            car.steering_angle = steering_angle
+            car.velocity = velocity
+            car.steering_change = steering_change
+            car.acceleration = acceleration
+            car.direction = Vector(direction_x, direction_y)
+            car.flocking_vector = Vector(flocking_x, flocking_y)
+
+    def series(self, values: Sequence[float] = ()) -> Union[List[float], array]:
+        """Creates a series to record a performance measure in.
+
+        Args:
+            values (Sequence[float]): The values already recorded.
+
+        Returns:
+            Union[List[float], array]: A list at double precision, or an array of this precision otherwise.
+
+        """
+        if not self.reduced:
+            return list(values)
+        return array(self.typecode, values)
+
+
+def series_size(series: Union[List[float], array]) -> int:
+    """Determines the amount of memory taken by a recorded series, including the floats of a list.
+
+    Args:
+        series (Union[List[float], array]): The series.
+
+    Returns:
+        int: The size of the series in bytes.
+
+    """
+    if isinstance(series, array):
+        return sys.getsizeof(series)
+    return sys.getsizeof(series) + sum(sys.getsizeof(value) for value in series)
+
+
+FLOAT64 = PrecisionPolicy('float64', 'd')
+
+FLOAT32 = PrecisionPolicy('float32', 'f')
+
+PRECISIONS: Dict[str, PrecisionPolicy] = {policy.name: policy for policy in (FLOAT64, FLOAT32)}
+
+
+class PrecisionReport(NamedTuple):
+    """The results of a scenario at double and at reduced precision, for a batch of seeds."""
+
+    precision: str
+    seeds: List[int]
+    reference_collisions: List[int]
+    reduced_collisions: List[int]
+    reference_steps_to_goal: List[int]
+    reduced_steps_to_goal: List[int]
+    reference_seconds: float
+    reduced_seconds: float
+    reference_series_bytes: int
+    reduced_series_bytes: int
+
+    def format(self) -> str:
+        """Formats this report as a table with a summary of the drift between both precisions.
+
+        Returns:
+            str: The formatted report.
+
+        """
+        bits = self.precision.replace('float', '')
+        lines = ['{:>8}{:>14}{:>14}{:>16}{:>16}'.format('seed', 'collisions64', 'collisions' + bits, 'steps64',
+                                                         'steps' + bits)]
+        for row in zip(self.seeds, self.reference_collisions, self.reduced_collisions, self.reference_steps_to_goal,
+                       self.reduced_steps_to_goal):
+            lines.append('{:>8}{:>14}{:>14}{:>16}{:>16}'.format(*row))
+        collision_drift = [reduced - reference
+                           for reference, reduced in zip(self.reference_collisions, self.reduced_collisions)]
+        step_drift = [reduced - reference
+                      for reference, reduced in zip(self.reference_steps_to_goal, self.reduced_steps_to_goal)]
+        run_count = max(len(self.seeds), 1)
+        lines.append('mean collision drift: {:.3f}, max absolute: {}'.format(
+            sum(collision_drift) / run_count, max((abs(drift) for drift in collision_drift), default=0)))
+        lines.append('mean steps to goal drift: {:.3f}, max absolute: {}'.format(
+            sum(step_drift) / run_count, max((abs(drift) for drift in step_drift), default=0)))
+        lines.append('identical runs: {} of {}'.format(
+            sum(1 for c, s in zip(collision_drift, step_drift) if c == 0 and s == 0), len(self.seeds)))
+        lines.append('seconds per run: {:.3f} at 64 bits, {:.3f} at {} bits'.format(
+            self.reference_seconds, self.reduced_seconds, bits))
+        lines.append('flocking performance series: {} bytes at 64 bits, {} bytes at {} bits'.format(
+            self.reference_series_bytes, self.reduced_series_bytes, bits))
+        return '\n'.join(lines)
+
+
+def validate_precision(scenario: 'Scenario', seeds: Sequence[int], precision: PrecisionPolicy = FLOAT32,
+                       **simulation_variables: ...) -> PrecisionReport:
+    """Simulates a scenario for every seed at double and at reduced precision, comparing the results.
+
+    Args:
+        scenario (Scenario): The scenario to simulate. Its precision is restored afterwards.
+        seeds (Sequence[int]): The seeds to simulate.
+        precision (PrecisionPolicy): The reduced precision to compare with double precision.
+        simulation_variables (...): Other variables to be passed to the world generator.
+
+    Returns:
+        PrecisionReport: The total collisions and steps to reach the goal for every seed at both precisions, the mean
+            time per run and the total memory taken by the recorded flocking performance at both precisions. Runs
+            taken from a result cache are included in the time per run.
+
+    """
+    original_precision = scenario.precision
+    results = {}
+    seconds = {}
+    try:
+        for policy in (FLOAT64, precision):
+            scenario.precision = policy
+            start = time.perf_counter()
+            results[policy.name] = [scenario.simulate(seed=seed, **simulation_variables) for seed in seeds]
+            seconds[policy.name] = (time.perf_counter() - start) / max(len(seeds), 1)
+    finally:
+        scenario.precision = original_precision
+
+    reference = results[FLOAT64.name]
+    reduced = results[precision.name]
+    return PrecisionReport(precision.name, list(seeds), [sum(run[0]) for run in reference],
+                           [sum(run[0]) for run in reduced], [run[2] for run in reference], [run[2] for run in reduced],
+                           seconds[FLOAT64.name], seconds[precision.name],
+                           sum(series_size(run[1]) for run in reference), sum(series_size(run[1]) for run in reduced))
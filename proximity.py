@@ -0,0 +1,132 @@
+"""This module contains functionality to share the distances between nearby cars within a step.
+
+Both neighbor search and collision counting compare the positions of cars. A proximity structure determines the pairs
+of cars within a fixed radius of each other once, from the positions after the cars have moved, keeping for every pair
+the difference between the positions of the cars and their distance. Collisions are counted from the distances of these
+close pairs directly. The cars do not move again until the next step, so the neighborhoods in the next step are taken
+from the same close pairs, together with the differences between the positions, from which the separation force is
+determined without subtracting the positions again. Only for a car with fewer close cars than neighbors the nearest
+cars are searched further away.
+
+As a result, the work per step scales with the amount of close pairs instead of with the square of the amount of cars.
+Distances are computed in the same way as by the world itself, so the results are identical. Building the structure has
+a fixed cost per step, however, so for small worlds, up to about 40 cars depending on how densely they are packed, it
+is slower than the comparisons of the world itself and should only be used for larger worlds.
+
+"""
+
+from math import inf, sqrt
+from typing import Dict, List, Sequence, Tuple
+from car import Car
+from spatial_grid import SpatialGrid
+
+
+class Proximity:
+
+    def __init__(self, radius: float = 10.0):
+        """Initializes a new proximity structure object.
+
+        Args:
+            radius (float): The distance in meters within which pairs of cars are kept. Collisions are only counted from
+                the close pairs if the radius exceeds the length of the longest car.
+
+        """
+        self.radius: float = radius
+        self.cars: List[Car] = []
+        self.indices: Dict[Car, int] = {}
+        self.xs: List[float] = []
+        self.ys: List[float] = []
+        self.grid: SpatialGrid = SpatialGrid(radius, [], [], [])
+        self.pairs: List[Tuple[int, int, float, float, float]] = []
+        self.near: List[List[Tuple[float, int, float, float]]] = []
+        self.builds: int = 0
+
+    def matches(self, cars: Sequence[Car]) -> bool:
+        """Determines if this structure was built from the current positions of the given cars.
+
+        Args:
+            cars (Sequence[Car]): The cars of the world.
+
+        Returns:
+            bool: True if the structure is up to date, False if it should be built again.
+
+        """
+        if len(cars) != len(self.cars):
+            return False
+        return all(car is known and car.x == x and car.y == y
+                   for car, known, x, y in zip(cars, self.cars, self.xs, self.ys))
+
+    def build(self, cars: Sequence[Car]):
+        """Determines the close pairs from the current positions of the given cars.
+
+        Every pair (i, j) with i < j keeps the differences between the x and y positions of car i and car j, and their
+        distance. The close cars of each car are kept sorted by distance, with the differences from that car's position.
+
+        Args:
+            cars (Sequence[Car]): The cars of the world.
+
+        """
+        self.cars = list(cars)
+        self.indices = {car: i for i, car in enumerate(cars)}
+        xs = self.xs = [car.x for car in cars]
+        ys = self.ys = [car.y for car in cars]
+        car_count = len(cars)
+        grid = self.grid = SpatialGrid(self.radius, xs, ys, range(car_count))
+        self.builds += 1
+
+        squared_radius = self.radius * self.radius
+        pairs = []
+        near = [[] for _ in range(car_count)]
+        for i in range(car_count):
+            x = xs[i]
+            y = ys[i]
+            for j in sorted(j for j in grid.within(i, self.radius) if j > i):
+                x_dif = x - xs[j]
+                y_dif = y - ys[j]
+                squared_distance = x_dif ** 2 + y_dif ** 2
+                if squared_distance <= squared_radius:
+                    distance = sqrt(squared_distance)
+                    pairs.append((i, j, x_dif, y_dif, distance))
+                    near[i].append((distance, j, x_dif, y_dif))
+                    near[j].append((distance, i, -x_dif, -y_dif))
+        for car_near in near:
+            car_near.sort()
+        self.pairs = pairs
+        self.near = near
+
+    def neighborhood(self, car: Car, neighbor_count: int) -> Tuple[List[Tuple[Car, float]], List[Tuple[float, float]]]:
+        """Determines the neighborhood of a car, preferably from its close pairs.
+
+        Args:
+            car (Car): The car for which the neighborhood is to be determined.
+            neighbor_count (int): The amount of cars to incorporate into the neighborhood.
+
+        Returns:
+            (List[Tuple[Car, float]]): A list of neighboring cars and the distance between the given car and each
+                respective neighboring car, padded with the car itself at an infinite distance.
+            (List[Tuple[float, float]]): For each neighboring car, the differences between the x and y position of the
+                given car and those of the neighboring car.
+
+        """
+        index = self.indices[car]
+        nearest = self.near[index][:neighbor_count]
+        if len(nearest) < neighbor_count or nearest and nearest[-1][0] >= self.radius:
+            xs = self.xs
+            ys = self.ys
+            nearest = [(distance, j, xs[index] - xs[j], ys[index] - ys[j])
+                       for distance, j in self.grid.nearest(index, neighbor_count, inf)[0]]
+        neighbors = [(self.cars[j], distance) for distance, j, _, _ in nearest]
+        offsets = [(x_dif, y_dif) for _, _, x_dif, y_dif in nearest]
+        padding = neighbor_count - len(neighbors)
+        neighbors.extend([(car, inf)] * padding)
+        offsets.extend([(0.0, 0.0)] * padding)
+        return neighbors, offsets
+
+    def covers_collisions(self) -> bool:
+        """Determines if all overlapping cars are among the close pairs.
+
+        Returns:
+            bool: True if the radius exceeds the length of the longest car, False otherwise.
+
+        """
+        return all(car.spec.length < self.radius for car in self.cars)
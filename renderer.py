@@ -0,0 +1,266 @@
+"""This module contains functionality to draw a simulated world in a separate process.
+
+The simulating process publishes the position, direction and flocking vector of every car after each step into shared
+memory. A renderer process draws the most recently published step at its own frame rate, so a slow frame never delays
+the simulation, and the simulation never waits for the display.
+
+The shared memory holds two frame buffers, each guarded by a sequence counter in the manner of a seqlock. The writer
+always fills the buffer that was not published last: it makes the counter of that buffer odd, writes the frame, makes
+the counter even again and then publishes the buffer as the latest. The reader copies the latest buffer and only
+accepts the copy if the counter was even and unchanged throughout, retrying otherwise. Neither side ever takes a lock;
+a reader only has to retry when the writer has completed a full step while the reader was still copying.
+
+Pygame is only imported within the renderer process.
+
+"""
+
+from multiprocessing import Process
+from multiprocessing.shared_memory import SharedMemory
+from typing import TYPE_CHECKING, List, Optional, Tuple, Union
+from car import Car
+from car_spec import CarSpec
+from goal import Goal
+from vector import Vector
+from wall import Wall
+from world import World
+
+if TYPE_CHECKING:
+    from pygame import Color
+
+FRAME_FIELDS = ['x', 'y', 'direction_x', 'direction_y', 'flocking_x', 'flocking_y']
+
+SEQUENCE, LATEST, CLOSED = 0, 2, 3
+
+HEADER_SIZE = 4
+
+
+class FrameBuffer:
+
+    def __init__(self, car_count: int, memory_name: Optional[str] = None):
+        """Initializes a new frame buffer object, creating the shared memory or attaching to existing shared memory.
+
+        Args:
+            car_count (int): The amount of cars in each frame.
+            memory_name (Optional[str]): The name of the shared memory to attach to, or None to create it.
+
+        """
+        self.car_count: int = car_count
+        self.frame_size: int = 1 + len(FRAME_FIELDS) * car_count
+        size = (HEADER_SIZE + 2 * self.frame_size) * 8
+        self.owner: bool = memory_name is None
+        if self.owner:
+            self.memory: SharedMemory = SharedMemory(create=True, size=size)
+        else:
+            self.memory: SharedMemory = SharedMemory(name=memory_name)
+        self.header: memoryview = self.memory.buf[:HEADER_SIZE * 8].cast('q')
+        self.values: memoryview = self.memory.buf[HEADER_SIZE * 8:size].cast('d')
+        if self.owner:
+            self.header[SEQUENCE] = 0
+            self.header[SEQUENCE + 1] = 0
+            self.header[LATEST] = -1
+            self.header[CLOSED] = 0
+
+    @property
+    def closed(self) -> bool:
+        """Whether either side has closed the frame buffer, i.e., the simulation ended or the window was closed.
+
+        Returns:
+            bool: True if no more frames will be published or drawn, False otherwise.
+
+        """
+        return self.header[CLOSED] != 0
+
+    def close(self):
+        """Marks the frame buffer as closed for both sides."""
+        self.header[CLOSED] = 1
+
+    def publish(self, world: World):
+        """Writes the cars of a world into the buffer not published last, and publishes it as the latest frame.
+
+        Args:
+            world (World): The world to publish the cars of. Its amount of cars should match that of this buffer.
+
+        """
+        buffer = 0 if self.header[LATEST] == 1 else 1
+        sequence = self.header[SEQUENCE + buffer] + 1
+        self.header[SEQUENCE + buffer] = sequence
+
+        car_count = self.car_count
+        offset = buffer * self.frame_size
+        values = self.values
+        values[offset] = world.step_count
+        offset += 1
+        for i, car in enumerate(world.cars):
+            values[offset + i] = car.x
+            values[offset + car_count + i] = car.y
+            values[offset + 2 * car_count + i] = car.direction.x
+            values[offset + 3 * car_count + i] = car.direction.y
+            values[offset + 4 * car_count + i] = car.flocking_vector.x
+            values[offset + 5 * car_count + i] = car.flocking_vector.y
+
+        self.header[SEQUENCE + buffer] = sequence + 1
+        self.header[LATEST] = buffer
+
+    def read(self) -> Optional[Tuple[int, List[float]]]:
+        """Copies the latest published frame.
+
+        Returns:
+            Optional[Tuple[int, List[float]]]: The step count of the world and the values of each frame field for all
+                cars, field by field, or None if no frame has been published yet.
+
+        """
+        while True:
+            buffer = self.header[LATEST]
+            if buffer < 0:
+                return None
+            sequence = self.header[SEQUENCE + buffer]
+            if sequence % 2 == 1:
+                continue
+            offset = buffer * self.frame_size
+            frame = self.values[offset:offset + self.frame_size].tolist()
+            if self.header[SEQUENCE + buffer] == sequence:
+                return int(frame[0]), frame[1:]
+
+    def release(self):
+        """Detaches from the shared memory, and removes it if this frame buffer created it."""
+        self.header.release()
+        self.values.release()
+        self.memory.close()
+        if self.owner:
+            self.memory.unlink()
+
+
+def read_cars(values: List[float], cars: List[Car]):
+    """Reads the position, direction and flocking vector of every car from a frame.
+
+    Args:
+        values (List[float]): The values of each frame field for all cars, field by field.
+        cars (List[Car]): The cars to read the frame into.
+
+    """
+    car_count = len(cars)
+    for i, car in enumerate(cars):
+        car.x = values[i]
+        car.y = values[car_count + i]
+        car.direction = Vector(values[2 * car_count + i], values[3 * car_count + i])
+        car.flocking_vector = Vector(values[4 * car_count + i], values[5 * car_count + i])
+
+
+def run_renderer(memory_name: str, specs: List[CarSpec], goals: List[Goal], walls: List[Wall], width: float,
+                 height: float, pixel_meter_ratio: int, world_color: Union[str, 'Color'],
+                 goal_color: Union[str, 'Color'], vector_color: Union[str, 'Color'], car_image_path: str,
+                 frame_rate: int):
+    """Draws the latest frame in a window until the frame buffer is closed, or closes it once the window is closed.
+
+    Args:
+        memory_name (str): The name of the shared memory of the frame buffer.
+        specs (List[CarSpec]): The type of each car.
+        goals (List[Goal]): The goals of the world.
+        walls (List[Wall]): The walls of the world.
+        width (float): The width of the world in meters.
+        height (float): The height of the world in meters.
+        pixel_meter_ratio (int): The amount of pixels corresponding to one meter.
+        world_color (Union[str, Color]): The color or name of the color the world should be, i.e., the background
+            color.
+        goal_color (Union[str, Color]): The color or name of the color goals should be.
+        vector_color (Union[str, Color]): The color or name of the color of flocking vectors originating from cars.
+        car_image_path (str): The filepath to the image visualizing a car.
+        frame_rate (int): The maximum amount of frames to draw per second.
+
+    """
+    import pygame
+    from world_view import draw_world
+
+    frames = FrameBuffer(len(specs), memory_name)
+    world = World(width, height)
+    world.cars = [Car(spec) for spec in specs]
+    world.goals = goals
+    world.walls = walls
+
+    pygame.init()
+    screen = pygame.display.set_mode((round(width * pixel_meter_ratio), round(height * pixel_meter_ratio)))
+    car_image = pygame.image.load(car_image_path)
+    world_color = pygame.Color(world_color)
+    goal_color = pygame.Color(goal_color)
+    vector_color = pygame.Color(vector_color)
+
+    drawn_step = None
+    clock = pygame.time.Clock()
+    while not frames.closed:
+        for event in pygame.event.get():
+            if event.type == pygame.QUIT:
+                frames.close()
+
+        frame = frames.read()
+        if frame is not None and frame[0] != drawn_step:
+            drawn_step, values = frame
+            read_cars(values, world.cars)
+            draw_world(world, world_color, goal_color, vector_color, car_image, screen, pixel_meter_ratio)
+            pygame.display.update()
+        clock.tick(frame_rate)
+
+    pygame.quit()
+    frames.release()
+
+
+class Renderer:
+
+    def __init__(self, world: World, pixel_meter_ratio: int, world_color: Union[str, 'Color'],
+                 goal_color: Union[str, 'Color'], vector_color: Union[str, 'Color'], car_image_path: str,
+                 frame_rate: int = 60):
+        """Initializes a new renderer object, starting a process that draws the given world in a window.
+
+        Goals, walls, car types and the amount of cars are considered fixed while the renderer is in use.
+
+        Args:
+            world (World): The world to draw.
+            pixel_meter_ratio (int): The amount of pixels corresponding to one meter.
+            world_color (Union[str, Color]): The color or name of the color the world should be, i.e., the background
+                color.
+            goal_color (Union[str, Color]): The color or name of the color goals should be.
+            vector_color (Union[str, Color]): The color or name of the color of flocking vectors originating from
+                cars.
+            car_image_path (str): The filepath to the image visualizing a car.
+            frame_rate (int): The maximum amount of frames to draw per second.
+
+        """
+        self.frames: FrameBuffer = FrameBuffer(len(world.cars))
+        self.frames.publish(world)
+        arguments = (self.frames.memory.name, [car.spec for car in world.cars], world.goals, world.walls, world.width,
+                     world.height, pixel_meter_ratio, world_color, goal_color, vector_color, car_image_path, frame_rate)
+        self.process: Optional[Process] = Process(target=run_renderer, args=arguments, daemon=True)
+        self.process.start()
+
+    def __enter__(self) -> 'Renderer':
+        return self
+
+    def __exit__(self, *exception_info: ...):
+        self.close()
+
+    @property
+    def closed(self) -> bool:
+        """Whether the window of the renderer was closed.
+
+        Returns:
+            bool: True if the renderer no longer draws frames, False otherwise.
+
+        """
+        return self.frames.closed
+
+    def publish(self, world: World):
+        """Makes the current state of the cars of a world available to the renderer, without waiting for it.
+
+        Args:
+            world (World): The world drawn by this renderer.
+
+        """
+        self.frames.publish(world)
+
+    def close(self):
+        """Stops the renderer process and releases the shared memory."""
+        if self.process is None:
+            return
+        self.frames.close()
+        self.process.join()
+        self.process = None
+        self.frames.release()
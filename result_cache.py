@@ -0,0 +1,328 @@
+"""This module contains functionality to store the results of simulations on disk and reuse them for identical runs.
+
+A seeded simulation is deterministic: the same world generator, seed, simulation variables and scenario settings always
+produce the same results. The result cache stores the results of every such run in a file named after a hash of its
+configuration and of a tag identifying the version of the simulation code, so that runs are never answered with results
+of code that has since changed. By default, this tag is a hash of the source of all modules of the simulation.
+
+Results are written to a temporary file first and then moved into place, which is atomic, so worker processes sharing
+a cache never read a partially written result. Two workers simulating the same run simply store identical results. Once
+the total size of the cache exceeds its bound, the least recently used results are removed. A result counts as used
+whenever it is stored or read, which updates the modification time of its file.
+
+Runs without a seed are not deterministic, and are therefore never cached. The world generator of a run is identified by
+its code, the values it is closed over, its default arguments and the values of the globals it refers to, and for a
+bound method, such as the world generator of a scenario library, also by the binary representation of the object it is
+bound to. Runs of generators that depend on values that cannot be identified this way are never cached either. The
+settings of the engine are taken from the generated world, so a generator that configures them itself is keyed
+correctly. Whether tile workers update the world is part of the key as well, since they ignore some of these settings.
+Their amount is not, as the results of tile workers do not depend on it.
+
+"""
+
+import hashlib
+import json
+import os
+import tempfile
+from array import array
+from types import CodeType, ModuleType
+from typing import TYPE_CHECKING, Callable, Dict, List, Optional, Tuple
+from binary_format import pack, unpack
+
+if TYPE_CHECKING:
+    from scenario import Scenario
+    from world import World
+
+MAGIC = b'CFRC'
+
+VERSION = 1
+
+SUFFIX = '.result'
+
+_source_versions: Dict[str, str] = {}
+
+
+def source_version(directory: Optional[str] = None) -> str:
+    """Determines a tag identifying the version of the simulation code, as a hash of the source of all its modules.
+
+    Args:
+        directory (Optional[str]): The directory containing the modules of the simulation, or None for the directory
+            of this module.
+
+    Returns:
+        str: The hexadecimal hash of the contents of all Python files in the directory.
+
+    """
+    if directory is None:
+        directory = os.path.dirname(os.path.abspath(__file__))
+    if directory not in _source_versions:
+        digest = hashlib.sha256()
+        for name in sorted(os.listdir(directory)):
+            if name.endswith('.py'):
+                digest.update(name.encode())
+                with open(os.path.join(directory, name), 'rb') as file:
+                    digest.update(hashlib.sha256(file.read()).digest())
+        _source_versions[directory] = digest.hexdigest()
+    return _source_versions[directory]
+
+
+def code_identity(code: CodeType) -> List:
+    """Determines the parts of a code object that identify what it does, including those of nested code objects.
+
+    Args:
+        code (CodeType): The code object.
+
+    Returns:
+        List: The bytecode, names and constants of the code object, in a form that can be encoded as JSON.
+
+    """
+    constants = []
+    for constant in code.co_consts:
+        if isinstance(constant, CodeType):
+            constants.append(code_identity(constant))
+        elif isinstance(constant, frozenset):
+            constants.append(sorted(repr(element) for element in constant))
+        else:
+            constants.append(repr(constant))
+    return [code.co_code.hex(), list(code.co_names), constants]
+
+
+def value_identity(value: object) -> object:
+    """Determines a representation of a value a world generator depends on, which can be encoded as JSON.
+
+    Args:
+        value (object): A plain value, a list, tuple or dictionary of such values, a function, or an object with a
+            binary representation (to_bytes) or a list of parameters (parameters), such as a car type.
+
+    Returns:
+        object: The representation of the value.
+
+    Raises:
+        TypeError: If the value cannot be represented.
+
+    """
+    if value is None or isinstance(value, (bool, int, float, str)):
+        return value
+    if isinstance(value, (list, tuple)):
+        return [value_identity(element) for element in value]
+    if isinstance(value, dict):
+        return {str(key): value_identity(element) for key, element in value.items()}
+    if hasattr(value, 'to_bytes'):
+        return hashlib.sha256(value.to_bytes()).hexdigest()
+    if hasattr(value, 'parameters'):
+        return value_identity(value.parameters())
+    if hasattr(value, '__code__'):
+        identity = generator_identity(value)
+        if identity is not None:
+            return identity
+    raise TypeError('Cannot identify ' + repr(value))
+
+
+def generator_identity(generator: Callable) -> Optional[str]:
+    """Determines a hash identifying the worlds a world generator generates.
+
+    Modules, classes and functions the generator refers to as globals are considered part of the code, which is
+    identified by the code version as long as they belong to the simulation.
+
+    Args:
+        generator (Callable): The world generator, i.e., a function or a bound method.
+
+    Returns:
+        Optional[str]: The hexadecimal hash of the code of the generator, the values it is closed over, its default
+            arguments, the other values it refers to as globals, and of the object a bound method is bound to, or None
+            if any of these cannot be identified.
+
+    """
+    function = getattr(generator, '__func__', generator)
+    code = getattr(function, '__code__', None)
+    if code is None:
+        return None
+    globals_ = getattr(function, '__globals__', {})
+    names = [name for name in code.co_names
+             if name in globals_ and not callable(globals_[name]) and not isinstance(globals_[name], ModuleType)]
+    try:
+        identity = [
+            function.__module__,
+            function.__qualname__,
+            code_identity(code),
+            value_identity(getattr(generator, '__self__', None)),
+            [value_identity(cell.cell_contents) for cell in function.__closure__ or ()],
+            value_identity(function.__defaults__),
+            value_identity(function.__kwdefaults__),
+            {name: value_identity(globals_[name]) for name in names},
+        ]
+    except (TypeError, ValueError):
+        return None
+    return hashlib.sha256(json.dumps(identity, sort_keys=True).encode()).hexdigest()
+
+
+class ResultCache:
+
+    def __init__(self, directory: str, max_bytes: int = 256 * 1024 * 1024, code_version: Optional[str] = None):
+        """Initializes a new result cache object, creating its directory if it does not exist yet.
+
+        Args:
+            directory (str): The directory to store the results in. It can be shared by multiple processes.
+            max_bytes (int): The total size in bytes of the stored results above which the least recently used results
+                are removed.
+            code_version (Optional[str]): The tag identifying the version of the simulation code, or None to use the
+                hash of the source of all modules of the simulation.
+
+        """
+        os.makedirs(directory, exist_ok=True)
+        self.directory: str = directory
+        self.max_bytes: int = max_bytes
+        self.code_version: str = source_version() if code_version is None else code_version
+        self.hits: int = 0
+        self.misses: int = 0
+        self.stores: int = 0
+        self.evictions: int = 0
+
+    @property
+    def hit_rate(self) -> float:
+        """The fraction of cacheable runs answered from the cache.
+
+        Returns:
+            float: The amount of hits divided by the amount of hits and misses, or 0 if no run was looked up.
+
+        """
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def key(self, scenario: 'Scenario', simulation_variables: Dict, world: 'World') -> Optional[str]:
+        """Determines the key identifying a run of a scenario.
+
+        Args:
+            scenario (Scenario): The scenario to simulate.
+            simulation_variables (Dict): The variables passed to the world generator.
+            world (World): The world generated and configured for the run, of which the engine settings are used
+                together with whether the scenario updates it with tile workers.
+
+        Returns:
+            Optional[str]: The hexadecimal hash of the configuration of the run and the code version, or None if the
+                run is not seeded or its world generator cannot be identified, so it can not be cached.
+
+        """
+        if 'seed' not in simulation_variables:
+            return None
+        generator = generator_identity(scenario.world_generator)
+        if generator is None:
+            return None
+        configuration = {
+            'code_version': self.code_version,
+            'world_generator': generator,
+            'simulation_variables': simulation_variables,
+            'steps_per_second': scenario.steps_per_second,
+            'neighbor_count': scenario.neighbor_count,
+            'rule_weights': list(scenario.rule_weights),
+            'simulation_time': scenario.simulation_time,
+            'engine': world.engine_settings(),
+            'tiled': scenario.tile_workers > 1,
+        }
+        encoded = json.dumps(configuration, sort_keys=True, separators=(',', ':'), default=repr)
+        return hashlib.sha256(encoded.encode()).hexdigest()
+
+    def path(self, key: str) -> str:
+        """Determines the path of the file storing the results of a run.
+
+        Args:
+            key (str): The key identifying the run.
+
+        Returns:
+            str: The path of the file within the directory of the cache.
+
+        """
+        return os.path.join(self.directory, key + SUFFIX)
+
+    def load(self, key: str) -> Optional[Tuple[List[int], array, int, array]]:
+        """Retrieves the results of a run, marking them as recently used.
+
+        Args:
+            key (str): The key identifying the run.
+
+        Returns:
+            Optional[Tuple[List[int], array, int, array]]: The time series of the collisions and of the flocking
+                density, the amount of steps to reach the goal and the arrival steps of the run, or None if they are
+                not stored.
+
+        """
+        path = self.path(key)
+        try:
+            with open(path, 'rb') as file:
+                header, arrays = unpack(MAGIC, VERSION, file.read())
+            os.utime(path)
+        except (OSError, ValueError):
+            self.misses += 1
+            return None
+        self.hits += 1
+        return (arrays['collisions'].tolist(), arrays['flocking_performance'], header['steps_to_goal'],
+                arrays['arrival_steps'])
+
+    def store(self, key: str, collisions: List[int], flocking_performance: List[float], steps_to_goal: int,
+              arrival_steps: array, typecode: str = 'd'):
+        """Stores the results of a run, replacing any stored results of the run atomically.
+
+        Afterwards, the least recently used results are removed if the cache has grown too large.
+
+        Args:
+            key (str): The key identifying the run.
+            collisions (List[int]): Time series of the collisions measured during the run.
+            flocking_performance (List[float]): Time series of the flocking density measured during the run.
+            steps_to_goal (int): The amount of steps after which all cars reached their final goal.
+            arrival_steps (array): The step after which each car reached its final goal.
+            typecode (str): The array type code to store the flocking density with.
+
+        """
+        arrays = {'collisions': array('q', collisions), 'flocking_performance': array(typecode, flocking_performance),
+                  'arrival_steps': array('q', arrival_steps)}
+        data = pack(MAGIC, VERSION, {'steps_to_goal': steps_to_goal}, arrays)
+        descriptor, temporary_path = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+        try:
+            with os.fdopen(descriptor, 'wb') as file:
+                file.write(data)
+            os.replace(temporary_path, self.path(key))
+        except BaseException:
+            try:
+                os.unlink(temporary_path)
+            except OSError:
+                pass
+            raise
+        self.stores += 1
+        self.evict()
+
+    def evict(self):
+        """Removes the least recently used results until the total size of the cache is within its bound.
+
+        Files removed concurrently by other processes are skipped.
+
+        """
+        entries = []
+        total_bytes = 0
+        for name in os.listdir(self.directory):
+            if not name.endswith(SUFFIX):
+                continue
+            try:
+                status = os.stat(os.path.join(self.directory, name))
+            except OSError:
+                continue
+            entries.append((status.st_mtime, name, status.st_size))
+            total_bytes += status.st_size
+        entries.sort()
+        for _, name, size in entries:
+            if total_bytes <= self.max_bytes:
+                break
+            try:
+                os.unlink(os.path.join(self.directory, name))
+                self.evictions += 1
+            except OSError:
+                pass
+            total_bytes -= size
+
+    def clear(self):
+        """Removes all stored results."""
+        for name in os.listdir(self.directory):
+            if name.endswith(SUFFIX):
+                try:
+                    os.unlink(os.path.join(self.directory, name))
+                except OSError:
+                    pass
@@ -4,19 +4,54 @@ The core of a scenario is the world generator function passed upon initializatio
 should already contain all objects such as cars, therefore configuring the parameters of these elements. These
 parameters can be made variable by passing keyword arguments to this generator function.
 
+A scenario can also be warmed up until all cars have reached their goal. The resulting world is captured in a snapshot,
+from which the remainder of the scenario can be simulated any number of times.
+
+Worlds can find the neighbors of cars with a neighbor list or share distances between nearby cars with a proximity
+structure, both of which yield exactly the same results, and simulate isolated cars at a lower level of detail, which
+reports the largest bound on the deviation of a car within a single span at a lower level of detail. After every
+simulation, the statistics of such accelerators are available alongside the arrival steps of the cars.
+
+The results of seeded simulations can be kept in a result cache on disk, so identical runs are not simulated again.
+While simulations run, a telemetry publisher can stream their metrics to a local consumer.
+
+Cars normally adjust their behavior one after the other, each seeing the behavior of the cars before it. In
+double-buffered mode, all cars adjust their behavior based on the state of the previous step instead. Simulations of
+very large worlds can be distributed over multiple tile worker processes, which always simulate in double-buffered mode,
+so that the results do not depend on the amount of workers. A scenario with tile workers therefore also configures its
+worlds as double-buffered, and produces exactly the same results as the same scenario with double buffering in a single
+process. Tile workers always simulate at full detail with a single update per step, so a scenario rejects them in
+combination with the level of detail or the adaptive integrator.
+
+Pygame is only imported by the renderer process of a visual simulation, multiprocessing only once tile workers or a
+renderer are used, and accelerators only once they are enabled, so headless simulations start quickly and also run on
+hosts without SDL.
+
 """
 
-from typing import Callable, List
-import pygame
-from pygame import Color
+import random
+import time
+from array import array
+from contextlib import nullcontext
+from typing import TYPE_CHECKING, Callable, ContextManager, Dict, List, Optional, Union
+from precision import FLOAT64, PrecisionPolicy
 from world import World
-from world_view import draw_world
+
+if TYPE_CHECKING:
+    from result_cache import ResultCache
+    from snapshot import WorldSnapshot
+    from telemetry import TelemetryPublisher
+    from pygame import Color
+    from distributed_world import DistributedWorld
 
 
 class Scenario:
 
     def __init__(self, world_generator: Callable[..., World], steps_per_second: int, neighbor_count: int,
-                 rule_weights: List[float], simulation_time: int):
+                 rule_weights: List[float], simulation_time: int, tile_workers: int = 0, control_interval: int = 1,
+                 staggered_control: bool = False, precision: PrecisionPolicy = FLOAT64, double_buffered: bool = False,
+                 neighbor_list: bool = False, level_of_detail: bool = False, adaptive_integrator: bool = False,
+                 proximity: bool = False):
         """Initializes a new scenario object.
 
         Args:
@@ -27,6 +62,28 @@ class Scenario:
             rule_weights (List[float]): A list with the weights of each flocking force. The respective flocking forces
                 are [Separation, Alignment, Cohesion, Goal].
             simulation_time (int): The amount of time in seconds to simulate the scenario, after the goal is reached.
+            tile_workers (int): The amount of worker processes to distribute simulations over, or 0 to simulate in the
+                current process.
+            control_interval (int): The amount of steps between two behavior adjustments of a car. Cars keep moving at
+                every step, but only re-plan at this lower rate.
+            staggered_control (bool): True to let a different part of the cars re-plan at every step, False to let all
+                cars re-plan at the same steps.
+            precision (PrecisionPolicy): The precision at which the state of the cars is kept.
+            double_buffered (bool): True to let all cars adjust their behavior based on the state of the previous step,
+                False to let them adjust it one after the other. Always True if there are tile workers.
+            neighbor_list (bool): True to find the neighbors of cars with a neighbor list, False to compare every car
+                to all other cars. Tile workers do not use a neighbor list.
+            level_of_detail (bool): True to simulate isolated cars at a lower level of detail, False to simulate all
+                cars at full detail. Not supported by tile workers, which always simulate at full detail.
+            adaptive_integrator (bool): True to move cars with the adaptive integrator, which splits steps near
+                contacts and sharp turns for accuracy, False to move them with a single update per step.
+            proximity (bool): True to share the distances between nearby cars between collision counting and the
+                neighbor search with a proximity structure, False to compare the cars in each separately. Tile workers
+                do not use a proximity structure.
+
+        Raises:
+            ValueError: If the level of detail or the adaptive integrator is combined with tile workers, which always
+                simulate at full detail and move cars with a single update per step.
 
         """
         self.world_generator = world_generator
@@ -34,12 +91,38 @@ class Scenario:
         self.neighbor_count = neighbor_count
         self.rule_weights = rule_weights
         self.simulation_time = simulation_time
+        self.tile_workers = tile_workers
+        self.control_interval = control_interval
+        self.staggered_control = staggered_control
+        self.precision = precision
+        self.double_buffered = double_buffered or tile_workers > 1
+        self.neighbor_list = neighbor_list
+        self.level_of_detail = level_of_detail
+        if level_of_detail and tile_workers > 1:
+            raise ValueError('Tile workers do not support the level of detail')
+        if adaptive_integrator and tile_workers > 1:
+            raise ValueError('Tile workers do not support the adaptive integrator')
+        self.adaptive_integrator = adaptive_integrator
+        self.proximity = proximity
+        self.result_cache: Optional['ResultCache'] = None
+        self.telemetry: Optional['TelemetryPublisher'] = None
+        self.arrival_steps: Optional[array] = None
+        self.statistics: Dict[str, float] = {}
 
     def simulate(self, **simulation_variables: ...):
         """Simulates this scenario given its simulation variables.
 
         The simulation variables are passed to the world generator function which was specified upon initialization
-        of this scenario. These variables can be used to easily vary simulation parameters over multiple runs.
+        of this scenario. These variables can be used to easily vary simulation parameters over multiple runs. A
+        'seed' variable additionally seeds the random number generator before the world is generated.
+
+        Afterwards, the step after which each car reached its final goal is available as the arrival steps of this
+        scenario, with -1 for cars that never did, and the statistics of the accelerators of the world, e.g., the hit
+        rate of the neighbor list or the largest per-span deviation bound of the level of detail, as the statistics of
+        this scenario. Results taken from the cache have no statistics.
+
+        If this scenario has a result cache, the results of seeded runs are taken from the cache when available, and
+        stored in it otherwise.
 
         Args:
             simulation_variables (...): The variables to be passed to the world generator.
@@ -47,100 +130,317 @@ class Scenario:
         Returns:
             List[int]: Time series of the collisions measured during the simulation.
             List[float]: Time series of the flocking density measured during the simulation.
-            int: The amount of steps after which the goal was reached. Always 0 if there is no active goal.
+            int: The amount of steps after which all cars reached their final goal. Always 0 if there is no active goal.
 
         """
+        world = self.generate_world(**simulation_variables)
+        cache = self.result_cache
+        key = None if cache is None else cache.key(self, simulation_variables, world)
+        if key is not None:
+            cached = cache.load(key)
+            if cached is not None:
+                collisions, flocking_performance, steps_to_goal, self.arrival_steps = cached
+                self.statistics = {}
+                return collisions, self.precision.series(flocking_performance), steps_to_goal
+
+        results = self.simulate_world(world)
+        if key is not None:
+            cache.store(key, *results, self.arrival_steps, self.precision.typecode)
+        return results
+
+    def generate_world(self, **simulation_variables: ...) -> World:
+        """Generates the world of this scenario given its simulation variables.
+
+        If the simulation variables contain a 'seed', the random number generator is seeded with it first, so the
+        same seed always results in the same world.
+
+        Args:
+            simulation_variables (...): The variables to be passed to the world generator.
+
+        Returns:
+            World: The generated world.
+
+        """
+        if 'seed' in simulation_variables:
+            random.seed(simulation_variables['seed'])
         world = self.world_generator(simulation_variables)
-        goal_reached = not world.goal.active
+        self.configure(world)
+        return world
+
+    def configure(self, world: World):
+        """Applies the settings of this scenario on how cars are updated to the given world.
+
+        Args:
+            world (World): The world to configure.
+
+        """
+        world.double_buffered = self.double_buffered
+        if not self.neighbor_list:
+            world.neighbor_list = None
+        else:
+            from neighbor_list import NeighborList
+            world.neighbor_list = NeighborList()
+        if not self.level_of_detail:
+            world.level_of_detail = None
+        elif world.level_of_detail is None:
+            from lod import LevelOfDetail
+            world.level_of_detail = LevelOfDetail()
+        else:
+            world.level_of_detail.reset_statistics()
+        if not self.adaptive_integrator:
+            world.integrator = None
+        elif world.integrator is None:
+            from integrator import AdaptiveIntegrator
+            world.integrator = AdaptiveIntegrator()
+        else:
+            world.integrator.reset_statistics()
+        if not self.proximity:
+            world.proximity = None
+        elif world.proximity is None:
+            from proximity import Proximity
+            world.proximity = Proximity()
+        world.control_interval = self.control_interval
+        world.staggered_control = self.staggered_control
+        world.precision = self.precision
+        if isinstance(world.flocking_performance_distribution, (list, array)):
+            world.flocking_performance_distribution = self.precision.series(world.flocking_performance_distribution)
+
+    def simulate_world(self, world: World):
+        """Simulates this scenario using the given world.
+
+        Args:
+            world (World): The world to simulate, as generated by generate_world.
+
+        Returns:
+            List[int]: Time series of the collisions measured during the simulation.
+            List[float]: Time series of the flocking density measured during the simulation.
+            int: The amount of steps after which all cars reached their final goal. Always 0 if there is no active goal.
+
+        """
+        if self.telemetry is not None:
+            self.telemetry.begin_run(world)
+        with self.engine(world) as engine:
+            steps_to_goal = self.approach_goal(engine)
+            self.continue_after_goal(engine)
+        self.record_statistics(world)
+        return world.collision_distribution, world.flocking_performance_distribution, steps_to_goal
+
+    def warm_up(self, **simulation_variables: ...) -> 'WorldSnapshot':
+        """Simulates this scenario until all cars have reached their goal, capturing the resulting world.
+
+        The captured world can be continued any number of times with simulate_from, also by other scenarios with the
+        same steps per second but, for instance, different rule weights. This avoids simulating the same approach of
+        the goal for each continuation.
+
+        Args:
+            simulation_variables (...): The variables to be passed to the world generator.
+
+        Returns:
+            WorldSnapshot: A snapshot of the world at the moment all cars reached their final goal.
+
+        """
+        from snapshot import WorldSnapshot
+        world = self.generate_world(**simulation_variables)
+        if self.telemetry is not None:
+            self.telemetry.begin_run(world)
+        with self.engine(world) as engine:
+            self.approach_goal(engine)
+        return WorldSnapshot.capture(world)
+
+    def simulate_from(self, snapshot: 'WorldSnapshot'):
+        """Simulates this scenario from a world captured with warm_up, after the goal is reached.
+
+        Args:
+            snapshot (WorldSnapshot): The world to continue, captured at the moment all cars reached their final goal.
+
+        Returns:
+            List[int]: Time series of the collisions measured during the entire simulation, including the warm-up.
+            List[float]: Time series of the flocking density measured during the entire simulation, including the
+                warm-up.
+            int: The amount of steps after which all cars reached their final goal. Always 0 if there is no active goal.
+
+        """
+        world = snapshot.restore()
+        self.configure(world)
+        steps_to_goal = world.step_count
+        if self.telemetry is not None:
+            self.telemetry.begin_run(world)
+        with self.engine(world) as engine:
+            self.continue_after_goal(engine)
+        self.record_statistics(world)
+        return world.collision_distribution, world.flocking_performance_distribution, steps_to_goal
+
+    def record_statistics(self, world: World):
+        """Keeps the arrival steps of the cars and the statistics of the accelerators of a simulated world.
+
+        Args:
+            world (World): The simulated world.
+
+        """
+        self.arrival_steps = world.arrival_steps
+        self.statistics = {}
+        if world.neighbor_list is not None:
+            self.statistics['neighbor_list_hits'] = world.neighbor_list.hits
+            self.statistics['neighbor_list_rebuilds'] = world.neighbor_list.rebuilds
+            self.statistics['neighbor_list_hit_rate'] = world.neighbor_list.hit_rate
+        if world.level_of_detail is not None:
+            self.statistics['level_of_detail_reduced_fraction'] = world.level_of_detail.reduced_fraction
+            self.statistics['level_of_detail_max_span_deviation'] = world.level_of_detail.max_span_deviation
+        if world.integrator is not None:
+            self.statistics['integrator_substeps'] = world.integrator.substeps
+            self.statistics['integrator_evaluations'] = world.integrator.evaluations
+
+    def engine(self, world: World) -> ContextManager[Union[World, 'DistributedWorld']]:
+        """Determines what updates the given world during simulations.
+
+        Args:
+            world (World): The world to update.
+
+        Returns:
+            ContextManager[Union[World, DistributedWorld]]: A context providing the world itself, or a distributed world
+                updating it if tile workers are configured. The world is up to date once the context is exited.
+
+        """
+        if self.tile_workers > 1:
+            from distributed_world import DistributedWorld
+            return DistributedWorld(world, self.tile_workers)
+        return nullcontext(world)
+
+    def approach_goal(self, world: Union[World, 'DistributedWorld']) -> int:
+        """Updates the given world until all cars have reached their final goal.
+
+        Args:
+            world (Union[World, DistributedWorld]): The world to update.
+
+        Returns:
+            int: The amount of steps after which all cars reached their final goal. Always 0 if there is no active goal.
+
+        """
+        goal_reached = not world.has_active_goal()
         dt = 1.0 / self.steps_per_second
 
         step_counter = 0
         while not goal_reached:
             goal_reached = world.update(dt, self.neighbor_count, self.rule_weights)
             step_counter += 1
+            if self.telemetry is not None:
+                self.telemetry.record(world, 'approach')
+        if self.telemetry is not None:
+            self.telemetry.flush()
+        return step_counter
 
-        steps_to_goal = step_counter
+    def continue_after_goal(self, world: Union[World, 'DistributedWorld']):
+        """Updates the given world for the simulation time of this scenario.
+
+        Args:
+            world (Union[World, DistributedWorld]): The world to update.
+
+        """
+        dt = 1.0 / self.steps_per_second
 
         step_goal = self.simulation_time * self.steps_per_second
         step_counter = 0
         while step_counter < step_goal:
             world.update(dt, self.neighbor_count, self.rule_weights)
             step_counter += 1
+            if self.telemetry is not None:
+                self.telemetry.record(world, 'continue')
+        if self.telemetry is not None:
+            self.telemetry.flush()
 
-        return world.collision_distribution, world.flocking_performance_distribution, steps_to_goal
-
-    def simulate_visual(self, pixel_meter_ratio: int, world_color: Color, goal_color: Color, vector_color: Color,
-                        car_image_path: str, **simulation_variables: ...):
+    def simulate_visual(self, pixel_meter_ratio: int, world_color: Union[str, 'Color'], goal_color: Union[str, 'Color'],
+                        vector_color: Union[str, 'Color'], car_image_path: str, **simulation_variables: ...):
         """Simulates this scenario visually in real-time given its simulation variables.
 
         The simulation variables are passed to the world generator function which was specified upon initialization
         of this scenario. These variables can be used to easily vary simulation parameters over multiple runs. The other
         arguments customize the visual representation of the simulation.
 
-        With a visual simulation, the steps will be processed in real-time. However, if the simulation is too
-        computationally complex, the time required to calculate the next time can exceed the duration of the time step.
-        If this is the case, notice is given via a print statement. Note that the resulting performance measure
-        distributions will be inaccurate as a result.
+        The world is drawn by a renderer in a separate process, which always shows the latest completed step. Every step
+        progresses the simulation by the same time step, and steps are paced to real-time without waiting for the
+        display. If the simulation is too computationally complex, the time required to calculate a step can exceed the
+        duration of the time step. If this is the case, notice is given via a print statement, and the simulation runs
+        slower than real-time. The simulation stops early once the window is closed.
+
+        The world is updated by the engine of this scenario and its metrics are published to the telemetry publisher,
+        as in headless simulations. With tile workers, the world is synchronized after every step so it can be drawn.
 
         Args:
             simulation_variables (...): The variables to be passed to the world generator.
             pixel_meter_ratio (int): The amount of pixels corresponding to one meter.
-            world_color (Color): The color the world should be, i.e., the background color.
-            goal_color (Color): The color goals should be.
-            vector_color (Color): The color of flocking vectors originating from cars.
+            world_color (Union[str, Color]): The color or name of the color the world should be, i.e., the background
+                color.
+            goal_color (Union[str, Color]): The color or name of the color goals should be.
+            vector_color (Union[str, Color]): The color or name of the color of flocking vectors originating from cars.
             car_image_path (str): The filepath to the image visualizing a car.
 
         Returns:
             List[int]: Time series of the collisions measured during the simulation.
             List[float]: Time series of the flocking density measured during the simulation.
-            int: The amount of steps after which the goal was reached. Always 0 if there is no active goal.
+            int: The amount of steps after which all cars reached their final goal. Always 0 if there is no active goal.
 
         """
-        world = self.world_generator(simulation_variables)
-        goal_reached = not world.goal.active
-
-        pygame.init()
-        screen = pygame.display.set_mode((world.width * pixel_meter_ratio, world.height * pixel_meter_ratio))
-
-        step_counter = 0
-        running = True
-        clock = pygame.time.Clock()
-        while not goal_reached and running:
-            for event in pygame.event.get():
-                if event.type == pygame.QUIT:
-                    running = False
-
-            dt = clock.get_time() / 1000.0
-            if dt > 1.0 / (self.steps_per_second - 1):
-                print("Could not compute steps per second in real-time")
-
-            goal_reached = world.update(dt, self.neighbor_count, self.rule_weights)
-            step_counter += 1
+        from renderer import Renderer
 
-            draw_world(world, world_color, goal_color, vector_color, pygame.image.load(car_image_path),
-                       screen, pixel_meter_ratio)
-            pygame.display.update()
-            clock.tick_busy_loop(self.steps_per_second)
-
-        steps_to_goal = step_counter
+        world = self.generate_world(**simulation_variables)
+        goal_reached = not world.has_active_goal()
+        dt = 1.0 / self.steps_per_second
+        if self.telemetry is not None:
+            self.telemetry.begin_run(world)
+
+        with self.engine(world) as engine, \
+                Renderer(world, pixel_meter_ratio, world_color, goal_color, vector_color, car_image_path) as renderer:
+
+            def advance(phase: str) -> bool:
+                finished = engine.update(dt, self.neighbor_count, self.rule_weights)
+                if engine is not world:
+                    engine.synchronize()
+                renderer.publish(world)
+                if self.telemetry is not None:
+                    self.telemetry.record(engine, phase)
+                return finished
+
+            deadline = time.perf_counter()
+            step_counter = 0
+            while not goal_reached and not renderer.closed:
+                goal_reached = advance('approach')
+                step_counter += 1
+                deadline = self.pace(deadline + dt, dt)
+
+            steps_to_goal = step_counter
+
+            step_goal = self.simulation_time * self.steps_per_second
+            step_counter = 0
+            while step_counter < step_goal and not renderer.closed:
+                advance('continue')
+                step_counter += 1
+                deadline = self.pace(deadline + dt, dt)
+
+        if self.telemetry is not None:
+            self.telemetry.flush()
+
+        self.record_statistics(world)
+        return world.collision_distribution, world.flocking_performance_distribution, steps_to_goal
 
-        step_goal = self.simulation_time * self.steps_per_second
-        step_counter = 0
-        while step_counter < step_goal and running:
-            for event in pygame.event.get():
-                if event.type == pygame.QUIT:
-                    running = False
+    @staticmethod
+    def pace(deadline: float, dt: float) -> float:
+        """Waits until the moment at which the next step of a real-time simulation is due.
 
-            dt = clock.get_time() / 1000.0
-            if dt > 1.0 / (self.steps_per_second - 1):
-                print("Could not compute steps per second in real-time")
+        A simulation that is less than one time step behind catches up during the following steps.
 
-            world.update(dt, self.neighbor_count, self.rule_weights)
-            step_counter += 1
+        Args:
+            deadline (float): The moment in seconds, in terms of the performance counter, the next step is due.
+            dt (float): The time step of the simulation in seconds.
 
-            draw_world(world, world_color, goal_color, vector_color, pygame.image.load(car_image_path),
-                       screen, pixel_meter_ratio)
-            pygame.display.update()
-            clock.tick_busy_loop(self.steps_per_second)
+        Returns:
+            float: The moment the next step is due, which is moved to the present if the simulation fell behind by more
+                than one time step.
 
-        return world.collision_distribution, world.flocking_performance_distribution, steps_to_goal
+        """
+        delay = deadline - time.perf_counter()
+        if delay > 0:
+            time.sleep(delay)
+        elif delay < -dt:
+            print("Could not compute steps per second in real-time")
+            return time.perf_counter()
+        return deadline
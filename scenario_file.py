@@ -0,0 +1,214 @@
+"""This module contains functionality to store libraries of starting configurations of worlds in a compact file.
+
+A scenario file describes the world dimensions, goals, walls, the resolution of the goal fields and the types of cars
+shared by all configurations in a small JSON header. The initial state of the cars of every configuration is stored as
+packed arrays of little-endian values, in which the cars of configuration i are found between the configuration offsets
+i and i + 1. The initial state is stored exactly as represented in the simulation, so the same configuration results in
+the same simulation on every machine.
+
+Loading a library only reads the arrays, regardless of the amount of configurations. Car objects are only constructed
+for the configuration that is turned into a world. A library can be used directly as the world generator of a scenario,
+selecting the configuration with the 'configuration' simulation variable.
+
+"""
+
+from array import array
+from typing import Dict, List, Optional
+from binary_format import pack, unpack
+from car import Car
+from car_spec import CarSpec
+from goal import Goal
+from goal_field import GoalFieldCache
+from vector import Vector
+from wall import Wall
+from world import World
+
+MAGIC = b'CFSL'
+
+VERSION = 2
+
+STATE_FIELDS = ['x', 'y', 'steering_angle', 'velocity', 'steering_change', 'acceleration']
+
+
+def field_resolution(world: World) -> Optional[float]:
+    """Determines the resolution of the goal fields of a world.
+
+    Args:
+        world (World): The world.
+
+    Returns:
+        Optional[float]: The resolution of the goal fields in meters, or None if the world steers cars straight towards
+            their goals.
+
+    """
+    return None if world.goal_fields is None else world.goal_fields.resolution
+
+
+class ScenarioLibrary:
+
+    def __init__(self, header: Dict, arrays: Dict[str, array]):
+        """Initializes a new scenario library object from its header and arrays.
+
+        Libraries are normally created with from_worlds or load instead.
+
+        Args:
+            header (Dict): The world dimensions, goals, walls, goal field resolution and car types shared by all
+                configurations.
+            arrays (Dict[str, array]): The initial state of the cars of all configurations, by name.
+
+        """
+        self.header: Dict = header
+        self.arrays: Dict[str, array] = arrays
+
+    def __len__(self) -> int:
+        """Determines the amount of configurations in this library.
+
+        Returns:
+            int: The amount of configurations.
+
+        """
+        return len(self.arrays['configuration_offsets']) - 1
+
+    @classmethod
+    def from_worlds(cls, worlds: List[World]) -> 'ScenarioLibrary':
+        """Creates a library containing the current state of the given worlds as starting configurations.
+
+        All worlds should share the same dimensions, goals, walls and goal field resolution, which are taken from the
+        first world.
+
+        Args:
+            worlds (List[World]): The worlds to store, for instance freshly returned by a world generator.
+
+        Returns:
+            ScenarioLibrary: A library with one configuration per world.
+
+        Raises:
+            ValueError: If the worlds do not share the same dimensions, goals, walls and goal field resolution.
+
+        """
+        first_world = worlds[0]
+        header = {
+            'width': first_world.width,
+            'height': first_world.height,
+            'goals': [[goal.x, goal.y, goal.active, goal.next_goal] for goal in first_world.goals],
+            'walls': [[wall.x1, wall.y1, wall.x2, wall.y2] for wall in first_world.walls],
+            'field_resolution': field_resolution(first_world),
+            'car_types': [],
+        }
+
+        car_types = {}
+        arrays = {field: array('d') for field in STATE_FIELDS + ['direction_x', 'direction_y']}
+        arrays['goal_index'] = array('q')
+        arrays['car_type'] = array('q')
+        arrays['configuration_offsets'] = array('q', [0])
+
+        for world in worlds:
+            if (world.width, world.height) != (header['width'], header['height']) or \
+                    [[goal.x, goal.y, goal.active, goal.next_goal] for goal in world.goals] != header['goals'] or \
+                    [[wall.x1, wall.y1, wall.x2, wall.y2] for wall in world.walls] != header['walls'] or \
+                    field_resolution(world) != header['field_resolution']:
+                raise ValueError('All worlds in a scenario library should share dimensions, goals, walls and '
+                                 'goal field resolution')
+            for car in world.cars:
+                car_type = tuple(car.spec.parameters())
+                if car_type not in car_types:
+                    car_types[car_type] = len(car_types)
+                    header['car_types'].append(list(car_type))
+                arrays['car_type'].append(car_types[car_type])
+                for field in STATE_FIELDS:
+                    arrays[field].append(getattr(car, field))
+                arrays['direction_x'].append(car.direction.x)
+                arrays['direction_y'].append(car.direction.y)
+                arrays['goal_index'].append(car.goal_index)
+            arrays['configuration_offsets'].append(len(arrays['x']))
+        return cls(header, arrays)
+
+    def world(self, configuration: int) -> World:
+        """Creates a world in the specified starting configuration.
+
+        Args:
+            configuration (int): The index of the configuration.
+
+        Returns:
+            World: A new world in the starting configuration.
+
+        """
+        header = self.header
+        arrays = self.arrays
+
+        world = World(header['width'], header['height'])
+        world.goals = [Goal(x, y, active, next_goal) for x, y, active, next_goal in header['goals']]
+        world.walls = [Wall(x1, y1, x2, y2) for x1, y1, x2, y2 in header['walls']]
+        if header['field_resolution'] is not None:
+            world.goal_fields = GoalFieldCache(header['field_resolution'])
+
+        specs = [CarSpec.from_parameters(parameters) for parameters in header['car_types']]
+        offsets = arrays['configuration_offsets']
+        for i in range(offsets[configuration], offsets[configuration + 1]):
+            car = Car(specs[arrays['car_type'][i]])
+            for field in STATE_FIELDS:
+                setattr(car, field, arrays[field][i])
+            car.direction = Vector(arrays['direction_x'][i], arrays['direction_y'][i])
+            car.goal_index = arrays['goal_index'][i]
+            world.cars.append(car)
+        return world
+
+    def world_generator(self, simulation_variables: Dict) -> World:
+        """Creates a world in the configuration given by the simulation variables, for use as world generator.
+
+        Args:
+            simulation_variables (Dict): The simulation variables, containing the index of the configuration under the
+                key 'configuration'.
+
+        Returns:
+            World: A new world in the starting configuration.
+
+        """
+        return self.world(simulation_variables['configuration'])
+
+    def to_bytes(self) -> bytes:
+        """Serializes this library into its binary format.
+
+        Returns:
+            bytes: The binary representation of this library.
+
+        """
+        return pack(MAGIC, VERSION, self.header, self.arrays)
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> 'ScenarioLibrary':
+        """Deserializes a library from its binary format.
+
+        Args:
+            data (bytes): The binary representation of a library.
+
+        Returns:
+            ScenarioLibrary: The deserialized library.
+
+        """
+        header, arrays = unpack(MAGIC, VERSION, data)
+        return cls(header, arrays)
+
+    def save(self, path: str):
+        """Stores this library in a file.
+
+        Args:
+            path (str): The path of the file to store the library in.
+
+        """
+        with open(path, 'wb') as file:
+            file.write(self.to_bytes())
+
+    @classmethod
+    def load(cls, path: str) -> 'ScenarioLibrary':
+        """Loads a library from a file.
+
+        Args:
+            path (str): The path of the file containing the library.
+
+        Returns:
+            ScenarioLibrary: The loaded library.
+
+        """
+        with open(path, 'rb') as file:
+            return cls.from_bytes(file.read())
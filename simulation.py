@@ -1,13 +1,45 @@
-"""This module contains example code to configure and run simulations.
+"""This module contains example code to configure and run simulations, and a command-line interface to run them.
+
+The module constants hold the default configuration. A scenario configuration file in JSON format can override them,
+for instance {"scenario": "open", "steps_per_second": 20, "variables": {"car_count": 50}}, and command-line options
+override both. Importing this module only defines the configuration and world generators; nothing is simulated.
+
+The command-line interface has the following subcommands:
+
+- run: simulates a scenario once, headless or visually, and writes its results.
+- sweep: simulates a scenario once per seed in worker processes and writes statistics across the runs.
+- bench: measures the import time of the headless modules and the amount of steps simulated per second.
+- replay: continues a snapshot of a world saved by run, and writes its results.
+- precision: compares the results at single precision with those at double precision for a batch of seeds.
+- library: saves the starting configurations of a scenario for a batch of seeds to a scenario library file.
+
+With --library FILE, every subcommand takes the world from a configuration of a scenario library instead, selected with
+--configuration.
+
+For example: python simulation.py run --visual, or python simulation.py sweep --seeds 32 --workers 8 -o sweep.csv
+
+The run, sweep and replay subcommands can stream live metrics with --telemetry ADDRESS, which python telemetry.py
+ADDRESS displays.
 
 """
 
+import argparse
+import csv
+import json
+import os
+import sys
+import time
 from random import randrange
-from typing import Dict
-from pygame import Color
+from typing import Dict, List, Optional, TextIO
 from car import Car
+from car_spec import CarSpec
 from goal import Goal
+from precision import PRECISIONS, validate_precision
+from result_cache import ResultCache
 from scenario import Scenario
+from snapshot import WorldSnapshot
+from telemetry import TelemetryPublisher
+from trajectory import TrajectoryRecorder
 from world import World
 
 """
@@ -53,6 +85,9 @@ CAR_MAX_STEERING_ANGLE = 37.0
 
 CAR_MAX_STEERING_CHANGE = CAR_MAX_STEERING_ANGLE
 
+CAR_SPEC = CarSpec(CAR_LENGTH, CAR_WIDTH, CAR_WHEELBASE, CAR_MAX_VELOCITY, CAR_MAX_ACCELERATION,
+                   CAR_MAX_STEERING_ANGLE, CAR_MAX_STEERING_CHANGE)
+
 """
 ------------------
 VIEW CONFIGURATION
@@ -67,39 +102,37 @@ PIXEL_METER_RATIO = 8
 """
 World (View)
 """
-WORLD_COLOR = Color('white')
+WORLD_COLOR = 'white'
 
 """
 Wall (View)
 """
-WALL_COLOR = Color('black')
+WALL_COLOR = 'black'
 
 """
 Goal (View)
 """
-GOAL_COLOR = Color('blue')
+GOAL_COLOR = 'blue'
 
 """
 Car (View)
 """
-CAR_IMAGE_PATH = "car.png"
+CAR_IMAGE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'car.png')
 
 """
 Vector (View)
 """
-VECTOR_COLOR = Color('red')
+VECTOR_COLOR = 'red'
 
 
 def open_scenario(simulation_variables: Dict) -> World:
     world = World(WORLD_WIDTH, WORLD_HEIGHT)
 
-    for i in range(simulation_variables['car_count']):
+    for i in range(simulation_variables.get('car_count', CAR_COUNT)):
         car_x = randrange(1, WORLD_WIDTH)
         car_y = randrange(1, WORLD_HEIGHT)
         car_angle = randrange(0, 360)
-        new_car = Car(CAR_LENGTH, CAR_WIDTH, CAR_WHEELBASE, CAR_MAX_VELOCITY, CAR_MAX_ACCELERATION,
-                      CAR_MAX_STEERING_ANGLE, CAR_MAX_STEERING_CHANGE, x=car_x, y=car_y,
-                      acceleration=2, steering_angle=0, angle=car_angle)
+        new_car = Car(CAR_SPEC, x=car_x, y=car_y, acceleration=2, steering_angle=0, angle=car_angle)
         world.cars.append(new_car)
 
     return world
@@ -108,13 +141,11 @@ def open_scenario(simulation_variables: Dict) -> World:
 def goal_scenario(simulation_variables: Dict) -> World:
     world = World(WORLD_WIDTH, WORLD_HEIGHT)
 
-    for i in range(CAR_COUNT):
-        car_x = randrange(1, WORLD_WIDTH / 3)
+    for i in range(simulation_variables.get('car_count', CAR_COUNT)):
+        car_x = randrange(1, WORLD_WIDTH // 3)
         car_y = randrange(1, WORLD_HEIGHT)
         car_angle = randrange(0, 360)
-        new_car = Car(CAR_LENGTH, CAR_WIDTH, CAR_WHEELBASE, CAR_MAX_VELOCITY, CAR_MAX_ACCELERATION,
-                      CAR_MAX_STEERING_ANGLE, CAR_MAX_STEERING_CHANGE, x=car_x, y=car_y,
-                      acceleration=2, steering_angle=0, angle=car_angle)
+        new_car = Car(CAR_SPEC, x=car_x, y=car_y, acceleration=2, steering_angle=0, angle=car_angle)
         world.cars.append(new_car)
 
     world.goal = Goal(WORLD_WIDTH * 5 / 6, WORLD_HEIGHT / 2, True)
@@ -122,6 +153,468 @@ def goal_scenario(simulation_variables: Dict) -> World:
     return world
 
 
-s = Scenario(goal_scenario, STEPS_PER_SECOND, NEIGHBOR_COUNT, OPTIMIZED_WEIGHTS, 10)
+"""
+-----------------------
+COMMAND-LINE INTERFACE
+-----------------------
+"""
 
-s.simulate_visual(PIXEL_METER_RATIO, WORLD_COLOR, GOAL_COLOR, VECTOR_COLOR, CAR_IMAGE_PATH)
+SCENARIOS = {'open': open_scenario, 'goal': goal_scenario}
+
+DEFAULT_CONFIGURATION = {
+    'scenario': 'goal',
+    'steps_per_second': STEPS_PER_SECOND,
+    'neighbor_count': NEIGHBOR_COUNT,
+    'rule_weights': OPTIMIZED_WEIGHTS,
+    'simulation_time': 10,
+    'control_interval': 1,
+    'staggered_control': False,
+    'double_buffered': False,
+    'neighbor_list': False,
+    'level_of_detail': False,
+    'adaptive_integrator': False,
+    'proximity': False,
+    'precision': 'float64',
+    'library': None,
+    'variables': {'car_count': CAR_COUNT},
+}
+
+RUN_SERIES = ['collisions', 'flocking_performance']
+
+TELEMETRY_HELP = "'host:port' or Unix socket path to stream live metrics to"
+
+OVERRIDES = ['scenario', 'steps_per_second', 'neighbor_count', 'rule_weights', 'simulation_time', 'control_interval',
+             'precision', 'library']
+
+
+def load_configuration(arguments: argparse.Namespace) -> Dict:
+    """Determines the scenario configuration from the defaults, the configuration file and the command-line options.
+
+    Args:
+        arguments (argparse.Namespace): The parsed command-line options.
+
+    Returns:
+        Dict: The scenario configuration.
+
+    Raises:
+        ValueError: If the configuration file contains unknown keys or an unknown scenario, or if the configuration
+            enables an option that the tile workers do not support.
+
+    """
+    configuration = dict(DEFAULT_CONFIGURATION)
+    configuration['variables'] = dict(DEFAULT_CONFIGURATION['variables'])
+    if arguments.config is not None:
+        with open(arguments.config) as file:
+            loaded = json.load(file)
+        unknown = set(loaded) - set(DEFAULT_CONFIGURATION)
+        if unknown:
+            raise ValueError('Unknown configuration keys: ' + ', '.join(sorted(unknown)))
+        configuration['variables'].update(loaded.pop('variables', {}))
+        configuration.update(loaded)
+
+    for key in OVERRIDES:
+        if getattr(arguments, key) is not None:
+            configuration[key] = getattr(arguments, key)
+    if arguments.staggered_control:
+        configuration['staggered_control'] = True
+    if arguments.double_buffered:
+        configuration['double_buffered'] = True
+    if arguments.neighbor_list:
+        configuration['neighbor_list'] = True
+    if arguments.level_of_detail:
+        configuration['level_of_detail'] = True
+    if arguments.adaptive_integrator:
+        configuration['adaptive_integrator'] = True
+    if arguments.proximity:
+        configuration['proximity'] = True
+    if arguments.car_count is not None:
+        configuration['variables']['car_count'] = arguments.car_count
+    if arguments.configuration is not None:
+        configuration['variables']['configuration'] = arguments.configuration
+    elif configuration['library'] is not None:
+        configuration['variables'].setdefault('configuration', 0)
+    if configuration['scenario'] not in SCENARIOS:
+        raise ValueError('Unknown scenario: ' + str(configuration['scenario']))
+    if configuration['precision'] not in PRECISIONS:
+        raise ValueError('Unknown precision: ' + str(configuration['precision']))
+    if getattr(arguments, 'tile_workers', 0) > 1:
+        if configuration['level_of_detail']:
+            raise ValueError('Tile workers do not support the level of detail')
+        if configuration['adaptive_integrator']:
+            raise ValueError('Tile workers do not support the adaptive integrator')
+    return configuration
+
+
+def create_scenario(configuration: Dict, tile_workers: int = 0) -> Scenario:
+    """Creates a scenario from a scenario configuration.
+
+    Args:
+        configuration (Dict): The scenario configuration.
+        tile_workers (int): The amount of worker processes to distribute simulations over, or 0 to simulate in the
+            current process. Tile workers imply double buffering.
+
+    Returns:
+        Scenario: The configured scenario, of which the world generator is a scenario library if one is configured.
+
+    """
+    if configuration['library'] is None:
+        world_generator = SCENARIOS[configuration['scenario']]
+    else:
+        from scenario_file import ScenarioLibrary
+        world_generator = ScenarioLibrary.load(configuration['library']).world_generator
+    return Scenario(world_generator, configuration['steps_per_second'],
+                    configuration['neighbor_count'], configuration['rule_weights'], configuration['simulation_time'],
+                    tile_workers, configuration['control_interval'], configuration['staggered_control'],
+                    PRECISIONS[configuration['precision']], configuration['double_buffered'],
+                    configuration['neighbor_list'], configuration['level_of_detail'],
+                    configuration['adaptive_integrator'], configuration['proximity'])
+
+
+def open_cache(arguments: argparse.Namespace) -> Optional[ResultCache]:
+    """Opens the result cache selected on the command line.
+
+    Args:
+        arguments (argparse.Namespace): The parsed command-line options.
+
+    Returns:
+        Optional[ResultCache]: The result cache, or None if no cache directory was given.
+
+    """
+    if arguments.cache is None:
+        return None
+    return ResultCache(arguments.cache, arguments.cache_size * 1024 * 1024)
+
+
+def open_telemetry(arguments: argparse.Namespace) -> Optional[TelemetryPublisher]:
+    """Creates the telemetry publisher selected on the command line.
+
+    Args:
+        arguments (argparse.Namespace): The parsed command-line options.
+
+    Returns:
+        Optional[TelemetryPublisher]: The telemetry publisher, or None if no telemetry address was given.
+
+    """
+    if arguments.telemetry is None:
+        return None
+    return TelemetryPublisher(arguments.telemetry, arguments.telemetry_interval)
+
+
+def open_output(path: str) -> TextIO:
+    """Opens the sink that results are written to.
+
+    Args:
+        path (str): The path of the file to write to, or '-' to write to the standard output.
+
+    Returns:
+        TextIO: The opened sink.
+
+    """
+    if path == '-':
+        return open(sys.stdout.fileno(), 'w', closefd=False)
+    return open(path, 'w', newline='')
+
+
+def write_results(results: Dict, series: List[str], output: str, output_format: str):
+    """Writes results consisting of time series, and possibly some other values.
+
+    In JSON format, all results are written. In CSV format, every row contains the values of all time series at one
+    step, and the other values are left out.
+
+    Args:
+        results (Dict): The results to write, by name.
+        series (List[str]): The names of the results that are time series.
+        output (str): The path of the file to write to, or '-' to write to the standard output.
+        output_format (str): Either 'json' or 'csv'.
+
+    """
+    with open_output(output) as file:
+        if output_format == 'json':
+            json.dump(results, file)
+            file.write('\n')
+            return
+        writer = csv.writer(file)
+        writer.writerow(['step'] + series)
+        for step, row in enumerate(zip(*[results[name] for name in series])):
+            writer.writerow([step] + list(row))
+
+
+def run_results(collisions: List[int], flocking_performance: List[float], steps_to_goal: int,
+                scenario: Scenario) -> Dict:
+    """Collects the results of a single simulation for writing, including the statistics of its accelerators.
+
+    Args:
+        collisions (List[int]): Time series of the collisions measured during the simulation.
+        flocking_performance (List[float]): Time series of the flocking density measured during the simulation.
+        steps_to_goal (int): The amount of steps after which all cars reached their final goal.
+        scenario (Scenario): The simulated scenario.
+
+    Returns:
+        Dict: The results by name.
+
+    """
+    print('Steps to goal: ' + str(steps_to_goal), file=sys.stderr)
+    for name, value in scenario.statistics.items():
+        print('{}: {:g}'.format(name.replace('_', ' ').capitalize(), value), file=sys.stderr)
+    return {
+        'collisions': list(collisions),
+        'flocking_performance': list(flocking_performance),
+        'steps_to_goal': steps_to_goal,
+        'arrival_steps': [] if scenario.arrival_steps is None else scenario.arrival_steps.tolist(),
+        'statistics': scenario.statistics,
+    }
+
+
+def run_command(arguments: argparse.Namespace, configuration: Dict):
+    """Simulates a scenario once, headless or visually, and writes its results.
+
+    Args:
+        arguments (argparse.Namespace): The parsed command-line options.
+        configuration (Dict): The scenario configuration.
+
+    """
+    scenario = create_scenario(configuration, arguments.tile_workers)
+    scenario.result_cache = open_cache(arguments)
+    scenario.telemetry = open_telemetry(arguments)
+    variables = dict(configuration['variables'])
+    if arguments.seed is not None:
+        variables['seed'] = arguments.seed
+
+    if arguments.visual:
+        results = scenario.simulate_visual(PIXEL_METER_RATIO, WORLD_COLOR, GOAL_COLOR, VECTOR_COLOR, CAR_IMAGE_PATH,
+                                           **variables)
+    elif arguments.trajectory is not None:
+        world = scenario.generate_world(**variables)
+        world.trajectory = TrajectoryRecorder(scenario.precision, arguments.trajectory_interval)
+        results = scenario.simulate_world(world)
+        world.trajectory.save(arguments.trajectory)
+    elif arguments.save_snapshot is not None:
+        snapshot = scenario.warm_up(**variables)
+        snapshot.save(arguments.save_snapshot)
+        results = scenario.simulate_from(snapshot)
+    else:
+        results = scenario.simulate(**variables)
+    write_results(run_results(*results, scenario), RUN_SERIES, arguments.output, arguments.format)
+    if scenario.result_cache is not None:
+        print('Result cache: {} hits, {} misses'.format(scenario.result_cache.hits, scenario.result_cache.misses),
+              file=sys.stderr)
+
+
+def sweep_command(arguments: argparse.Namespace, configuration: Dict):
+    """Simulates a scenario once per seed in worker processes and writes statistics across the runs.
+
+    Args:
+        arguments (argparse.Namespace): The parsed command-line options.
+        configuration (Dict): The scenario configuration.
+
+    """
+    from sweep import Sweep
+
+    scenario = create_scenario(configuration)
+    scenario.result_cache = open_cache(arguments)
+    scenario.telemetry = open_telemetry(arguments)
+    variable_sets = [dict(configuration['variables'], seed=seed)
+                     for seed in range(arguments.first_seed, arguments.first_seed + arguments.seeds)]
+    capacity = arguments.capacity
+    if capacity is None:
+        capacity = (configuration['simulation_time'] + 600) * configuration['steps_per_second']
+
+    with Sweep(scenario, arguments.workers).run(variable_sets, capacity) as results:
+        summary = {'steps_to_goal': results.steps_to_goal.tolist(), 'truncated_runs': results.truncated_runs}
+        if summary['truncated_runs']:
+            print('{} runs exceeded the capacity of {} steps and were truncated'.format(
+                len(summary['truncated_runs']), capacity), file=sys.stderr)
+        for metric in ('collisions', 'flocking_performance'):
+            summary[metric + '_mean'] = results.mean_curve(metric).tolist()
+            for percentile in (10, 50, 90):
+                summary[metric + '_p' + str(percentile)] = results.percentile_curve(metric, percentile).tolist()
+    write_results(summary, [name for name in summary if name not in ('steps_to_goal', 'truncated_runs')],
+                  arguments.output, arguments.format)
+
+
+def bench_command(arguments: argparse.Namespace, configuration: Dict):
+    """Measures the import time of the headless modules and the amount of steps simulated per second.
+
+    Args:
+        arguments (argparse.Namespace): The parsed command-line options.
+        configuration (Dict): The scenario configuration.
+
+    """
+    from startup_benchmark import HEADLESS_MODULES, measure_import
+
+    benchmark = {}
+    for module in HEADLESS_MODULES:
+        duration, imports_pygame = measure_import(module, arguments.repetitions)
+        benchmark['import_' + module + '_ms'] = duration * 1000
+        benchmark['import_' + module + '_pygame'] = imports_pygame
+
+    scenario = create_scenario(configuration)
+    world = scenario.generate_world(**dict(configuration['variables'], seed=arguments.seed))
+    dt = 1.0 / scenario.steps_per_second
+    start = time.perf_counter()
+    for _ in range(arguments.steps):
+        world.update(dt, scenario.neighbor_count, scenario.rule_weights)
+    benchmark['steps_per_second'] = arguments.steps / (time.perf_counter() - start)
+    write_results(benchmark, [], arguments.output, 'json')
+
+
+def replay_command(arguments: argparse.Namespace, configuration: Dict):
+    """Continues a snapshot of a world saved by run, and writes its results.
+
+    Args:
+        arguments (argparse.Namespace): The parsed command-line options.
+        configuration (Dict): The scenario configuration.
+
+    """
+    scenario = create_scenario(configuration, arguments.tile_workers)
+    scenario.telemetry = open_telemetry(arguments)
+    results = scenario.simulate_from(WorldSnapshot.load(arguments.snapshot))
+    write_results(run_results(*results, scenario), RUN_SERIES, arguments.output, arguments.format)
+
+
+def precision_command(arguments: argparse.Namespace, configuration: Dict):
+    """Compares the results at single precision with those at double precision for a batch of seeds.
+
+    Args:
+        arguments (argparse.Namespace): The parsed command-line options.
+        configuration (Dict): The scenario configuration.
+
+    """
+    scenario = create_scenario(configuration)
+    seeds = range(arguments.first_seed, arguments.first_seed + arguments.seeds)
+    report = validate_precision(scenario, seeds, PRECISIONS['float32'], **configuration['variables'])
+    with open_output(arguments.output) as file:
+        if arguments.format == 'json':
+            json.dump(report._asdict(), file)
+            file.write('\n')
+        else:
+            file.write(report.format() + '\n')
+
+
+def library_command(arguments: argparse.Namespace, configuration: Dict):
+    """Saves the starting configurations of a scenario for a batch of seeds to a scenario library file.
+
+    Args:
+        arguments (argparse.Namespace): The parsed command-line options.
+        configuration (Dict): The scenario configuration.
+
+    """
+    from scenario_file import ScenarioLibrary
+
+    scenario = create_scenario(configuration)
+    worlds = [scenario.generate_world(**dict(configuration['variables'], seed=seed))
+              for seed in range(arguments.first_seed, arguments.first_seed + arguments.seeds)]
+    ScenarioLibrary.from_worlds(worlds).save(arguments.library_file)
+
+
+def build_parser() -> argparse.ArgumentParser:
+    """Builds the parser of the command-line interface.
+
+    Returns:
+        argparse.ArgumentParser: The parser, whose subcommands set the function to run as 'command'.
+
+    """
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument('--config', help='scenario configuration file in JSON format')
+    common.add_argument('--scenario', choices=sorted(SCENARIOS), help='world generator to use')
+    common.add_argument('--steps-per-second', type=int)
+    common.add_argument('--neighbor-count', type=int)
+    common.add_argument('--rule-weights', type=float, nargs=4, metavar=('SEPARATION', 'ALIGNMENT', 'COHESION', 'GOAL'))
+    common.add_argument('--simulation-time', type=int, help='seconds to simulate after the goal is reached')
+    common.add_argument('--control-interval', type=int, help='steps between two behavior adjustments of a car')
+    common.add_argument('--staggered-control', action='store_true', help='let cars re-plan at different steps')
+    common.add_argument('--double-buffered', action='store_true',
+                        help='adjust all cars based on the previous step, as tile workers do')
+    common.add_argument('--neighbor-list', action='store_true', help='find the neighbors of cars with a neighbor list')
+    common.add_argument('--level-of-detail', action='store_true',
+                        help='simulate isolated cars at a lower level of detail, bounding its deviation per span')
+    common.add_argument('--adaptive-integrator', action='store_true',
+                        help='split steps near contacts and sharp turns, for accuracy rather than speed')
+    common.add_argument('--proximity', action='store_true',
+                        help='share distances between collision counting and neighbor search, for large worlds')
+    common.add_argument('--car-count', type=int)
+    common.add_argument('--library', help='scenario library file to take the world from instead of the scenario')
+    common.add_argument('--configuration', type=int, help='index of the configuration in the scenario library')
+    common.add_argument('--precision', choices=sorted(PRECISIONS), help='precision of the state of the cars')
+    common.add_argument('-o', '--output', default='-', help="file to write results to, or '-' for the standard output")
+    common.add_argument('--format', choices=['json', 'csv'], default='json', help='format of the results')
+
+    parser = argparse.ArgumentParser(description='Simulates cars controlled by flocking rules.')
+    subparsers = parser.add_subparsers(dest='subcommand', required=True)
+
+    run = subparsers.add_parser('run', parents=[common], help='simulate a scenario once')
+    run.add_argument('--seed', type=int)
+    run.add_argument('--visual', action='store_true', help='simulate visually in real-time')
+    run.add_argument('--tile-workers', type=int, default=0,
+                     help='worker processes to simulate with, implies --double-buffered')
+    run.add_argument('--save-snapshot', help='file to save a snapshot of the world to once the goal is reached')
+    run.add_argument('--trajectory', help='file to save the recorded trajectories of the cars to')
+    run.add_argument('--trajectory-interval', type=int, default=1, help='steps between two recorded frames')
+    run.add_argument('--cache', help='directory of a result cache to reuse the results of seeded runs from')
+    run.add_argument('--cache-size', type=int, default=256, help='size in megabytes above which results are evicted')
+    run.add_argument('--telemetry', metavar='ADDRESS', help=TELEMETRY_HELP)
+    run.add_argument('--telemetry-interval', type=int, default=10, help='steps between two telemetry samples')
+    run.set_defaults(command=run_command)
+
+    sweep = subparsers.add_parser('sweep', parents=[common], help='simulate a scenario once per seed')
+    sweep.add_argument('--seeds', type=int, default=8, help='amount of seeds to simulate')
+    sweep.add_argument('--first-seed', type=int, default=0)
+    sweep.add_argument('--workers', type=int, default=os.cpu_count(), help='worker processes to simulate with')
+    sweep.add_argument('--capacity', type=int, help='maximum amount of steps recorded per run, beyond which runs are '
+                                                    'recorded as truncated')
+    sweep.add_argument('--cache', help='directory of a result cache to reuse the results of runs from')
+    sweep.add_argument('--cache-size', type=int, default=256, help='size in megabytes above which results are evicted')
+    sweep.add_argument('--telemetry', metavar='ADDRESS', help=TELEMETRY_HELP)
+    sweep.add_argument('--telemetry-interval', type=int, default=10, help='steps between two telemetry samples')
+    sweep.set_defaults(command=sweep_command)
+
+    bench = subparsers.add_parser('bench', parents=[common], help='measure import time and simulation speed')
+    bench.add_argument('--steps', type=int, default=500)
+    bench.add_argument('--seed', type=int, default=0)
+    bench.add_argument('--repetitions', type=int, default=5, help='fresh interpreters to measure imports in')
+    bench.set_defaults(command=bench_command)
+
+    replay = subparsers.add_parser('replay', parents=[common], help='continue a snapshot saved by run')
+    replay.add_argument('snapshot', help='snapshot file saved with run --save-snapshot')
+    replay.add_argument('--tile-workers', type=int, default=0,
+                        help='worker processes to simulate with, implies --double-buffered')
+    replay.add_argument('--telemetry', metavar='ADDRESS', help=TELEMETRY_HELP)
+    replay.add_argument('--telemetry-interval', type=int, default=10, help='steps between two telemetry samples')
+    replay.set_defaults(command=replay_command)
+
+    precision = subparsers.add_parser('precision', parents=[common],
+                                      help='compare single precision with double precision')
+    precision.add_argument('--seeds', type=int, default=8, help='amount of seeds to simulate')
+    precision.add_argument('--first-seed', type=int, default=0)
+    precision.set_defaults(command=precision_command)
+
+    library = subparsers.add_parser('library', parents=[common], help='save starting configurations to a library')
+    library.add_argument('library_file', help='scenario library file to write, with one configuration per seed')
+    library.add_argument('--seeds', type=int, default=8, help='amount of seeds to generate configurations for')
+    library.add_argument('--first-seed', type=int, default=0)
+    library.set_defaults(command=library_command)
+    return parser
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Runs the command-line interface.
+
+    Args:
+        argv (Optional[List[str]]): The command-line arguments, or None to use those of the process.
+
+    Returns:
+        int: The exit status.
+
+    """
+    parser = build_parser()
+    arguments = parser.parse_args(argv)
+    try:
+        configuration = load_configuration(arguments)
+    except (OSError, ValueError) as error:
+        parser.error(str(error))
+    arguments.command(arguments, configuration)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
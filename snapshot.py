@@ -0,0 +1,213 @@
+"""This module contains functionality to capture the full state of a world and restore it later, possibly elsewhere.
+
+A snapshot contains everything that determines how a world continues: the car types, the kinematic state and type of
+every car, which cars overlap, which cars have reached their goal and when, the goals and walls, and the performance
+measures recorded so far together with the step count. The settings of the engine that change how a world continues
+are captured as well: double buffering, the control interval, staggered control, the adaptive integrator and the level
+of detail scheduler, as well as the proximity structure. The neighbor list does not change the results and is not
+captured.
+Restoring a snapshot yields a world that continues exactly like the captured world would have. Snapshots can be
+stored in a compact binary format and restored in another process, so that a single warm-up phase can be continued many
+times, for instance with different rule weights. The state of the cars is stored at the precision of the world, so
+snapshots of worlds at single precision are half the size without losing anything.
+
+"""
+
+from array import array
+from typing import Dict
+from binary_format import pack, unpack
+from car import Car
+from car_spec import CarSpec
+from goal import Goal
+from goal_field import GoalFieldCache
+from integrator import AdaptiveIntegrator
+from lod import LevelOfDetail
+from precision import PRECISIONS
+from proximity import Proximity
+from vector import Vector
+from wall import Wall
+from world import World
+
+MAGIC = b'CFWS'
+
+VERSION = 7
+
+CAR_FIELDS = ['x', 'y', 'steering_angle', 'velocity', 'steering_change', 'acceleration']
+
+
+class WorldSnapshot:
+
+    def __init__(self, header: Dict, arrays: Dict[str, array]):
+        """Initializes a new snapshot object from its header and arrays.
+
+        Snapshots are normally created with capture or from_bytes instead.
+
+        Args:
+            header (Dict): The JSON serializable part of the state, i.e., the world dimensions, goals, walls, car types
+                and engine settings.
+            arrays (Dict[str, array]): The state of the cars and the recorded performance measures, by name.
+
+        """
+        self.header: Dict = header
+        self.arrays: Dict[str, array] = arrays
+
+    @property
+    def step_count(self) -> int:
+        """The amount of steps the captured world had progressed.
+
+        Returns:
+            int: The step count of the captured world.
+
+        """
+        return self.header['step_count']
+
+    @classmethod
+    def capture(cls, world: World) -> 'WorldSnapshot':
+        """Captures the current state of the given world.
+
+        Args:
+            world (World): The world to capture.
+
+        Returns:
+            WorldSnapshot: A snapshot of the world, which shares no state with the world and leaves it unchanged.
+
+        """
+        header = {
+            'width': world.width,
+            'height': world.height,
+            'goals': [[goal.x, goal.y, goal.active, goal.next_goal] for goal in world.goals],
+            'walls': [[wall.x1, wall.y1, wall.x2, wall.y2] for wall in world.walls],
+            'field_resolution': None if world.goal_fields is None else world.goal_fields.resolution,
+            'step_count': world.step_count,
+            'engine': world.engine_settings(),
+            'car_specs': [],
+        }
+
+        spec_indices = {}
+        for car in world.cars:
+            if id(car.spec) not in spec_indices:
+                spec_indices[id(car.spec)] = len(header['car_specs'])
+                header['car_specs'].append(car.spec.parameters())
+
+        typecode = world.precision.typecode
+        arrays = {'spec_index': array('q', [spec_indices[id(car.spec)] for car in world.cars])}
+        for field in CAR_FIELDS:
+            arrays[field] = array(typecode, [getattr(car, field) for car in world.cars])
+        arrays['direction_x'] = array(typecode, [car.direction.x for car in world.cars])
+        arrays['direction_y'] = array(typecode, [car.direction.y for car in world.cars])
+        arrays['flocking_x'] = array(typecode, [car.flocking_vector.x for car in world.cars])
+        arrays['flocking_y'] = array(typecode, [car.flocking_vector.y for car in world.cars])
+        arrays['goal_index'] = array('q', [car.goal_index for car in world.cars])
+        arrays['goal_reached'] = array('b', [car.goal_reached for car in world.cars])
+        arrays['arrival_steps'] = world.current_arrival_steps()
+        if world.level_of_detail is not None:
+            arrays['level_of_detail_spans'] = array('q', world.level_of_detail.spans)
+
+        car_indices = {id(car): i for i, car in enumerate(world.cars)}
+        overlaps = array('q')
+        for i, car in enumerate(world.cars):
+            for other in car.overlapping_cars:
+                overlaps.append(i)
+                overlaps.append(car_indices[id(other)])
+        arrays['overlaps'] = overlaps
+
+        arrays['collision_distribution'] = array('q', world.collision_distribution)
+        arrays['flocking_performance_distribution'] = array(typecode, world.flocking_performance_distribution)
+        return cls(header, arrays)
+
+    def restore(self) -> World:
+        """Creates a new world in the captured state.
+
+        Returns:
+            World: A world that continues exactly like the captured world would have.
+
+        """
+        header = self.header
+        arrays = self.arrays
+
+        world = World(header['width'], header['height'])
+        world.goals = [Goal(x, y, active, next_goal) for x, y, active, next_goal in header['goals']]
+        world.walls = [Wall(x1, y1, x2, y2) for x1, y1, x2, y2 in header['walls']]
+        if header['field_resolution'] is not None:
+            world.goal_fields = GoalFieldCache(header['field_resolution'])
+        world.step_count = header['step_count']
+        engine = header['engine']
+        world.precision = PRECISIONS[engine['precision']]
+        world.double_buffered = engine['double_buffered']
+        world.control_interval = engine['control_interval']
+        world.staggered_control = engine['staggered_control']
+        if engine['integrator'] is not None:
+            world.integrator = AdaptiveIntegrator(*engine['integrator'])
+        if engine['level_of_detail'] is not None:
+            world.level_of_detail = LevelOfDetail(*engine['level_of_detail'])
+            world.level_of_detail.spans = arrays['level_of_detail_spans'].tolist()
+        if engine['proximity'] is not None:
+            world.proximity = Proximity(engine['proximity'])
+
+        specs = [CarSpec.from_parameters(parameters) for parameters in header['car_specs']]
+        for i in range(len(arrays['x'])):
+            car = Car(specs[arrays['spec_index'][i]])
+            for field in CAR_FIELDS:
+                setattr(car, field, arrays[field][i])
+            car.direction = Vector(arrays['direction_x'][i], arrays['direction_y'][i])
+            car.flocking_vector = Vector(arrays['flocking_x'][i], arrays['flocking_y'][i])
+            car.goal_index = arrays['goal_index'][i]
+            car.goal_reached = bool(arrays['goal_reached'][i])
+            world.cars.append(car)
+
+        overlaps = arrays['overlaps']
+        for i in range(0, len(overlaps), 2):
+            world.cars[overlaps[i]].overlapping_cars.append(world.cars[overlaps[i + 1]])
+
+        world.collision_distribution = arrays['collision_distribution'].tolist()
+        world.flocking_performance_distribution = world.precision.series(arrays['flocking_performance_distribution'])
+        world.arrival_steps = array('q', arrays['arrival_steps'])
+        world.track_arrivals()
+        return world
+
+    def to_bytes(self) -> bytes:
+        """Serializes this snapshot into its binary format.
+
+        Returns:
+            bytes: The binary representation of this snapshot.
+
+        """
+        return pack(MAGIC, VERSION, self.header, self.arrays)
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> 'WorldSnapshot':
+        """Deserializes a snapshot from its binary format.
+
+        Args:
+            data (bytes): The binary representation of a snapshot.
+
+        Returns:
+            WorldSnapshot: The deserialized snapshot.
+
+        """
+        header, arrays = unpack(MAGIC, VERSION, data)
+        return cls(header, arrays)
+
+    def save(self, path: str):
+        """Stores this snapshot in a file.
+
+        Args:
+            path (str): The path of the file to store the snapshot in.
+
+        """
+        with open(path, 'wb') as file:
+            file.write(self.to_bytes())
+
+    @classmethod
+    def load(cls, path: str) -> 'WorldSnapshot':
+        """Loads a snapshot from a file.
+
+        Args:
+            path (str): The path of the file containing the snapshot.
+
+        Returns:
+            WorldSnapshot: The loaded snapshot.
+
+        """
+        with open(path, 'rb') as file:
+            return cls.from_bytes(file.read())
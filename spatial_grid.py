@@ -0,0 +1,147 @@
+"""This module contains functionality to find nearby cars quickly using a uniform grid.
+
+The plane is divided into square cells of a fixed size and every car is placed into the cell containing its position.
+Queries only visit the cells around the queried position, growing outwards ring by ring until the result is certain.
+Results are exact: the nearest cars found are the same as those found by comparing the distances to all cars, with
+equal distances ordered by the index of the car.
+
+"""
+
+from math import floor, inf, sqrt
+from typing import Dict, List, Sequence, Tuple
+
+
+class SpatialGrid:
+
+    def __init__(self, cell_size: float, xs: Sequence[float], ys: Sequence[float], indices: Sequence[int]):
+        """Initializes a new grid object, containing the specified cars.
+
+        Args:
+            cell_size (float): The width and height of a grid cell in meters.
+            xs (Sequence[float]): The x position of every car, indexed by car index.
+            ys (Sequence[float]): The y position of every car, indexed by car index.
+            indices (Sequence[int]): The indices of the cars to place in the grid.
+
+        """
+        self.cell_size: float = cell_size
+        self.xs: Sequence[float] = xs
+        self.ys: Sequence[float] = ys
+        self.count: int = len(indices)
+        self.cells: Dict[Tuple[int, int], List[int]] = {}
+        for i in indices:
+            cell = (floor(xs[i] / cell_size), floor(ys[i] / cell_size))
+            cell_indices = self.cells.get(cell)
+            if cell_indices is None:
+                self.cells[cell] = [i]
+            else:
+                cell_indices.append(i)
+
+    def nearest(self, index: int, k: int, bound: float) -> Tuple[List[Tuple[float, int]], bool]:
+        """Determines the k cars in the grid nearest to the specified car.
+
+        Cars outside of the grid can be taken into account by specifying a bound, the distance from the specified car
+        within which all cars are known to be in the grid. If the k-th nearest car in the grid is not closer than this
+        bound, a car outside of the grid might be closer and the result is not certain.
+
+        Args:
+            index (int): The index of the car to find the nearest cars of. The car itself is excluded.
+            k (int): The amount of nearest cars to find.
+            bound (float): The distance from the car within which all cars are in the grid.
+
+        Returns:
+            List[Tuple[float, int]]: The distance and index of the nearest cars, ordered by distance and then index.
+                Fewer than k cars are returned if the grid contains fewer other cars, which is only certain if the
+                bound is infinite.
+            bool: True if the result is certain, False if a car outside of the grid might be nearer.
+
+        """
+        if k <= 0:
+            return [], True
+        x = self.xs[index]
+        y = self.ys[index]
+        cell_size = self.cell_size
+        center_x = floor(x / cell_size)
+        center_y = floor(y / cell_size)
+        edge_distance = min(x - center_x * cell_size, (center_x + 1) * cell_size - x,
+                            y - center_y * cell_size, (center_y + 1) * cell_size - y)
+
+        candidates = []
+        seen = 0
+        ring = 0
+        while True:
+            for cell in self.ring_cells(center_x, center_y, ring):
+                cell_indices = self.cells.get(cell)
+                if cell_indices is None:
+                    continue
+                seen += len(cell_indices)
+                for i in cell_indices:
+                    if i != index:
+                        x_dif = x - self.xs[i]
+                        y_dif = y - self.ys[i]
+                        candidates.append((sqrt(x_dif ** 2 + y_dif ** 2), i))
+
+            ring_bound = ring * cell_size + edge_distance
+            if len(candidates) >= k:
+                candidates.sort()
+                del candidates[k:]
+                if candidates[-1][0] < min(ring_bound, bound):
+                    return candidates, True
+            if seen >= self.count:
+                candidates.sort()
+                if len(candidates) < k:
+                    return candidates, bound == inf
+                return candidates, candidates[-1][0] < bound
+            if ring_bound >= bound:
+                candidates.sort()
+                return candidates, False
+            ring += 1
+
+    def within(self, index: int, radius: float) -> List[int]:
+        """Determines the cars in the grid whose position may lie within the specified radius of the specified car.
+
+        All cars within the radius are returned, together with some cars slightly outside of it.
+
+        Args:
+            index (int): The index of the car to find the cars around. The car itself is excluded.
+            radius (float): The radius around the car in meters.
+
+        Returns:
+            List[int]: The indices of the cars in the cells overlapping the radius.
+
+        """
+        x = self.xs[index]
+        y = self.ys[index]
+        cell_size = self.cell_size
+        result = []
+        for cell_x in range(floor((x - radius) / cell_size), floor((x + radius) / cell_size) + 1):
+            for cell_y in range(floor((y - radius) / cell_size), floor((y + radius) / cell_size) + 1):
+                cell_indices = self.cells.get((cell_x, cell_y))
+                if cell_indices is not None:
+                    for i in cell_indices:
+                        if i != index:
+                            result.append(i)
+        return result
+
+    @staticmethod
+    def ring_cells(center_x: int, center_y: int, ring: int) -> List[Tuple[int, int]]:
+        """Determines the cells at the specified Chebyshev distance from a center cell.
+
+        Args:
+            center_x (int): The column of the center cell.
+            center_y (int): The row of the center cell.
+            ring (int): The distance in cells from the center cell.
+
+        Returns:
+            List[Tuple[int, int]]: The cells forming the ring around the center cell.
+
+        """
+        if ring == 0:
+            return [(center_x, center_y)]
+        cells = []
+        for cell_x in range(center_x - ring, center_x + ring + 1):
+            cells.append((cell_x, center_y - ring))
+            cells.append((cell_x, center_y + ring))
+        for cell_y in range(center_y - ring + 1, center_y + ring):
+            cells.append((center_x - ring, cell_y))
+            cells.append((center_x + ring, cell_y))
+        return cells
@@ -0,0 +1,87 @@
+"""This module contains a benchmark of how quickly the modules needed for headless simulations can be imported.
+
+Every module is imported in a fresh interpreter several times, of which the median import time is reported. The
+benchmark also verifies that importing these modules does not import pygame, so headless simulations do not depend on
+SDL being available, and that each median import time stays within the budget of the module. The budgets leave room
+for slower hosts, while still catching modules that eagerly import optional accelerators or heavy standard library
+modules again.
+
+"""
+
+import os
+import subprocess
+import sys
+from statistics import median
+from typing import Dict, List, Tuple
+
+HEADLESS_MODULES = ['vector', 'goal', 'car', 'world', 'scenario', 'sweep']
+
+IMPORT_BUDGETS: Dict[str, float] = {
+    'vector': 0.005,
+    'goal': 0.005,
+    'car': 0.03,
+    'world': 0.035,
+    'scenario': 0.04,
+    'sweep': 0.08,
+}
+
+MEASURE_IMPORT = '''
+import sys, time
+start = time.perf_counter()
+import {module}
+print(time.perf_counter() - start, 'pygame' in sys.modules)
+'''
+
+
+def measure_import(module: str, repetitions: int) -> Tuple[float, bool]:
+    """Measures how long it takes to import a module in a fresh interpreter.
+
+    The interpreter runs in the directory of the simulation modules, so the benchmark works from any directory.
+
+    Args:
+        module (str): The name of the module to import.
+        repetitions (int): The amount of fresh interpreters to import the module in.
+
+    Returns:
+        float: The median import time in seconds.
+        bool: True if importing the module imported pygame, False otherwise.
+
+    """
+    durations = []
+    imports_pygame = False
+    for _ in range(repetitions):
+        output = subprocess.run([sys.executable, '-c', MEASURE_IMPORT.format(module=module)], check=True,
+                                capture_output=True, text=True,
+                                cwd=os.path.dirname(os.path.abspath(__file__))).stdout.split()
+        durations.append(float(output[0]))
+        imports_pygame = imports_pygame or output[1] == 'True'
+    return median(durations), imports_pygame
+
+
+def run_benchmark(modules: List[str] = None, repetitions: int = 5) -> bool:
+    """Measures and prints the import time of each headless module.
+
+    Args:
+        modules (List[str]): The names of the modules to measure, or None to measure all headless modules.
+        repetitions (int): The amount of fresh interpreters to import each module in.
+
+    Returns:
+        bool: True if none of the modules imported pygame and all of them were imported within their budget, False
+            otherwise.
+
+    """
+    passed = True
+    for module in modules or HEADLESS_MODULES:
+        duration, imports_pygame = measure_import(module, repetitions)
+        budget = IMPORT_BUDGETS.get(module)
+        over_budget = budget is not None and duration > budget
+        notes = '  (imports pygame)' if imports_pygame else ''
+        if over_budget:
+            notes += '  (over budget of {:.0f} ms)'.format(budget * 1000)
+        print('{:<12}{:>8.1f} ms{}'.format(module, duration * 1000, notes))
+        passed = passed and not imports_pygame and not over_budget
+    return passed
+
+
+if __name__ == '__main__':
+    sys.exit(0 if run_benchmark(sys.argv[1:]) else 1)
@@ -0,0 +1,293 @@
+"""This module contains functionality to simulate a scenario many times in parallel and aggregate the results.
+
+A sweep simulates a scenario for a list of simulation variable sets, for instance one per seed, distributed over worker
+processes. Instead of sending the recorded time series back to the parent process, workers write them directly into a
+block of shared memory preallocated by the parent, with room for a fixed amount of steps per run. The parent reads the
+results from this block without copying, and aggregates them into statistics across runs, such as the mean or a
+percentile of a measure at every step. The flocking density is kept at the precision of the scenario.
+
+How many steps a run takes to reach its goal is not known in advance. A run that records more steps than the shared
+memory has room for keeps only its first steps, and is marked as truncated instead of aborting the sweep.
+
+If the scenario has a result cache, workers take the results of runs from the cache when available, copying them into
+the shared memory, and store the results of runs they simulate in the cache otherwise.
+
+"""
+
+from array import array
+from multiprocessing import Pool
+from multiprocessing.shared_memory import SharedMemory
+from typing import Dict, List, Union
+from scenario import Scenario
+
+METRICS = {'collisions': 'q', 'flocking_performance': 'd'}
+
+
+class SharedSeries:
+
+    def __init__(self, values: memoryview, lengths: memoryview, truncated: memoryview, run: int, capacity: int):
+        """Initializes a new shared series object, which records a time series into shared memory.
+
+        A shared series can replace the lists in which a world records its performance measures.
+
+        Args:
+            values (memoryview): The values of the measure for all runs, in which the values of this series are kept.
+            lengths (memoryview): The lengths of the series of the measure for all runs, in which the length of this
+                series is kept.
+            truncated (memoryview): For all runs, whether a value was dropped because the run exceeded the capacity.
+            run (int): The index of the run of this series.
+            capacity (int): The maximum amount of values per run.
+
+        """
+        self.values: memoryview = values
+        self.lengths: memoryview = lengths
+        self.truncated: memoryview = truncated
+        self.run: int = run
+        self.capacity: int = capacity
+
+    def __len__(self) -> int:
+        return self.lengths[self.run]
+
+    def __getitem__(self, index: Union[int, slice]):
+        start = self.run * self.capacity
+        if isinstance(index, int):
+            length = len(self)
+            if not -length <= index < length:
+                raise IndexError('Series index out of range')
+            return self.values[start + index % length]
+        return self.values[start:start + len(self)].tolist()[index]
+
+    def __iter__(self):
+        start = self.run * self.capacity
+        return iter(self.values[start:start + len(self)].tolist())
+
+    def append(self, value: Union[int, float]):
+        """Appends a value to this series, or drops it and marks the run as truncated if the series is full.
+
+        Args:
+            value (Union[int, float]): The value to append.
+
+        """
+        length = self.lengths[self.run]
+        if length >= self.capacity:
+            self.truncated[self.run] = 1
+            return
+        self.values[self.run * self.capacity + length] = value
+        self.lengths[self.run] = length + 1
+
+
+class SharedResults:
+
+    def __init__(self, run_count: int, capacity: int, name: str = None, flocking_typecode: str = 'd'):
+        """Initializes a new shared results object, creating or attaching to the shared memory holding the results.
+
+        Args:
+            run_count (int): The amount of runs.
+            capacity (int): The maximum amount of steps recorded per run.
+            name (str): The name of existing shared results to attach to, or None to create new shared results.
+            flocking_typecode (str): The array type code of the flocking density, i.e., of the precision of the
+                scenario.
+
+        """
+        self.run_count: int = run_count
+        self.capacity: int = capacity
+        self.typecodes: Dict[str, str] = dict(METRICS, flocking_performance=flocking_typecode)
+        value_sizes = [array(typecode).itemsize * run_count * capacity for typecode in self.typecodes.values()]
+        size = 8 * run_count * (2 + len(METRICS)) + sum(value_sizes)
+        if name is None:
+            self.memory: SharedMemory = SharedMemory(create=True, size=max(8, size))
+        else:
+            self.memory: SharedMemory = SharedMemory(name=name)
+        self.owner: bool = name is None
+
+        buffer = self.memory.buf
+        self.steps_to_goal: memoryview = buffer[:8 * run_count].cast('q')
+        self.truncated: memoryview = buffer[8 * run_count:16 * run_count].cast('q')
+        self.lengths: Dict[str, memoryview] = {}
+        self.metrics: Dict[str, memoryview] = {}
+        offset = 16 * run_count
+        for metric in METRICS:
+            self.lengths[metric] = buffer[offset:offset + 8 * run_count].cast('q')
+            offset += 8 * run_count
+        # The collisions take 8 bytes each and precede the flocking density, so every view is aligned.
+        for (metric, typecode), value_size in zip(self.typecodes.items(), value_sizes):
+            self.metrics[metric] = buffer[offset:offset + value_size].cast(typecode)
+            offset += value_size
+
+    def __enter__(self) -> 'SharedResults':
+        return self
+
+    def __exit__(self, *exception_info: ...):
+        self.close()
+
+    @property
+    def name(self) -> str:
+        """The name of the shared memory, with which worker processes can attach to these results.
+
+        Returns:
+            str: The name of the shared memory.
+
+        """
+        return self.memory.name
+
+    @property
+    def truncated_runs(self) -> List[int]:
+        """The runs that recorded more steps than the capacity, of which only the first steps are kept.
+
+        Returns:
+            List[int]: The indices of the truncated runs.
+
+        """
+        return [run for run in range(self.run_count) if self.truncated[run]]
+
+    def series(self, metric: str, run: int) -> memoryview:
+        """Views the recorded time series of a measure of a run, without copying.
+
+        Args:
+            metric (str): The name of the measure, either 'collisions' or 'flocking_performance'.
+            run (int): The index of the run.
+
+        Returns:
+            memoryview: The values recorded during the run.
+
+        """
+        start = run * self.capacity
+        return self.metrics[metric][start:start + self.lengths[metric][run]]
+
+    def recorder(self, metric: str, run: int) -> SharedSeries:
+        """Creates a series recording a measure of a run into these results.
+
+        Args:
+            metric (str): The name of the measure, either 'collisions' or 'flocking_performance'.
+            run (int): The index of the run.
+
+        Returns:
+            SharedSeries: A series to record the measure with.
+
+        """
+        self.lengths[metric][run] = 0
+        return SharedSeries(self.metrics[metric], self.lengths[metric], self.truncated, run, self.capacity)
+
+    def mean_curve(self, metric: str) -> array:
+        """Determines the mean of a measure across runs at every step.
+
+        At steps beyond the end of shorter runs, only the runs that recorded that step are taken into account.
+
+        Args:
+            metric (str): The name of the measure, either 'collisions' or 'flocking_performance'.
+
+        Returns:
+            array: The mean of the measure at every step.
+
+        """
+        sums = array('d', bytes(8 * max(self.lengths[metric], default=0)))
+        counts = array('q', bytes(8 * len(sums)))
+        for run in range(self.run_count):
+            for step, value in enumerate(self.series(metric, run)):
+                sums[step] += value
+                counts[step] += 1
+        return array('d', [total / count for total, count in zip(sums, counts)])
+
+    def percentile_curve(self, metric: str, percentile: float) -> array:
+        """Determines a percentile of a measure across runs at every step, interpolating linearly between runs.
+
+        At steps beyond the end of shorter runs, only the runs that recorded that step are taken into account.
+
+        Args:
+            metric (str): The name of the measure, either 'collisions' or 'flocking_performance'.
+            percentile (float): The percentile to determine, between 0 and 100.
+
+        Returns:
+            array: The percentile of the measure at every step.
+
+        """
+        curve = array('d')
+        all_series = [self.series(metric, run) for run in range(self.run_count)]
+        for step in range(max(self.lengths[metric], default=0)):
+            values = sorted(series[step] for series in all_series if step < len(series))
+            position = (len(values) - 1) * percentile / 100
+            lower = int(position)
+            upper = min(lower + 1, len(values) - 1)
+            curve.append(values[lower] + (values[upper] - values[lower]) * (position - lower))
+        return curve
+
+    def close(self):
+        """Detaches from the shared memory, removing it if these results created it."""
+        self.steps_to_goal.release()
+        self.truncated.release()
+        for view in list(self.lengths.values()) + list(self.metrics.values()):
+            view.release()
+        self.memory.close()
+        if self.owner:
+            self.memory.unlink()
+
+
+def run_sweep_job(scenario: Scenario, results_name: str, run_count: int, capacity: int, run: int,
+                  simulation_variables: Dict) -> int:
+    """Simulates a scenario in a worker process, recording the results directly into the shared results.
+
+    Args:
+        scenario (Scenario): The scenario to simulate.
+        results_name (str): The name of the shared results.
+        run_count (int): The amount of runs in the shared results.
+        capacity (int): The maximum amount of steps recorded per run.
+        run (int): The index of this run.
+        simulation_variables (Dict): The variables to be passed to the world generator.
+
+    Returns:
+        int: The index of this run.
+
+    """
+    results = SharedResults(run_count, capacity, results_name, scenario.precision.typecode)
+    try:
+        if scenario.result_cache is not None:
+            collisions, flocking_performance, results.steps_to_goal[run] = scenario.simulate(**simulation_variables)
+            for metric, series in (('collisions', collisions), ('flocking_performance', flocking_performance)):
+                recorder = results.recorder(metric, run)
+                for value in series:
+                    recorder.append(value)
+        else:
+            world = scenario.generate_world(**simulation_variables)
+            world.collision_distribution = results.recorder('collisions', run)
+            world.flocking_performance_distribution = results.recorder('flocking_performance', run)
+            results.steps_to_goal[run] = scenario.simulate_world(world)[2]
+    finally:
+        results.close()
+    return run
+
+
+class Sweep:
+
+    def __init__(self, scenario: Scenario, worker_count: int):
+        """Initializes a new sweep object.
+
+        Args:
+            scenario (Scenario): The scenario to simulate.
+            worker_count (int): The amount of worker processes to simulate with.
+
+        """
+        self.scenario: Scenario = scenario
+        self.worker_count: int = worker_count
+
+    def run(self, variable_sets: List[Dict], capacity: int) -> SharedResults:
+        """Simulates the scenario once for each set of simulation variables.
+
+        Args:
+            variable_sets (List[Dict]): The simulation variables of each run, for instance {'seed': 1}.
+            capacity (int): The maximum amount of steps recorded per run, including the steps to reach the goal. Longer
+                runs are truncated.
+
+        Returns:
+            SharedResults: The results of all runs, in the order of the variable sets. The caller should close them.
+
+        """
+        results = SharedResults(len(variable_sets), capacity, flocking_typecode=self.scenario.precision.typecode)
+        jobs = [(self.scenario, results.name, len(variable_sets), capacity, run, simulation_variables)
+                for run, simulation_variables in enumerate(variable_sets)]
+        try:
+            with Pool(self.worker_count) as pool:
+                pool.starmap(run_sweep_job, jobs)
+        except BaseException:
+            results.close()
+            raise
+        return results
@@ -0,0 +1,230 @@
+"""This module contains functionality to stream the metrics of running simulations to a local consumer.
+
+A telemetry publisher samples the metrics of a world every few steps: the step, the collisions and flocking density of
+that step, the amount of cars at their final goal, the steps simulated per second and, if the world keeps them, the
+time spent on each phase of its updates. Samples are collected into batches, which are sent as JSON datagrams over a
+Unix datagram socket or UDP. The socket never blocks: when the consumer is not keeping up, or not running at all, a
+batch is dropped instead of delaying the simulation.
+
+Publishing is limited to a small fraction of the time spent simulating. The time spent on sampling and sending is
+measured over periods of at least the maximum delay of a batch. Whenever it exceeds that fraction during a period, the
+publisher samples half as often. Whenever it stays below half of that fraction, which leaves room to sample twice as
+often, the publisher samples twice as often again, though never more often than configured. Every run starts at the
+configured interval.
+
+The socket is opened on the first batch, so a scenario with a telemetry publisher can be sent to worker processes, of
+which each publishes its own runs. Every batch identifies the process and run it belongs to.
+
+Running this module starts a consumer which prints the samples it receives, e.g.:
+python telemetry.py /tmp/flocking.sock, or python telemetry.py 127.0.0.1:9999
+
+"""
+
+import json
+import os
+import socket
+import sys
+from time import perf_counter
+from typing import TYPE_CHECKING, Dict, List, Optional, Tuple, Union
+
+if TYPE_CHECKING:
+    from distributed_world import DistributedWorld
+    from world import World
+
+SAMPLE_FIELDS = ['step', 'collisions', 'flocking_performance', 'cars_at_goal', 'steps_per_second']
+
+MAX_DATAGRAM_SIZE = 65507
+
+
+def parse_address(address: str) -> Tuple[int, Union[str, Tuple[str, int]]]:
+    """Determines the socket family and address of a telemetry address.
+
+    Args:
+        address (str): Either 'host:port' for UDP, or the path of a Unix datagram socket.
+
+    Returns:
+        int: The address family of the socket.
+        Union[str, Tuple[str, int]]: The address in the form expected by the socket.
+
+    """
+    host, _, port = address.rpartition(':')
+    if host and port.isdigit():
+        return socket.AF_INET, (host, int(port))
+    return socket.AF_UNIX, address
+
+
+class TelemetryPublisher:
+
+    def __init__(self, address: str, interval: int = 10, batch_size: int = 20, max_delay: float = 1.0,
+                 budget: float = 0.01):
+        """Initializes a new telemetry publisher object.
+
+        Args:
+            address (str): Either 'host:port' to publish over UDP, or the path of a Unix datagram socket.
+            interval (int): The amount of steps between two samples, which is increased while publishing exceeds the
+                budget.
+            batch_size (int): The amount of samples sent together in one datagram.
+            max_delay (float): The time in seconds after which a batch is sent, even if it is not full.
+            budget (float): The fraction of the simulation time that publishing may take.
+
+        """
+        self.address: str = address
+        self.configured_interval: int = interval
+        self.interval: int = interval
+        self.batch_size: int = batch_size
+        self.max_delay: float = max_delay
+        self.budget: float = budget
+        self.socket: Optional[socket.socket] = None
+        self.run: int = -1
+        self.phase: str = ''
+        self.batch: List[Dict] = []
+        self.sent: int = 0
+        self.dropped: int = 0
+        self.overhead: float = 0.0
+        self.period_start: float = 0.0
+        self.sample_time: float = 0.0
+        self.sample_step: int = 0
+        self.flush_time: float = 0.0
+
+    def __getstate__(self) -> Dict:
+        return dict(self.__dict__, socket=None, batch=[])
+
+    def begin_run(self, world: 'World'):
+        """Starts publishing a new run, of which the samples are numbered separately, at the configured interval.
+
+        Args:
+            world (World): The world of the run, which is made to keep its phase times.
+
+        """
+        if world.phase_times is None:
+            world.phase_times = {}
+        self.flush()
+        self.run += 1
+        self.period_start = self.sample_time = self.flush_time = perf_counter()
+        self.sample_step = 0
+        self.overhead = 0.0
+        self.interval = self.configured_interval
+
+    def record(self, world: Union['World', 'DistributedWorld'], phase: str):
+        """Samples the metrics of a world after an update, if the sampling interval has passed.
+
+        Args:
+            world (Union[World, DistributedWorld]): The updated world.
+            phase (str): The phase of the scenario, e.g., 'approach' while cars approach their goal.
+
+        """
+        step = world.step_count
+        if step % self.interval != 0 and phase == self.phase:
+            return
+        start = perf_counter()
+        self.phase = phase
+        sample = {
+            'step': step,
+            'phase': phase,
+            'collisions': world.collision_distribution[-1] if len(world.collision_distribution) else 0,
+            'flocking_performance': (world.flocking_performance_distribution[-1]
+                                     if len(world.flocking_performance_distribution) else 0.0),
+            'cars_at_goal': world.finished_count,
+            'steps_per_second': (step - self.sample_step) / max(start - self.sample_time, 1e-9),
+        }
+        if world.phase_times is not None:
+            sample['phase_times'] = dict(world.phase_times)
+        self.batch.append(sample)
+        self.sample_step = step
+        self.sample_time = start
+        if len(self.batch) >= self.batch_size or start - self.flush_time >= self.max_delay:
+            self.flush()
+
+        end = perf_counter()
+        self.overhead += end - start
+        elapsed = end - self.period_start
+        if elapsed >= self.max_delay:
+            if self.overhead > self.budget * elapsed:
+                self.interval *= 2
+            elif self.interval > self.configured_interval and 2 * self.overhead <= self.budget * elapsed:
+                self.interval = max(self.interval // 2, self.configured_interval)
+            self.overhead = 0.0
+            self.period_start = end
+
+    def flush(self):
+        """Sends the collected samples as one datagram, or drops them if the consumer cannot receive them."""
+        self.flush_time = perf_counter()
+        if not self.batch:
+            return
+        message = json.dumps({'source': os.getpid(), 'run': self.run, 'samples': self.batch}).encode()
+        sample_count = len(self.batch)
+        self.batch = []
+        if len(message) > MAX_DATAGRAM_SIZE:
+            self.dropped += sample_count
+            return
+        try:
+            if self.socket is None:
+                family, address = parse_address(self.address)
+                self.socket = socket.socket(family, socket.SOCK_DGRAM)
+                self.socket.setblocking(False)
+                self.socket.connect(address)
+            self.socket.send(message)
+            self.sent += sample_count
+        except OSError:
+            self.dropped += sample_count
+            self.close()
+
+    def close(self):
+        """Closes the socket, which is opened again for the next batch."""
+        if self.socket is not None:
+            self.socket.close()
+            self.socket = None
+
+
+def format_sample(source: int, run: int, sample: Dict) -> str:
+    """Formats a received sample as one line of a table.
+
+    Args:
+        source (int): The process that published the sample.
+        run (int): The run of the process the sample belongs to.
+        sample (Dict): The sample.
+
+    Returns:
+        str: The formatted sample.
+
+    """
+    line = '{:>8}{:>5}{:>10}{:>10}{:>12}{:>14.3f}{:>10}{:>12.1f}'.format(
+        source, run, sample['phase'], *[sample[field] for field in SAMPLE_FIELDS])
+    phase_times = sample.get('phase_times')
+    if phase_times:
+        total = sum(phase_times.values()) or 1.0
+        line += '  ' + ' '.join('{} {:.0%}'.format(phase, time / total) for phase, time in phase_times.items())
+    return line
+
+
+def watch(address: str):
+    """Receives and prints the samples published to an address until interrupted.
+
+    Args:
+        address (str): Either 'host:port' to receive over UDP, or the path of a Unix datagram socket to create.
+
+    """
+    family, bind_address = parse_address(address)
+    receiver = socket.socket(family, socket.SOCK_DGRAM)
+    if family == socket.AF_UNIX and os.path.exists(bind_address):
+        os.unlink(bind_address)
+    receiver.bind(bind_address)
+    print('{:>8}{:>5}{:>10}{:>10}{:>12}{:>14}{:>10}{:>12}'.format('source', 'run', 'phase', *SAMPLE_FIELDS[:2],
+                                                             'flocking', 'at goal', 'steps/s'))
+    try:
+        while True:
+            message = json.loads(receiver.recv(MAX_DATAGRAM_SIZE))
+            for sample in message['samples']:
+                print(format_sample(message['source'], message['run'], sample), flush=True)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        receiver.close()
+        if family == socket.AF_UNIX:
+            os.unlink(bind_address)
+
+
+if __name__ == '__main__':
+    if len(sys.argv) != 2:
+        sys.exit('Usage: python telemetry.py ADDRESS')
+    watch(sys.argv[1])
@@ -0,0 +1,71 @@
+"""This module contains regression tests of the keys under which the result cache stores runs.
+
+"""
+
+import tempfile
+import unittest
+from result_cache import ResultCache
+from scenario import Scenario
+from simulation import OPTIMIZED_WEIGHTS, goal_scenario
+
+
+def create_scenario(**settings: ...) -> Scenario:
+    """Creates a small goal scenario with the given engine settings.
+
+    Args:
+        settings (...): The keyword arguments to pass to the scenario, e.g., tile_workers.
+
+    Returns:
+        Scenario: The scenario.
+
+    """
+    return Scenario(goal_scenario, 50, 5, OPTIMIZED_WEIGHTS, 1, **settings)
+
+
+class ResultCacheKeyTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.cache = ResultCache(self.directory.name)
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def key(self, scenario: Scenario) -> str:
+        """Determines the key of a seeded run of the given scenario.
+
+        Args:
+            scenario (Scenario): The scenario to key a run of.
+
+        Returns:
+            str: The key of the run.
+
+        """
+        variables = {'seed': 3, 'car_count': 5}
+        return self.cache.key(scenario, variables, scenario.generate_world(**variables))
+
+    def test_same_settings_share_key(self):
+        self.assertEqual(self.key(create_scenario(level_of_detail=True)),
+                         self.key(create_scenario(level_of_detail=True)))
+
+    def test_tiled_run_keyed_apart_from_single_process_run(self):
+        single_process = create_scenario(double_buffered=True)
+        tiled = create_scenario(tile_workers=2)
+        self.assertEqual(single_process.generate_world(seed=3, car_count=5).engine_settings(),
+                         tiled.generate_world(seed=3, car_count=5).engine_settings())
+        self.assertNotEqual(self.key(single_process), self.key(tiled))
+
+    def test_tiled_run_keyed_independently_of_worker_count(self):
+        self.assertEqual(self.key(create_scenario(tile_workers=2)), self.key(create_scenario(tile_workers=4)))
+
+    def test_level_of_detail_rejected_with_tile_workers(self):
+        with self.assertRaises(ValueError):
+            create_scenario(tile_workers=2, level_of_detail=True)
+
+    def test_adaptive_integrator_rejected_with_tile_workers(self):
+        with self.assertRaises(ValueError):
+            create_scenario(tile_workers=2, adaptive_integrator=True)
+
+
+if __name__ == '__main__':
+    unittest.main()
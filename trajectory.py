@@ -0,0 +1,133 @@
+"""This module contains functionality to record the trajectories of all cars in a world and store them in a file.
+
+A trajectory recorder stores the position and direction of every car at regular steps, in arrays of the chosen
+precision. At single precision, a recording takes half the memory and file size it would at double precision. Recordings
+are stored in the same binary format as snapshots, and can be loaded again to inspect or replay the movement of the
+cars, frame by frame. A world with a trajectory recorder records a frame after every update.
+
+"""
+
+from array import array
+from typing import TYPE_CHECKING, Dict, List, Tuple
+from binary_format import pack, unpack
+from precision import FLOAT64, PRECISIONS, PrecisionPolicy
+
+if TYPE_CHECKING:
+    from world import World
+
+MAGIC = b'CFTR'
+
+VERSION = 1
+
+FRAME_FIELDS = ['x', 'y', 'direction_x', 'direction_y']
+
+
+class TrajectoryRecorder:
+
+    def __init__(self, precision: PrecisionPolicy = FLOAT64, interval: int = 1):
+        """Initializes a new, empty trajectory recorder object.
+
+        Args:
+            precision (PrecisionPolicy): The precision at which positions and directions are stored.
+            interval (int): The amount of steps between two recorded frames.
+
+        """
+        self.precision: PrecisionPolicy = precision
+        self.interval: int = interval
+        self.car_count: int = 0
+        self.steps: array = array('q')
+        self.fields: Dict[str, array] = {field: array(precision.typecode) for field in FRAME_FIELDS}
+
+    def __len__(self) -> int:
+        return len(self.steps)
+
+    def record(self, world: 'World'):
+        """Records the cars of the given world as a frame, if the step count of the world is at the recording interval.
+
+        All frames of a recording should contain the same amount of cars.
+
+        Args:
+            world (World): The world to record.
+
+        Raises:
+            ValueError: If the amount of cars differs from that of earlier frames.
+
+        """
+        if world.step_count % self.interval != 0:
+            return
+        if self.steps and len(world.cars) != self.car_count:
+            raise ValueError('Expected ' + str(self.car_count) + ' cars, but the world contains ' +
+                             str(len(world.cars)) + ' cars')
+        self.car_count = len(world.cars)
+        self.steps.append(world.step_count)
+        self.fields['x'].extend([car.x for car in world.cars])
+        self.fields['y'].extend([car.y for car in world.cars])
+        self.fields['direction_x'].extend([car.direction.x for car in world.cars])
+        self.fields['direction_y'].extend([car.direction.y for car in world.cars])
+
+    def frame(self, index: int) -> Tuple[int, List[Tuple[float, float, float, float]]]:
+        """Retrieves a recorded frame.
+
+        Args:
+            index (int): The index of the frame.
+
+        Returns:
+            int: The step count of the world when the frame was recorded.
+            List[Tuple[float, float, float, float]]: The x, y, direction x and direction y of every car.
+
+        """
+        start = index * self.car_count
+        end = start + self.car_count
+        return self.steps[index], list(zip(*[self.fields[field][start:end] for field in FRAME_FIELDS]))
+
+    def to_bytes(self) -> bytes:
+        """Serializes this recording into its binary format.
+
+        Returns:
+            bytes: The binary representation of this recording.
+
+        """
+        header = {'precision': self.precision.name, 'interval': self.interval, 'car_count': self.car_count}
+        return pack(MAGIC, VERSION, header, dict(self.fields, steps=self.steps))
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> 'TrajectoryRecorder':
+        """Deserializes a recording from its binary format.
+
+        Args:
+            data (bytes): The binary representation of a recording.
+
+        Returns:
+            TrajectoryRecorder: The deserialized recording, to which more frames can be recorded.
+
+        """
+        header, arrays = unpack(MAGIC, VERSION, data)
+        recorder = cls(PRECISIONS[header['precision']], header['interval'])
+        recorder.car_count = header['car_count']
+        recorder.steps = arrays['steps']
+        recorder.fields = {field: arrays[field] for field in FRAME_FIELDS}
+        return recorder
+
+    def save(self, path: str):
+        """Stores this recording in a file.
+
+        Args:
+            path (str): The path of the file to store the recording in.
+
+        """
+        with open(path, 'wb') as file:
+            file.write(self.to_bytes())
+
+    @classmethod
+    def load(cls, path: str) -> 'TrajectoryRecorder':
+        """Loads a recording from a file.
+
+        Args:
+            path (str): The path of the file containing the recording.
+
+        Returns:
+            TrajectoryRecorder: The loaded recording.
+
+        """
+        with open(path, 'rb') as file:
+            return cls.from_bytes(file.read())
@@ -3,13 +3,74 @@
 The world is represented as a plane with specified width and height. However, these dimensions are not enforced.
 Therefore, cars can travel beyond these dimensions. The dimensions are used for the visual representation of the world.
 
+A world can contain multiple goals. Every car steers towards the goal at its goal index, so the goals are looked up
+directly instead of searched for, and a car does the same amount of work regardless of the amount of goals. Goals can
+be chained into routes of waypoints, through which cars continue until they reach the final destination of the route.
+Arrivals are tracked as they happen: the world counts the finished cars heading for each goal and records the step at
+which every car finished, so completion is known without inspecting all cars, and cars only look for finished
+neighbors when any car heading for the same goal has finished.
+
+Walls can be placed in the world. When a goal field cache is configured, cars follow precomputed flow fields that lead
+around these walls towards their goals instead of steering towards their goals in a straight line.
+
+By default, cars adjust their behavior one after the other, so a car can observe changes made earlier in the same
+update by other cars. In double-buffered mode, the behavior of all cars is determined from the state of the world at
+the start of the update and only applied afterwards. The result then no longer depends on the order of the cars, and
+the behavior of different chunks of cars can be determined concurrently by an executor.
+
+Cars can re-plan less often than they move: with a control interval of N, a car only adjusts its behavior every N steps
+and keeps its acceleration and steering change in between, like a real controller deciding at a lower rate. When
+control is staggered, a different 1/N of the cars re-plans at every step, so the cost of each step is about equal.
+
+Cars move with a single forward Euler update per step, unless an adaptive integrator is configured, which splits steps
+into smaller steps near other cars and in sharp turns. Neighborhoods are determined by comparing every car to all other
+cars, unless a neighbor list is configured, which reuses candidate neighbors across steps with the same result. When a
+level of detail scheduler is configured, cars far from any interaction are moved along arcs in closed form instead.
+With a proximity structure, the distances between nearby cars are determined once per step and shared by collision
+counting and the neighbor search of the next step. The state of the cars is kept at the precision of the world's
+precision policy, which is double precision by default. A trajectory recorder can record the movement of the cars.
+When phase times are kept, the world accumulates the time spent on each phase of its updates.
+
 """
 
-from typing import List, Tuple
-from car import Car
+from array import array
+from typing import TYPE_CHECKING, Dict, List, Optional, Tuple
+from car import Behavior, Car
 from math import sqrt, inf
 from operator import itemgetter
+from time import perf_counter
 from goal import Goal
+from goal_field import GoalField, GoalFieldCache
+from wall import Wall
+
+if TYPE_CHECKING:
+    from concurrent.futures import Executor
+    from integrator import AdaptiveIntegrator
+    from lod import LevelOfDetail
+    from neighbor_list import NeighborList
+    from precision import PrecisionPolicy
+    from proximity import Proximity
+    from trajectory import TrajectoryRecorder
+
+
+def plans_at_step(index: int, step_count: int, control_interval: int, staggered_control: bool) -> bool:
+    """Determines if a car re-plans its behavior at a step, given how often cars re-plan.
+
+    Args:
+        index (int): The index of the car in the world.
+        step_count (int): The amount of steps the world has been updated before this step.
+        control_interval (int): The amount of steps between two behavior adjustments of a car.
+        staggered_control (bool): True if the cars re-plan at different steps, False if all cars re-plan at once.
+
+    Returns:
+        bool: True if the car adjusts its behavior at the step, False if it keeps its current behavior.
+
+    """
+    if control_interval <= 1:
+        return True
+    if staggered_control:
+        return (index + step_count) % control_interval == 0
+    return step_count % control_interval == 0
 
 
 class World:
@@ -22,18 +83,181 @@ class World:
             height (float): The height of the world in meters.
 
         """
+        from precision import FLOAT64
         self.width: int = width
         self.height: int = height
         self.cars: List[Car] = []
-        self.goal: Goal = Goal(0.0, 0.0, False)
+        self.goals: List[Goal] = [Goal(0.0, 0.0, False)]
+        self.walls: List[Wall] = []
+        self.goal_fields: Optional[GoalFieldCache] = None
+        self.double_buffered: bool = False
+        self.behavior_executor: Optional['Executor'] = None
+        self.behavior_chunks: int = 1
+        self.control_interval: int = 1
+        self.staggered_control: bool = False
+        self.integrator: Optional['AdaptiveIntegrator'] = None
+        self.neighbor_list: Optional['NeighborList'] = None
+        self.level_of_detail: Optional['LevelOfDetail'] = None
+        self.proximity: Optional['Proximity'] = None
+        self.precision: 'PrecisionPolicy' = FLOAT64
+        self.trajectory: Optional['TrajectoryRecorder'] = None
+        self.phase_times: Optional[Dict[str, float]] = None
         self.collision_distribution: List[int] = []
         self.flocking_performance_distribution: List[float] = []
+        self.step_count: int = 0
+        self.finished_counts: List[int] = []
+        self.finished_count: int = 0
+        self.arrival_steps: array = array('q')
+
+    @property
+    def goal(self) -> Goal:
+        """The first goal of this world, which all cars steer towards unless assigned another goal.
+
+        Returns:
+            Goal: The goal at index 0.
+
+        """
+        return self.goals[0]
+
+    @goal.setter
+    def goal(self, goal: Goal):
+        """Replaces the first goal of this world.
+
+        Args:
+            goal (Goal): The goal to place at index 0.
+
+        """
+        self.goals[0] = goal
+
+    def add_goal(self, goal: Goal) -> int:
+        """Adds a goal to this world.
+
+        Args:
+            goal (Goal): The goal to add.
+
+        Returns:
+            int: The index of the added goal, which can be assigned to cars as their goal index.
+
+        """
+        self.goals.append(goal)
+        return len(self.goals) - 1
+
+    def add_route(self, waypoints: List[Goal]) -> int:
+        """Adds a route to this world, in which each goal is a waypoint towards the next goal.
+
+        The last goal of the route is the final destination. Any next goal it already has is kept, so routes can end
+        in a shared destination.
+
+        Args:
+            waypoints (List[Goal]): The goals of the route, in the order they should be visited.
+
+        Returns:
+            int: The index of the first goal of the route, which can be assigned to cars as their goal index.
+
+        """
+        first_index = len(self.goals)
+        for i, waypoint in enumerate(waypoints):
+            if i < len(waypoints) - 1:
+                waypoint.next_goal = first_index + i + 1
+            self.goals.append(waypoint)
+        return first_index
+
+    def engine_settings(self) -> Dict:
+        """Determines the settings of how this world is updated.
+
+        Besides the settings that change the results, the radius of the proximity structure is included, so snapshots
+        continue with the same structure and cached results record whether it was used. The neighbor list and behavior
+        executor do not change the results and are left out.
+
+        Returns:
+            Dict: The JSON serializable settings: double buffering, the control interval, staggered control, the
+                precision, the parameters of the adaptive integrator and of the level of detail scheduler, and the
+                radius of the proximity structure, or None for each of the latter three that is not used.
+
+        """
+        return {
+            'double_buffered': self.double_buffered,
+            'control_interval': self.control_interval,
+            'staggered_control': self.staggered_control,
+            'precision': self.precision.name,
+            'integrator': None if self.integrator is None else [
+                self.integrator.max_heading_change, self.integrator.contact_fraction, self.integrator.max_substeps,
+                self.integrator.cell_size],
+            'level_of_detail': None if self.level_of_detail is None else [
+                self.level_of_detail.interaction_radius, self.level_of_detail.max_span],
+            'proximity': None if self.proximity is None else self.proximity.radius,
+        }
+
+    def has_active_goal(self) -> bool:
+        """Determines if any car in this world steers towards an active goal.
+
+        Returns:
+            bool: True if the goal of at least one car is active, False otherwise.
+
+        """
+        active = [goal.active for goal in self.goals]
+        for car in self.cars:
+            if active[car.goal_index]:
+                return True
+        return False
+
+    def track_arrivals(self):
+        """Recounts the finished cars heading for each goal from the current state of the cars.
+
+        Arrivals are tracked automatically during updates, but should be recounted after changing which cars are
+        finished or which goals exist outside of an update. This happens automatically when cars or goals are added.
+        Cars that were already finished without a recorded arrival are considered to have arrived at the current step.
+
+        """
+        self.finished_counts = [0] * len(self.goals)
+        for car in self.cars:
+            if car.goal_reached:
+                self.finished_counts[car.goal_index] += 1
+        self.finished_count = sum(self.finished_counts)
+        self.arrival_steps[:] = self.current_arrival_steps()
+
+    def current_arrival_steps(self) -> array:
+        """Determines the arrival step of every car from the recorded arrivals and the current state of the cars.
+
+        Unlike track_arrivals, this leaves the world unchanged. Cars that are finished without a recorded arrival are
+        considered to have arrived at the current step.
+
+        Returns:
+            array: The step after which each car reached its final goal, or -1 for cars that have not.
+
+        """
+        arrival_steps = array('q', self.arrival_steps[:len(self.cars)])
+        arrival_steps.extend([-1] * (len(self.cars) - len(arrival_steps)))
+        for i, car in enumerate(self.cars):
+            if car.goal_reached and arrival_steps[i] < 0:
+                arrival_steps[i] = self.step_count
+            elif not car.goal_reached:
+                arrival_steps[i] = -1
+        return arrival_steps
+
+    def apply_behavior(self, index: int, behavior: Behavior):
+        """Applies a behavior to the car at the given index, recording its arrival if it finishes as a result.
+
+        Args:
+            index (int): The index of the car.
+            behavior (Behavior): The behavior to apply.
+
+        """
+        car = self.cars[index]
+        if car.goal_reached:
+            self.finished_counts[car.goal_index] -= 1
+        elif behavior.goal_reached:
+            self.finished_count += 1
+            self.arrival_steps[index] = self.step_count + 1
+        car.apply_behavior(behavior)
+        if car.goal_reached:
+            self.finished_counts[car.goal_index] += 1
 
     def update(self, dt: float, neighbor_count: int, rule_weights: List[float]) -> bool:
         """Updates the world and all elements in it according to the provided time step in seconds.
 
-        Determines if all cars have reached the goal, returning True if so. Also determines and stores performance
-        measures after updating.
+        Determines if all cars have reached their final goal, returning True if so. Cars heading for an inactive goal
+        are not waited for. Also determines and stores performance measures after updating.
 
         Args:
             dt (float): The amount of time in seconds to progress the simulation.
@@ -42,22 +266,155 @@ class World:
                 are [Separation, Alignment, Cohesion, Goal].
 
         Returns:
-            bool: True if all cars have reached the goal as a result of this update, False otherwise.
+            bool: True if all cars have reached their final goal as a result of this update, False otherwise.
 
         """
-        for car in self.cars:
-            neighbors = self.get_neighbors(car, neighbor_count)
-            car.adjust_behavior(neighbors, self.goal, rule_weights)
-        for car in self.cars:
-            car.update(dt)
+        timed = self.phase_times is not None
+        if timed:
+            checkpoint = perf_counter()
+        goals = self.goals
+        if len(self.arrival_steps) != len(self.cars) or len(self.finished_counts) != len(goals):
+            self.track_arrivals()
+        if self.goal_fields is None:
+            fields = [None] * len(goals)
+        else:
+            fields = self.goal_fields.fields_for(goals, self.walls, self.width, self.height)
+        if self.neighbor_list is not None:
+            self.neighbor_list.refresh(self.cars, neighbor_count)
+        if self.proximity is not None and not self.proximity.matches(self.cars):
+            self.proximity.build(self.cars)
+        if self.level_of_detail is None:
+            isolated = [False] * len(self.cars)
+        else:
+            isolated = self.level_of_detail.isolated_cars(self.cars, goals, dt)
+        planning = [i for i in range(len(self.cars)) if not isolated[i] and
+                    plans_at_step(i, self.step_count, self.control_interval, self.staggered_control)]
+        if timed:
+            checkpoint = self.time_phase('preparation', checkpoint)
+        if self.double_buffered:
+            behaviors = self.determine_all_behaviors([self.cars[i] for i in planning], neighbor_count, rule_weights,
+                                                     fields)
+            for i, behavior in zip(planning, behaviors):
+                self.apply_behavior(i, behavior)
+        else:
+            for i in planning:
+                car = self.cars[i]
+                neighbors, offsets = self.get_neighborhood(car, neighbor_count)
+                self.apply_behavior(i, car.determine_behavior(neighbors, goals[car.goal_index], rule_weights,
+                                                              fields[car.goal_index], self.finished_counts, offsets))
+        if timed:
+            checkpoint = self.time_phase('behavior', checkpoint)
+        detailed_cars = [car for car, car_isolated in zip(self.cars, isolated) if not car_isolated]
+        if self.integrator is None:
+            for car in detailed_cars:
+                car.update(dt)
+        else:
+            self.integrator.advance(detailed_cars, dt)
+        for car, car_isolated in zip(self.cars, isolated):
+            if car_isolated:
+                car.update_arc(dt)
+        self.precision.round_cars(self.cars)
+        if self.proximity is not None:
+            self.proximity.build(self.cars)
+        if timed:
+            checkpoint = self.time_phase('movement', checkpoint)
 
-        all_finished = True
-        for car in self.cars:
-            all_finished = all_finished and car.goal_reached
+        if self.level_of_detail is not None and self.level_of_detail.collisions_skippable(self.cars, dt):
+            self.collision_distribution.append(self.determine_collisions(isolated))
+        else:
+            self.collision_distribution.append(self.determine_collisions())
+        self.flocking_performance_distribution.append(self.precision.round(self.flocking_performance()))
+        self.step_count += 1
+        if self.trajectory is not None:
+            self.trajectory.record(self)
+        if timed:
+            self.time_phase('measurement', checkpoint)
+        return self.all_finished()
+
+    def all_finished(self) -> bool:
+        """Determines if every car has finished, not counting cars heading for an inactive goal.
+
+        A car heading for an inactive goal never reaches it, so it would otherwise keep the world from finishing. The
+        cars are only inspected if the world contains an inactive goal and not all cars are finished.
+
+        Returns:
+            bool: True if every car has reached its final goal or is heading for an inactive goal, False otherwise.
+
+        """
+        if self.finished_count == len(self.cars):
+            return True
+        active = [goal.active for goal in self.goals]
+        if all(active):
+            return False
+        return all(car.goal_reached or not active[car.goal_index] for car in self.cars)
+
+    def time_phase(self, phase: str, start: float) -> float:
+        """Adds the time elapsed since the start of a phase of an update to the phase times.
+
+        Args:
+            phase (str): The name of the phase.
+            start (float): The moment in seconds, in terms of the performance counter, the phase started.
+
+        Returns:
+            float: The moment the phase ended, which is the start of the next phase.
+
+        """
+        now = perf_counter()
+        self.phase_times[phase] = self.phase_times.get(phase, 0.0) + now - start
+        return now
+
+    def determine_all_behaviors(self, cars: List[Car], neighbor_count: int, rule_weights: List[float],
+                                fields: List[Optional[GoalField]]) -> List[Behavior]:
+        """Determines the behavior of the given cars from the current state of the world, without changing any car.
+
+        Without a behavior executor, all behaviors are determined in the current thread. Otherwise, the cars are split
+        into the configured amount of chunks, of which the behaviors are determined concurrently by the executor.
+
+        Args:
+            cars (List[Car]): The cars to determine the behavior of, usually the cars re-planning at this step.
+            neighbor_count (int): The amount of cars to incorporate into the neighborhood of each car.
+            rule_weights (List[float]): A list with the weights of each flocking force. The respective flocking forces
+                are [Separation, Alignment, Cohesion, Goal].
+            fields (List[Optional[GoalField]]): The goal field of each goal, or None for each goal without a field.
+
+        Returns:
+            List[Behavior]: The behavior of each of the given cars, in the same order.
+
+        """
+        if self.behavior_executor is None or self.behavior_chunks <= 1 or not cars:
+            return self.determine_behaviors(cars, neighbor_count, rule_weights, fields)
+
+        chunk_size = -(-len(cars) // self.behavior_chunks)
+        chunks = [cars[i:i + chunk_size] for i in range(0, len(cars), chunk_size)]
+        futures = [self.behavior_executor.submit(self.determine_behaviors, chunk, neighbor_count, rule_weights, fields)
+                   for chunk in chunks]
+        behaviors = []
+        for future in futures:
+            behaviors.extend(future.result())
+        return behaviors
 
-        self.collision_distribution.append(self.determine_collisions())
-        self.flocking_performance_distribution.append(self.flocking_performance())
-        return all_finished
+    def determine_behaviors(self, cars: List[Car], neighbor_count: int, rule_weights: List[float],
+                            fields: List[Optional[GoalField]]) -> List[Behavior]:
+        """Determines the behavior of the given cars from the current state of the world, without changing any car.
+
+        Args:
+            cars (List[Car]): The cars to determine the behavior of.
+            neighbor_count (int): The amount of cars to incorporate into the neighborhood of each car.
+            rule_weights (List[float]): A list with the weights of each flocking force. The respective flocking forces
+                are [Separation, Alignment, Cohesion, Goal].
+            fields (List[Optional[GoalField]]): The goal field of each goal, or None for each goal without a field.
+
+        Returns:
+            List[Behavior]: The behavior of each of the given cars, in the same order.
+
+        """
+        goals = self.goals
+        behaviors = []
+        for car in cars:
+            neighbors, offsets = self.get_neighborhood(car, neighbor_count)
+            behaviors.append(car.determine_behavior(neighbors, goals[car.goal_index], rule_weights,
+                                                    fields[car.goal_index], self.finished_counts, offsets))
+        return behaviors
 
     def get_neighbors(self, car: Car, neighbor_count: int) -> List[Tuple['Car', float]]:
         """Determines neighboring cars given some car and the amount of cars to include in the neighborhood.
@@ -71,23 +428,57 @@ class World:
                 respective neighboring car.
 
         """
-        neighbors = [(car, inf)] * neighbor_count
-        for c in self.cars:
-            if c != car:
-                x_dif = car.x - c.x
-                y_dif = car.y - c.y
-                distance = sqrt(x_dif ** 2 + y_dif ** 2)
-                neighbors.append((c, distance))
-                neighbors.sort(key=itemgetter(1))
-                neighbors.pop()
-        return neighbors
+        return self.get_neighborhood(car, neighbor_count)[0]
+
+    def get_neighborhood(self, car: Car, neighbor_count: int) -> Tuple[List[Tuple['Car', float]],
+                                                                       Optional[List[Tuple[float, float]]]]:
+        """Determines the neighboring cars of some car, and the differences between their positions if these are known.
+
+        The differences are known if the neighborhood is taken from the proximity structure.
+
+        Args:
+            car (Car): The car for which the neighborhood is to be determined.
+            neighbor_count (int): The amount of cars to incorporate into the neighborhood.
+
+        Returns:
+            (List[Tuple[Car, float]]): A list of neighboring cars and the distance between the given car and each
+                respective neighboring car.
+            (Optional[List[Tuple[float, float]]]): For each neighboring car, the differences between the x and y
+                position of the given car and those of the neighboring car, or None if these are not known.
 
-    def determine_collisions(self) -> int:
+        """
+        offsets = None
+        if self.neighbor_list is not None and self.neighbor_list.neighbor_count == neighbor_count:
+            neighbors = self.neighbor_list.neighbors(car)
+        elif self.proximity is not None and car in self.proximity.indices:
+            neighbors, offsets = self.proximity.neighborhood(car, neighbor_count)
+        else:
+            neighbors = [(car, inf)] * neighbor_count
+            for c in self.cars:
+                if c != car:
+                    x_dif = car.x - c.x
+                    y_dif = car.y - c.y
+                    distance = sqrt(x_dif ** 2 + y_dif ** 2)
+                    neighbors.append((c, distance))
+                    neighbors.sort(key=itemgetter(1))
+                    neighbors.pop()
+        if self.precision.reduced:
+            distances = self.precision.round_values([distance for _, distance in neighbors])
+            return [(c, distance) for (c, _), distance in zip(neighbors, distances)], offsets
+        return neighbors, offsets
+
+    def determine_collisions(self, skipped: Optional[List[bool]] = None) -> int:
         """Determines the amount of collisions that occurred.
 
-        Cars are considered to overlap when the distance between their midpoints is less than one car length. Cars are
-        only considered collided if they were not overlapping in the previous time step, but are overlapping in the
-        current time step. As a result, collisions are only counted once.
+        Cars are considered to overlap when the distance between their midpoints is less than their average length,
+        which equals one car length for cars of the same type. Cars are only considered collided if they were not
+        overlapping in the previous time step, but are overlapping in the current time step. As a result, collisions
+        are only counted once. If the proximity structure is up to date and covers all overlapping cars, only the close
+        pairs are compared.
+
+        Args:
+            skipped (Optional[List[bool]]): For every car, True if it is known not to overlap any other car, in which
+                case its pairs are not compared. None to compare all pairs.
 
         Returns:
             int: The amount of collisions that have occurred as a result of the last time step.
@@ -95,22 +486,75 @@ class World:
         """
         collision_count = 0
         car_count = len(self.cars)
-        car_length = self.cars[0].length
+        if skipped is None:
+            skipped = [False] * car_count
+        else:
+            for car, car_skipped in zip(self.cars, skipped):
+                if car_skipped:
+                    car.overlapping_cars.clear()
+            skipped_cars = {car for car, car_skipped in zip(self.cars, skipped) if car_skipped}
+            for car in self.cars:
+                if car.overlapping_cars:
+                    car.overlapping_cars = [other for other in car.overlapping_cars if other not in skipped_cars]
+        if self.proximity is not None and self.proximity.matches(self.cars) and self.proximity.covers_collisions():
+            return self.determine_close_collisions(skipped)
         for i in range(car_count):
+            if skipped[i]:
+                continue
+            car1 = self.cars[i]
+            car1_length = car1.spec.length
             for j in range(i + 1, car_count):
-                car1 = self.cars[i]
+                if skipped[j]:
+                    continue
                 car2 = self.cars[j]
+                collision_distance = (car1_length + car2.spec.length) / 2
                 x_dif = car1.x - car2.x
                 y_dif = car1.y - car2.y
                 distance = sqrt(x_dif ** 2 + y_dif ** 2)
                 if car2 in car1.overlapping_cars:
-                    if distance > car_length:
+                    if distance > collision_distance:
                         car1.overlapping_cars.remove(car2)
-                elif distance < car_length:
+                elif distance < collision_distance:
                     car1.overlapping_cars.append(car2)
                     collision_count += 1
         return collision_count
 
+    def determine_close_collisions(self, skipped: List[bool]) -> int:
+        """Determines the amount of collisions that occurred from the close pairs of the proximity structure.
+
+        Cars that are not a close pair are too far apart to overlap, so they stop overlapping if they did.
+
+        Args:
+            skipped (List[bool]): For every car, True if it is known not to overlap any other car, in which case its
+                pairs are not compared.
+
+        Returns:
+            int: The amount of collisions that have occurred as a result of the last time step.
+
+        """
+        cars = self.cars
+        pairs = self.proximity.pairs
+        indices = self.proximity.indices
+        close_pairs = {(i, j) for i, j, _, _, _ in pairs}
+        for i, car in enumerate(cars):
+            if car.overlapping_cars:
+                car.overlapping_cars = [other for other in car.overlapping_cars if (i, indices[other]) in close_pairs]
+
+        collision_count = 0
+        for i, j, _, _, distance in pairs:
+            if skipped[i] or skipped[j]:
+                continue
+            car1 = cars[i]
+            car2 = cars[j]
+            collision_distance = (car1.spec.length + car2.spec.length) / 2
+            if car2 in car1.overlapping_cars:
+                if distance > collision_distance:
+                    car1.overlapping_cars.remove(car2)
+            elif distance < collision_distance:
+                car1.overlapping_cars.append(car2)
+                collision_count += 1
+        return collision_count
+
     def flocking_performance(self) -> float:
         """Determines the mean squared error between the position of individual cars and the center of all cars.
 
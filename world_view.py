@@ -10,11 +10,12 @@ from pygame.surface import Surface
 from pygame import Color
 from car_view import draw_car
 from goal_view import draw_goal
+from wall_view import draw_wall
 from world import World
 
 
 def draw_world(world: World, world_color: Color, goal_color: Color, vector_color: Color,
-               car_image: Surface, surface: Surface, pixel_meter_ratio: float):
+               car_image: Surface, surface: Surface, pixel_meter_ratio: float, wall_color: Color = Color('black')):
     """Draws a given World object on a given Surface.
 
     Args:
@@ -25,9 +26,13 @@ def draw_world(world: World, world_color: Color, goal_color: Color, vector_color
         car_image (Surface): A surface containing the image visualizing a car.
         surface (Surface): The surface the world should be drawn on.
         pixel_meter_ratio (float): The amount of pixels corresponding to one meter.
+        wall_color (Color): The color walls should be.
 
     """
     surface.fill(world_color)
+    for wall in world.walls:
+        draw_wall(wall, wall_color, surface, pixel_meter_ratio)
     for car in world.cars:
         draw_car(car, car_image, vector_color, surface, pixel_meter_ratio)
-    draw_goal(world.goal, goal_color, surface, pixel_meter_ratio)
+    for goal in world.goals:
+        draw_goal(goal, goal_color, surface, pixel_meter_ratio)